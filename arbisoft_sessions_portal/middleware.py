@@ -0,0 +1,135 @@
+"""
+Response compression with brotli and gzip.
+
+The encoding is negotiated from Accept-Encoding, preferring brotli when the
+``brotli`` package is installed and the client accepts both equally. Only
+textual responses of at least ``MIN_SIZE`` bytes are compressed; streaming
+responses (exports, event streams) are passed through untouched so they are
+never buffered.
+
+Responses that are meant to be reused - they carry an ETag or a positive
+max-age - have their brotli variants stored in the shared cache keyed by body
+hash, so serving the same document again costs a hash and a cache lookup
+instead of another compression. Gzip output is never cached: each one gets
+fresh random padding, which a cached variant would repeat for every request.
+"""
+import hashlib
+import re
+
+from redis.exceptions import RedisError
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_max_age, patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPE = re.compile(
+    r'^\s*(text/|application/(json|javascript|xml|yaml|vnd\.oai\.openapi)|[^;]*\+(json|xml))', re.IGNORECASE
+)
+QUALITY = re.compile(r'\bq\s*=\s*([0-9.]+)')
+# Random bytes added to gzip output to make BREACH style length attacks harder, as Django's GZipMiddleware does
+GZIP_MAX_RANDOM_BYTES = 100
+
+
+def supported_encodings():
+    """ Encodings this server can produce, in order of preference """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding):
+    """ Return the preferred encoding the client accepts, or None to send the response as is """
+    qualities = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        match = QUALITY.search(params)
+        try:
+            qualities[name] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            qualities[name] = 0.0
+
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding):
+    """ Compress bytes with the given encoding """
+    if encoding == 'br':
+        return brotli.compress(
+            content, mode=brotli.MODE_TEXT, quality=settings.RESPONSE_COMPRESSION.get('BROTLI_QUALITY', 5)
+        )
+    return compress_string(content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """ Compress responses with brotli or gzip, reusing cached variants of repeated documents """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        config = settings.RESPONSE_COMPRESSION
+        self.min_size = config.get('MIN_SIZE', 1024)
+        self.cache_timeout = config.get('CACHE_TIMEOUT', 3600)
+        self.cache = caches[config['CACHE_ALIAS']] if config.get('CACHE_ALIAS') else None
+
+    def process_response(self, request, response):
+        """ Compress the response if it is worth it and the client accepts a supported encoding """
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < self.min_size
+            or not COMPRESSIBLE_CONTENT_TYPE.match(response.get('Content-Type', ''))
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = self._compressed_content(response, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        # A strong ETag no longer matches the bytes sent, see RFC 9110 Section 8.8.1
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+    def _is_reusable(self, response, encoding):
+        # Caching gzip would reuse its random padding for identical bodies
+        if self.cache is None or encoding != 'br' or response.status_code != 200:
+            return False
+        return response.has_header('ETag') or (get_max_age(response) or 0) > 0
+
+    def _compressed_content(self, response, encoding):
+        if not self._is_reusable(response, encoding):
+            return compress(response.content, encoding)
+
+        key = f"compressed:{encoding}:{hashlib.blake2b(response.content, digest_size=20).hexdigest()}"
+        try:
+            compressed = self.cache.get(key)
+        except RedisError:
+            compressed = None
+        if compressed is None:
+            compressed = compress(response.content, encoding)
+            try:
+                self.cache.set(key, compressed, self.cache_timeout)
+            except RedisError:
+                pass
+        return compressed
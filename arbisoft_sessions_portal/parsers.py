@@ -0,0 +1,24 @@
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from django.conf import settings
+
+from arbisoft_sessions_portal.renderers import ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+    """ Drop-in replacement for DRF's JSONParser using orjson """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            content = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                content = content.decode(encoding)
+            return orjson.loads(content)
+        except (orjson.JSONDecodeError, UnicodeDecodeError, LookupError) as e:
+            raise ParseError(f"JSON parse error - {e}") from e
@@ -0,0 +1,160 @@
+"""
+Read-replica routing for catalog reads.
+
+Views using ``ReplicaReadMixin`` send the reads of safe requests to one of the
+aliases in ``DATABASE_REPLICAS['ALIASES']``; everything else, including every
+write, goes to ``default``. Reads fall back to the primary when:
+
+- the user wrote to the database within the last ``PIN_SECONDS``
+  (read-your-writes), pins are set by ``ReplicaPinMiddleware`` and kept in a
+  shared cache,
+- the request itself has written to the database,
+- every replica lags more than ``MAX_LAG_SECONDS`` behind or is unreachable.
+  Replica lag is measured at most once per ``LAG_CHECK_INTERVAL`` per process,
+- the shared cache holding the pins is unreachable.
+
+Without replicas configured, requests do not look up pins at all.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from redis.exceptions import RedisError
+from rest_framework.permissions import SAFE_METHODS
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger("asp_api")
+
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+_read_alias = ContextVar('read_alias', default=None)
+_has_written = ContextVar('has_written', default=False)
+# alias -> (checked at, healthy)
+_replica_health = {}
+
+
+def _pin_key(user):
+    return f"replica_pin:{user.pk}"
+
+
+def pin_to_primary(user):
+    """ Send the reads of a user to the primary for the next PIN_SECONDS """
+    config = settings.DATABASE_REPLICAS
+    caches[config['PIN_CACHE_ALIAS']].set(_pin_key(user), 1, config['PIN_SECONDS'])
+
+
+def is_pinned(user):
+    """ Whether a user has written recently and must read from the primary, which is assumed if pins are unknown """
+    try:
+        return caches[settings.DATABASE_REPLICAS['PIN_CACHE_ALIAS']].get(_pin_key(user)) is not None
+    except RedisError as e:
+        logger.warning("Could not read the replica pin of user %s, reading from the primary: %s", user.pk, e)
+        return True
+
+
+def replica_lag(alias):
+    """ Seconds the replica is behind its primary, 0 for a database that is not replicating """
+    with connections[alias].cursor() as cursor:
+        cursor.execute(REPLICA_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def _is_healthy(alias):
+    config = settings.DATABASE_REPLICAS
+    checked_at, healthy = _replica_health.get(alias, (None, False))
+    if checked_at is not None and time.monotonic() - checked_at < config['LAG_CHECK_INTERVAL']:
+        return healthy
+
+    try:
+        lag = replica_lag(alias)
+        healthy = lag <= config['MAX_LAG_SECONDS']
+        if not healthy:
+            logger.warning("Replica %s is %.1f seconds behind, reading from the primary", alias, lag)
+    except DatabaseError:
+        logger.exception("Replica %s is unreachable, reading from the primary", alias)
+        healthy = False
+    _replica_health[alias] = (time.monotonic(), healthy)
+    return healthy
+
+
+def choose_replica():
+    """ Return a random replica within the allowed lag, or None to read from the primary """
+    healthy = [alias for alias in settings.DATABASE_REPLICAS['ALIASES'] if _is_healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+class ReplicaRouter:
+    """ Database router reading from the replica chosen for the current request """
+
+    def db_for_read(self, model, **hints):  # pylint: disable=unused-argument
+        """ The replica chosen for this request, or no opinion """
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):  # pylint: disable=unused-argument
+        """ Write to the primary and keep the rest of the request reading from it """
+        _read_alias.set(None)
+        _has_written.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):  # pylint: disable=unused-argument
+        """ Replicas hold the same rows as the primary """
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS['ALIASES']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """ Serve the reads of safe requests from a replica once the user is authenticated """
+
+    def initial(self, request, *args, **kwargs):
+        """ Choose where this request reads from after authentication and permission checks """
+        super().initial(request, *args, **kwargs)
+        if not settings.DATABASE_REPLICAS['ALIASES']:
+            return
+        if request.method in SAFE_METHODS and not (request.user.is_authenticated and is_pinned(request.user)):
+            alias = choose_replica()
+            if alias is not None:
+                request.replica_token = _read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """ Stop reading from the replica once the response is built """
+        token = getattr(request, 'replica_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaPinMiddleware:
+    """ Pin users whose request wrote to the database to the primary, so that their next reads see their changes """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _has_written.set(False)
+        try:
+            response = self.get_response(request)
+            has_written = _has_written.get()
+        finally:
+            _has_written.reset(token)
+
+        user = getattr(request, 'user', None)
+        if (
+            has_written
+            and response.status_code < 400
+            and settings.DATABASE_REPLICAS['ALIASES']
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user)
+        return response
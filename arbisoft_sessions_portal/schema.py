@@ -0,0 +1,111 @@
+"""
+Precomputed OpenAPI schema.
+
+Generating the schema introspects every view and serializer, so instead of
+doing it on each request to ``/api/schema/`` it is generated once per code
+version. ``manage.py build_openapi_schema`` writes the document to a versioned
+artifact (``openapi-<CODE_VERSION>.json``) at deploy time; processes load that
+artifact on first use, or generate the schema themselves when it is missing,
+and keep it in memory together with its ETag and every rendered format.
+"""
+import hashlib
+import logging
+from functools import lru_cache
+from pathlib import Path
+
+import orjson
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.views import SpectacularAPIView
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from arbisoft_sessions_portal.renderers import dumps
+
+logger = logging.getLogger("asp_api")
+
+
+def schema_artifact_path():
+    """ Path of the schema artifact for the running code version, None when no version is configured """
+    version = settings.OPENAPI_SCHEMA.get('CODE_VERSION')
+    if not version:
+        return None
+    return Path(settings.OPENAPI_SCHEMA['ARTIFACT_DIR']) / f"openapi-{version}.json"
+
+
+def generate_schema():
+    """ Introspect the API and return the public schema as JSON bytes """
+    return dumps(SchemaGenerator().get_schema(request=None, public=True))
+
+
+def write_schema_artifact():
+    """ Generate the schema and write it to the artifact of the running code version """
+    path = schema_artifact_path()
+    if path is None:
+        raise ValueError("OPENAPI_SCHEMA['CODE_VERSION'] is not set")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_bytes(generate_schema())
+    tmp_path.replace(path)
+    return path
+
+
+class CachedSchema:
+    """ A schema document with its ETag and the output of each renderer it has been served with """
+
+    def __init__(self, content):
+        self.data = orjson.loads(content)
+        self.etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+        self._rendered = {}
+
+    def render(self, renderer, accepted_media_type, renderer_context):
+        """ Render the schema once per renderer and media type """
+        key = (type(renderer), accepted_media_type)
+        if key not in self._rendered:
+            self._rendered[key] = renderer.render(self.data, accepted_media_type, renderer_context)
+        return self._rendered[key]
+
+
+@lru_cache(maxsize=None)
+def get_cached_schema():
+    """ Return the process-wide schema, loading the versioned artifact when there is one """
+    path = schema_artifact_path()
+    if path is not None:
+        try:
+            return CachedSchema(path.read_bytes())
+        except FileNotFoundError:
+            logger.warning("OpenAPI schema artifact %s is missing, generating the schema", path)
+    return CachedSchema(generate_schema())
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    OpenApi3 schema for this API. Format can be selected via content negotiation.
+
+    - YAML: application/vnd.oai.openapi
+    - JSON: application/vnd.oai.openapi+json
+
+    The document only changes between deploys, revalidate it with If-None-Match.
+    """
+
+    def _get_schema_response(self, request):
+        # Translated and explicitly versioned schemas are rare enough to be generated on demand
+        if request.GET.get('lang') or request.GET.get('version') or self.api_version or request.version:
+            return super()._get_schema_response(request)
+
+        schema = get_cached_schema()
+        not_modified = get_conditional_response(request, etag=schema.etag)
+        if not_modified is not None:
+            return not_modified
+
+        renderer = request.accepted_renderer
+        content = schema.render(renderer, request.accepted_media_type, self.get_renderer_context())
+        content_type = request.accepted_media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = schema.etag
+        response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+        return response
@@ -0,0 +1,16 @@
+from functools import lru_cache
+
+import redis
+
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def get_redis_client():
+    """
+    Return a process-wide Redis client for ``settings.REDIS_URL``.
+
+    The client owns a connection pool, so sharing one instance per process keeps
+    the number of open sockets bounded no matter how many callers use it.
+    """
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
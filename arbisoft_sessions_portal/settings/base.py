@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
 
+from corsheaders.defaults import default_headers
 from datetime import timedelta
 from dotenv import load_dotenv
 from pathlib import Path
@@ -35,18 +36,49 @@ ALLOWED_HOSTS = []
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.RevocableJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'arbisoft_sessions_portal.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'arbisoft_sessions_portal.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Proxies in front of the app appending to X-Forwarded-For. Throttles key anonymous clients on the
+    # address the nearest of them saw; with 0 it is REMOTE_ADDR, as the header is set by the client
+    'NUM_PROXIES': int(os.getenv("NUM_PROXIES", "0")),
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '10/min',
+        'login_account': '5/min',
+        'search': '30/min',
+    },
+}
+
+OPENAPI_SCHEMA = {
+    # Set per deploy (e.g. the git commit); the schema is regenerated only when it changes
+    'CODE_VERSION': os.getenv("CODE_VERSION", ""),
+    'ARTIFACT_DIR': os.getenv("OPENAPI_SCHEMA_DIR", str(BASE_DIR / 'openapi')),
+}
+
+SPECTACULAR_SETTINGS = {
+    # Events and video assets both have a status field
+    'ENUM_NAME_OVERRIDES': {
+        'EventStatusEnum': 'events.models.Event.EventStatus',
+        'VideoStatusEnum': 'events.models.VideoAsset.VideoStatus',
+    },
 }
 
 # Application definition
@@ -70,14 +102,24 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'arbisoft_sessions_portal.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'arbisoft_sessions_portal.replicas.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+RESPONSE_COMPRESSION = {
+    'MIN_SIZE': int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+    'BROTLI_QUALITY': int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5")),
+    # Cache shared by all processes holding brotli variants of reusable responses, None to always compress
+    'CACHE_ALIAS': 'shared',
+    'CACHE_TIMEOUT': 3600,
+}
+
 CORS_ALLOWED_ORIGINS = [
     "https://sessions.arbisoft.com",
 ]
@@ -87,6 +129,27 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Headers of the tus protocol of resumable uploads
+CORS_ALLOW_HEADERS = (
+    *default_headers,
+    'tus-resumable',
+    'upload-checksum',
+    'upload-length',
+    'upload-metadata',
+    'upload-offset',
+)
+CORS_EXPOSE_HEADERS = (
+    'location',
+    'tus-resumable',
+    'tus-version',
+    'tus-extension',
+    'tus-max-size',
+    'tus-checksum-algorithm',
+    'upload-expires',
+    'upload-length',
+    'upload-offset',
+)
+
 ROOT_URLCONF = 'arbisoft_sessions_portal.urls'
 
 TEMPLATES = [
@@ -122,6 +185,31 @@ DATABASES = {
     }
 }
 
+# Connection management applied to every database once local settings are loaded, see the end of this file.
+# Connections are kept open for CONN_MAX_AGE seconds by web and Celery workers alike and are checked before
+# reuse. Set DB_CONN_MAX_AGE=0 for the ASGI server: the sync code of a request may run in a thread of its own
+# there, leaving a persistent connection idle instead of reused. Set DB_POOL_MODE=pgbouncer when connecting
+# through PgBouncer in transaction pooling mode: server-side cursors (used by QuerySet.iterator()) cannot
+# outlive a transaction there, so they are disabled.
+DATABASE_CONNECTIONS = {
+    'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "60")),
+    'CONN_HEALTH_CHECKS': os.getenv("DB_CONN_HEALTH_CHECKS", "true").lower() in ("1", "true", "yes"),
+    'POOL_MODE': os.getenv("DB_POOL_MODE", ""),
+}
+
+# Read replicas of "default", one alias per host in DB_REPLICA_HOSTS (comma separated), used for catalog reads.
+# A user is pinned to the primary for PIN_SECONDS after writing, and replicas lagging more than MAX_LAG_SECONDS
+# are skipped. Pins live in a cache shared by all processes.
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+DATABASE_REPLICAS = {
+    'ALIASES': [f"replica_{number}" for number in range(1, len(DB_REPLICA_HOSTS) + 1)],
+    'PIN_SECONDS': int(os.getenv("DB_REPLICA_PIN_SECONDS", "10")),
+    'MAX_LAG_SECONDS': float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5")),
+    'LAG_CHECK_INTERVAL': 5,
+    'PIN_CACHE_ALIAS': 'shared',
+}
+DATABASE_ROUTERS = ['arbisoft_sessions_portal.replicas.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -173,10 +261,135 @@ ALLOW_ONLY_INTERNAL_USERS = True
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=7),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
+    "ROTATE_REFRESH_TOKENS": True,
+}
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/1")
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # The one cache shared by all processes, e.g. for replica pins, home feed rows and task debouncing
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'asp',
+    },
+}
+
+# Revoked JWT ids are kept in Redis and mirrored into a per-process Bloom filter
+# that is rebuilt every REFRESH_INTERVAL seconds.
+TOKEN_REVOCATION = {
+    "BACKEND": "users.revocation.RedisRevocationStore",
+    "BLOOM_CAPACITY": 10000,
+    "BLOOM_ERROR_RATE": 0.001,
+    "REFRESH_INTERVAL": 30,
+}
+
+THROTTLE_BACKEND = {
+    "BACKEND": "arbisoft_sessions_portal.throttling.RedisThrottleBackend",
+}
+
+# Player heartbeats are buffered and written to WatchProgress in batches every FLUSH_INTERVAL seconds
+WATCH_PROGRESS_BUFFER = {
+    "BACKEND": "events.watch_progress.RedisWatchProgressBuffer",
+    "FLUSH_INTERVAL": int(os.getenv("WATCH_PROGRESS_FLUSH_INTERVAL", "30")),
+}
+
+# Video views are counted in Redis and rolled up into EventDailyStats every ROLLUP_INTERVAL seconds
+VIEW_COUNTER = {
+    "BACKEND": "events.popularity.RedisViewCounter",
+    "ROLLUP_INTERVAL": int(os.getenv("VIEW_ROLLUP_INTERVAL", "300")),
+}
+
+# Trending scores sum the views of the last WINDOW_DAYS days, halving their weight every HALF_LIFE_DAYS
+TRENDING = {
+    "WINDOW_DAYS": 14,
+    "HALF_LIFE_DAYS": 3,
+}
+
+# The home page rows shared by all users hold ROW_SIZE event ids each, refreshed every REFRESH_INTERVAL seconds
+HOME_FEED = {
+    "CACHE_ALIAS": "shared",
+    "ROW_SIZE": 12,
+    "TAG_ROWS": 4,
+    "REFRESH_INTERVAL": int(os.getenv("HOME_FEED_REFRESH_INTERVAL", "300")),
+}
+
+# Catalog changes are kept for RETENTION_DAYS
+CATALOG_CHANGES = {
+    "RETENTION_DAYS": 30,
+}
+
+# Downloads report their progress to Redis and the video status streams at most every REPORT_INTERVAL seconds
+DOWNLOAD_PROGRESS = {
+    "BACKEND": "events.download_progress.RedisDownloadProgressStore",
+    "OPTIONS": {"ttl": 300},
+    "REPORT_INTERVAL": 2,
+}
+
+# Live video asset status streams (served by the ASGI app) send a keepalive every KEEPALIVE_SECONDS and end
+# after MAX_STREAM_SECONDS; the tickets authenticating them are valid for TICKET_MAX_AGE seconds
+VIDEO_STATUS = {
+    "BACKEND": "events.video_status.RedisVideoStatusChannel",
+    "OPTIONS": {"channel": "video-status"},
+    "KEEPALIVE_SECONDS": 15,
+    "MAX_STREAM_SECONDS": int(os.getenv("VIDEO_STATUS_MAX_STREAM_SECONDS", "300")),
+    "TICKET_MAX_AGE": 60,
+}
+
+# Resumable video uploads of at most MAX_SIZE bytes, deleted when left unfinished for EXPIRY_HOURS.
+# BACKEND holds the locks of uploads being written, it must be shared by all web processes
+VIDEO_UPLOADS = {
+    "BACKEND": "events.uploads.RedisUploadLocks",
+    "OPTIONS": {},
+    "MAX_SIZE": int(os.getenv("VIDEO_UPLOAD_MAX_SIZE", str(20 * 1024 ** 3))),
+    "EXPIRY_HOURS": 24,
 }
 
 CELERY_BROKER_URL = "redis://redis:6379/0"
 CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
+CELERY_BEAT_SCHEDULE = {
+    'flush-watch-progress': {
+        'task': 'events.tasks.flush_watch_progress_task',
+        'schedule': WATCH_PROGRESS_BUFFER['FLUSH_INTERVAL'],
+        # A flush that could not start in time is superseded by the next one
+        'options': {'expires': WATCH_PROGRESS_BUFFER['FLUSH_INTERVAL']},
+    },
+    'rollup-event-views': {
+        'task': 'events.tasks.rollup_event_views_task',
+        'schedule': VIEW_COUNTER['ROLLUP_INTERVAL'],
+        'options': {'expires': VIEW_COUNTER['ROLLUP_INTERVAL']},
+    },
+    'refresh-home-candidates': {
+        'task': 'events.tasks.refresh_home_candidates_task',
+        'schedule': HOME_FEED['REFRESH_INTERVAL'],
+        'options': {'expires': HOME_FEED['REFRESH_INTERVAL']},
+    },
+    'prune-catalog-changes': {
+        'task': 'events.tasks.prune_change_log_task',
+        'schedule': 24 * 60 * 60,
+        'options': {'expires': 60 * 60},
+    },
+    'expire-video-uploads': {
+        'task': 'events.tasks.expire_video_uploads_task',
+        'schedule': 60 * 60,
+        'options': {'expires': 60 * 60},
+    },
+    # Catches up with event status changes written by QuerySet.update(), which send no signals
+    'reconcile-usage-counts': {
+        'task': 'events.tasks.reconcile_usage_counts_task',
+        'schedule': 24 * 60 * 60,
+        'options': {'expires': 60 * 60},
+    },
+    # Catches up with tag and playlist renames, which do not trigger incremental updates
+    'rebuild-event-neighbours': {
+        'task': 'events.tasks.rebuild_event_neighbours_task',
+        'schedule': 24 * 60 * 60,
+        'options': {'expires': 60 * 60},
+    },
+}
 
 LOGGING = {
     'version': 1,
@@ -247,3 +460,12 @@ try:
     from .local import *
 except Exception:
     pass
+
+for _alias, _host in zip(DATABASE_REPLICAS['ALIASES'], DB_REPLICA_HOSTS):
+    DATABASES.setdefault(_alias, {**DATABASES['default'], 'HOST': _host, 'TEST': {'MIRROR': 'default'}})
+
+for _database in DATABASES.values():
+    _database.setdefault('CONN_MAX_AGE', DATABASE_CONNECTIONS['CONN_MAX_AGE'])
+    _database.setdefault('CONN_HEALTH_CHECKS', DATABASE_CONNECTIONS['CONN_HEALTH_CHECKS'])
+    if DATABASE_CONNECTIONS['POOL_MODE'] == 'pgbouncer':
+        _database.setdefault('DISABLE_SERVER_SIDE_CURSORS', True)
@@ -9,7 +9,23 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'testpassword'),
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
-    }
+    },
+    # A separate database standing in for a replica, only used by tests that enable it
+    'replica': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_REPLICA_NAME', 'testdb_replica'),
+        'USER': os.environ.get('DB_USER', 'testuser'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'testpassword'),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+    },
+}
+
+DATABASE_REPLICAS = {**DATABASE_REPLICAS, 'ALIASES': []}
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'},
 }
 
 
@@ -18,6 +34,44 @@ DEBUG = False
 AUTH_PASSWORD_VALIDATORS = []
 
 CELERY_BROKER_URL = 'memory://'
+# Keeps scheduled tasks from reaching for the Redis result backend
+CELERY_RESULT_BACKEND = 'cache+memory://'
+
+TOKEN_REVOCATION = {
+    'BACKEND': 'users.revocation.InMemoryRevocationStore',
+    'REFRESH_INTERVAL': 0,
+}
+
+THROTTLE_BACKEND = {
+    'BACKEND': 'arbisoft_sessions_portal.throttling.InMemoryThrottleBackend',
+}
+
+WATCH_PROGRESS_BUFFER = {
+    'BACKEND': 'events.watch_progress.InMemoryWatchProgressBuffer',
+}
+
+VIEW_COUNTER = {
+    'BACKEND': 'events.popularity.InMemoryViewCounter',
+}
+
+DOWNLOAD_PROGRESS = {
+    **DOWNLOAD_PROGRESS,
+    'BACKEND': 'events.download_progress.InMemoryDownloadProgressStore',
+    'OPTIONS': {},
+}
+
+VIDEO_STATUS = {
+    **VIDEO_STATUS,
+    'BACKEND': 'events.video_status.InMemoryVideoStatusChannel',
+    'OPTIONS': {},
+}
+
+VIDEO_UPLOADS = {
+    **VIDEO_UPLOADS,
+    'BACKEND': 'events.uploads.InMemoryUploadLocks',
+    'OPTIONS': {},
+}
+
 
 class DisableMigrations:
     def __contains__(self, item):
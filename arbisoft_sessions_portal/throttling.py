@@ -0,0 +1,159 @@
+"""
+Sliding-window rate limiting shared by the API apps.
+
+Each throttle key keeps one counter per fixed window. A request is admitted when
+the previous window's count, weighted by how much of it still overlaps the
+sliding window, plus the current window's count stays within the limit. The
+check and the increment happen atomically in the backend (a Lua script on
+Redis), so concurrent workers cannot overshoot the budget.
+
+Backends also keep allowed/denied counters per throttle scope for monitoring.
+"""
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from arbisoft_sessions_portal.services.redis.redis_client import get_redis_client
+
+SLIDING_WINDOW_SCRIPT = """
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local allowed = 0
+if previous * tonumber(ARGV[2]) + current + 1 <= tonumber(ARGV[1]) then
+    current = redis.call('INCR', KEYS[1])
+    redis.call('EXPIRE', KEYS[1], 2 * tonumber(ARGV[3]))
+    allowed = 1
+    redis.call('HINCRBY', KEYS[3], ARGV[4] .. ':allowed', 1)
+else
+    redis.call('HINCRBY', KEYS[3], ARGV[4] .. ':denied', 1)
+end
+return {allowed, previous, current}
+"""
+
+
+class RedisThrottleBackend:
+    """ Throttle backend keeping window counters in Redis """
+
+    def __init__(self, stats_key='throttle:stats', **kwargs):  # pylint: disable=unused-argument
+        self.stats_key = stats_key
+        self._script = None
+
+    def hit(self, current_key, previous_key, limit, weight, window, scope):
+        """
+        Atomically admit or reject one request.
+        Returns ``(allowed, previous_count, current_count)``.
+        """
+        if self._script is None:
+            self._script = get_redis_client().register_script(SLIDING_WINDOW_SCRIPT)
+        allowed, previous, current = self._script(
+            keys=[current_key, previous_key, self.stats_key],
+            args=[limit, weight, window, scope],
+        )
+        return bool(allowed), int(previous), int(current)
+
+    def stats(self):
+        """ Return allowed/denied counters grouped by throttle scope """
+        return _group_stats(get_redis_client().hgetall(self.stats_key))
+
+
+class InMemoryThrottleBackend:
+    """ Process-local throttle backend, used in tests and single-process setups """
+
+    def __init__(self, **kwargs):  # pylint: disable=unused-argument
+        self._counters = {}
+        self._stats = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def hit(self, current_key, previous_key, limit, weight, window, scope):  # pylint: disable=unused-argument
+        """
+        Atomically admit or reject one request.
+        Returns ``(allowed, previous_count, current_count)``.
+        """
+        with self._lock:
+            previous = self._counters.get(previous_key, 0)
+            current = self._counters.get(current_key, 0)
+            allowed = previous * weight + current + 1 <= limit
+            if allowed:
+                current += 1
+                self._counters[current_key] = current
+            self._stats[f"{scope}:{'allowed' if allowed else 'denied'}"] += 1
+        return allowed, previous, current
+
+    def stats(self):
+        """ Return allowed/denied counters grouped by throttle scope """
+        with self._lock:
+            return _group_stats(self._stats)
+
+    def reset(self):
+        """ Forget all counters """
+        with self._lock:
+            self._counters.clear()
+            self._stats.clear()
+
+
+def _group_stats(flat_stats):
+    grouped = defaultdict(lambda: {'allowed': 0, 'denied': 0})
+    for field, count in flat_stats.items():
+        scope, outcome = field.rsplit(':', 1)
+        grouped[scope][outcome] = int(count)
+    return dict(grouped)
+
+
+@lru_cache(maxsize=None)
+def get_throttle_backend():
+    """ Return the process-wide throttle backend configured by ``settings.THROTTLE_BACKEND`` """
+    config = settings.THROTTLE_BACKEND
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def retry_after(previous, current, limit, window, elapsed):
+    """
+    Seconds until the weighted count drops enough to admit one more request.
+    """
+    remaining = window - elapsed
+    if current < limit:
+        # Capacity comes back as the previous window slides out
+        return max(0.0, remaining - (limit - 1 - current) * window / previous) if previous else 0.0
+    # The current window alone is exhausted; it becomes the decaying previous window next
+    return remaining + max(0.0, window - (limit - 1) * window / current)
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    Base class for sliding-window throttles.
+    Subclasses set ``scope`` and implement ``get_cache_key``.
+    """
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        super().__init__()
+        self.retry_after = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        window_index, elapsed = divmod(self.timer(), self.duration)
+        allowed, previous, current = get_throttle_backend().hit(
+            f"{key}:{int(window_index)}",
+            f"{key}:{int(window_index) - 1}",
+            self.num_requests,
+            1 - elapsed / self.duration,
+            self.duration,
+            self.scope,
+        )
+        if not allowed:
+            self.retry_after = retry_after(previous, current, self.num_requests, self.duration, elapsed)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
@@ -0,0 +1,9 @@
+import pytest
+
+from arbisoft_sessions_portal.throttling import get_throttle_backend
+
+
+@pytest.fixture(autouse=True)
+def reset_throttles():
+    """ Start every test with empty rate limiting counters """
+    get_throttle_backend().reset()
@@ -3,4 +3,14 @@
 echo "Running Database Migrations"
 python manage.py migrate
 
+echo "Running Backfills"
+python manage.py run_backfill tag_usage_counts
+python manage.py run_backfill playlist_usage_counts
+
+echo "Rebuilding Search Suggestions"
+python manage.py rebuild_search_suggestions
+
+echo "Building OpenAPI Schema"
+python manage.py build_openapi_schema
+
 exec "$@"
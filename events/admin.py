@@ -2,21 +2,61 @@ from django.contrib import admin
 from django.db import models
 from django.forms import Textarea, TextInput
 
-from events.forms import EventAdminForm, EventPresenterForm, VideoAssetForm
-from events.models import Event, EventPresenter, Playlist, Tag, VideoAsset
+from events.changes import record_changes
+from events.download_progress import describe, get_download_progress_store
+from events.forms import EventAdminForm, EventPresenterForm, PlaylistItemForm, VideoAssetForm
+from events.models import CatalogChange, Event, EventPresenter, Playlist, PlaylistItem, Tag, VideoAsset
 from events.tasks import download_google_drive_video
 
 
+def save_playlist_items(formset):
+    """
+    Save a formset of playlist items, appending the new items left without a position
+    after the last item of their playlist, in the order of the forms.
+    """
+    items = formset.save(commit=False)
+    for item in formset.deleted_objects:
+        item.delete()
+    appended = [item for item in items if item.position is None]
+    for item in items:
+        if item.position is not None:
+            item.save()
+    if appended:
+        last_positions = PlaylistItem.objects.filter(
+            playlist__in={item.playlist_id for item in appended}
+        ).last_positions()
+        for item in appended:
+            item.position = last_positions[item.playlist_id] = last_positions.get(item.playlist_id, -1) + 1
+            item.save()
+    formset.save_m2m()
+
+
 class VideoAssetAdmin(admin.ModelAdmin):
     """ Custom Admin for VideoAsset model """
     form = VideoAssetForm
-    list_display = ('title', 'event', 'status', 'duration_hh_mm_ss', 'file_size_mb', 'created')
+    list_display = ('title', 'event', 'status', 'download_progress', 'duration_hh_mm_ss', 'file_size_mb', 'created')
     search_fields = ('title',)
     autocomplete_fields = ('event',)
     formfield_overrides = {
         models.CharField: {'widget': TextInput(attrs={'style': 'width: 100%'})},
     }
 
+    def get_changelist_instance(self, request):
+        """ Read the progress of the downloads on the page at once """
+        changelist = super().get_changelist_instance(request)
+        processing = [obj.pk for obj in changelist.result_list if obj.status == VideoAsset.VideoStatus.PROCESSING]
+        progress = get_download_progress_store().get_many(processing) if processing else {}
+        for obj in changelist.result_list:
+            obj.progress = progress.get(obj.pk)
+        return changelist
+
+    def download_progress(self, obj):
+        """ Summary of the running download of a video asset """
+        progress = getattr(obj, 'progress', None)
+        return describe(progress) if progress else ""
+
+    download_progress.short_description = "Download progress"
+
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
 
@@ -35,17 +75,47 @@ class EventPresenterInline(admin.StackedInline):
     autocomplete_fields = ('user',)
 
 
+class EventPlaylistInline(admin.TabularInline):
+    """ Custom TabularInline admin for the playlists of an event """
+    model = PlaylistItem
+    form = PlaylistItemForm
+    extra = 1
+    autocomplete_fields = ('playlist',)
+    fields = ('playlist', 'position')
+    verbose_name = "Playlist"
+
+
+class PlaylistItemInline(admin.TabularInline):
+    """ Custom TabularInline admin for the ordered events of a playlist """
+    model = PlaylistItem
+    form = PlaylistItemForm
+    extra = 1
+    autocomplete_fields = ('event',)
+    fields = ('position', 'event')
+    ordering = ('position', 'event__event_time')
+
+
+class PlaylistAdmin(admin.ModelAdmin):
+    """ Custom Admin for Playlist model """
+    list_display = ('name', 'published_event_count', 'last_used')
+    search_fields = ('name',)
+    inlines = [PlaylistItemInline]
+
+    def save_formset(self, request, form, formset, change):
+        save_playlist_items(formset)
+
+
 class EventAdmin(admin.ModelAdmin):
     """ Custom Admin for Event model """
     form = EventAdminForm
     list_display = ('title', 'event_type', 'status', 'event_time', 'creator', 'get_presenters')
     search_fields = ('title', 'description')
-    filter_horizontal = ('tags', 'playlists')
+    filter_horizontal = ('tags',)
     formfield_overrides = {
         models.CharField: {'widget': TextInput(attrs={'style': 'width: 100%'})},
         models.TextField: {'widget': Textarea(attrs={'style': 'width: 100%'})},
     }
-    inlines = [EventPresenterInline]
+    inlines = [EventPresenterInline, EventPlaylistInline]
     autocomplete_fields = ('creator', )
     ordering = ('event_time', 'title', 'status')
     list_editable = ('status', )
@@ -54,7 +124,7 @@ class EventAdmin(admin.ModelAdmin):
         (None, {
             'fields': ('creator', 'title', 'slug', 'description', 'event_time',
                        'event_type', 'status', 'is_featured',
-                       'tags', 'playlists', 'videoasset',)
+                       'tags', 'videoasset',)
         }),
     )
 
@@ -68,20 +138,30 @@ class EventAdmin(admin.ModelAdmin):
 
     get_presenters.short_description = "Presenters"
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is PlaylistItem:
+            save_playlist_items(formset)
+        else:
+            super().save_formset(request, form, formset, change)
+
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
 
         # Handle assignment here after Event has a valid PK
         videoasset = form.cleaned_data.get("videoasset")
         if videoasset:
-            # Unlink any previous link first
-            VideoAsset.objects.filter(event=obj).exclude(id=videoasset.id).update(event=None)
+            # Unlink any previous link first, logging the change update() does not signal
+            unlinked = list(
+                VideoAsset.objects.filter(event=obj).exclude(id=videoasset.id).values_list('pk', flat=True)
+            )
+            VideoAsset.objects.filter(pk__in=unlinked).update(event=None)
+            record_changes(CatalogChange.ObjectKind.VIDEO_ASSET, unlinked)
 
             videoasset.event = obj
             videoasset.save(update_fields=["event"])
 
 
 admin.site.register(Event, EventAdmin)
-admin.site.register(Playlist)
+admin.site.register(Playlist, PlaylistAdmin)
 admin.site.register(Tag)
 admin.site.register(VideoAsset, VideoAssetAdmin)
@@ -0,0 +1,141 @@
+"""
+Batched, resumable backfills for large tables.
+
+A backfill walks its queryset in primary key order, ``batch_size`` rows at a
+time, and commits each batch in its own short transaction together with a
+checkpoint recording the last primary key done. Locks are held only for one
+batch, memory is bounded by the batch size, and an interrupted run resumes
+after the last committed batch.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Max, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from events.changes import record_changes
+from events.models import BackfillCheckpoint, CatalogChange, Event, Playlist, SlugCounter, Tag
+
+BACKFILLS = {}
+
+
+def register(backfill_class):
+    """ Class decorator adding a backfill to the registry under its name """
+    BACKFILLS[backfill_class.name] = backfill_class
+    return backfill_class
+
+
+def get_backfill(name):
+    """ Return an instance of the registered backfill with the given name """
+    try:
+        return BACKFILLS[name]()
+    except KeyError as e:
+        raise ValueError(f"Unknown backfill '{name}', choose from: {', '.join(sorted(BACKFILLS))}") from e
+
+
+class Backfill:
+    """
+    Base class for backfills.
+    Subclasses set ``name`` and implement ``get_queryset`` and ``process_batch``.
+    """
+    name = None
+    batch_size = 1000
+
+    def get_queryset(self):
+        """ Return the rows to backfill """
+        raise NotImplementedError
+
+    def process_batch(self, pks):
+        """ Backfill the rows with the given primary keys """
+        raise NotImplementedError
+
+    def run(self, batch_size=None, pause=0.0, restart=False, report=None):
+        """
+        Process all remaining batches, sleeping ``pause`` seconds between them.
+        ``report`` is called with the checkpoint and the rows/sec of each batch.
+        Returns the checkpoint.
+        """
+        batch_size = batch_size or self.batch_size
+        checkpoint, _ = BackfillCheckpoint.objects.get_or_create(name=self.name)
+        if restart:
+            checkpoint.restart()
+
+        while self._run_batch(batch_size, report):
+            if pause:
+                time.sleep(pause)
+
+        checkpoint.refresh_from_db()
+        return checkpoint
+
+    def _run_batch(self, batch_size, report):
+        """ Process the next batch and advance the checkpoint in one transaction, False if nothing was left """
+        started = time.perf_counter()
+        with transaction.atomic():
+            # Locking the checkpoint keeps concurrent runs of the same backfill from overlapping
+            checkpoint = BackfillCheckpoint.objects.select_for_update().get(name=self.name)
+            remaining = self.get_queryset().filter(pk__gt=checkpoint.last_pk).order_by('pk')
+            pks = list(remaining.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                if checkpoint.completed is None:
+                    checkpoint.completed = timezone.now()
+                    checkpoint.save(update_fields=['completed', 'modified'])
+                return False
+
+            self.process_batch(pks)
+            checkpoint.last_pk = pks[-1]
+            checkpoint.rows_processed += len(pks)
+            checkpoint.completed = None
+            checkpoint.save(update_fields=['last_pk', 'rows_processed', 'completed', 'modified'])
+
+        if report:
+            report(checkpoint, len(pks) / max(time.perf_counter() - started, 1e-6))
+        return True
+
+
+@register
+class EventSlugBackfill(Backfill):
+    """ Give every event without a slug a unique one """
+    name = 'event_slugs'
+
+    def get_queryset(self):
+        return Event.objects.filter(Q(slug__isnull=True) | Q(slug=''))
+
+    def process_batch(self, pks):
+        events = list(Event.objects.filter(pk__in=pks).only('pk', 'title').order_by('pk'))
+        for event, slug in zip(events, SlugCounter.objects.allocate([event.title for event in events])):
+            event.slug = slug
+        Event.objects.bulk_update(events, ['slug'])
+
+
+class UsageCountBackfill(Backfill):
+    """ Recompute published_event_count and last_used of a usage counted model, logging the rows as changed """
+    model = None
+    change_kind = None
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def process_batch(self, pks):
+        event_field = self.model._meta.get_field('events').field.name
+        last_published = Event.objects.filter(
+            status=Event.EventStatus.PUBLISHED,
+            **{event_field: OuterRef('pk')}
+        ).order_by().values(event_field).annotate(latest=Max('modified')).values('latest')
+        self.model.objects.filter(pk__in=pks).refresh_published_event_counts(last_used=Subquery(last_published))
+        record_changes(self.change_kind, pks)
+
+
+@register
+class TagUsageCountBackfill(UsageCountBackfill):
+    """ Recompute the usage counts of tags """
+    name = 'tag_usage_counts'
+    model = Tag
+    change_kind = CatalogChange.ObjectKind.TAG
+
+
+@register
+class PlaylistUsageCountBackfill(UsageCountBackfill):
+    """ Recompute the usage counts of playlists """
+    name = 'playlist_usage_counts'
+    model = Playlist
+    change_kind = CatalogChange.ObjectKind.PLAYLIST
@@ -0,0 +1,149 @@
+"""
+Delta sync of the catalog.
+
+Signals append a ``CatalogChange`` row whenever an event, tag, playlist or
+video asset is saved or deleted, in the transaction of the change. Changes to
+what an event shows, such as its tags, playlists, presenters or video, are
+logged as changes of the event too.
+
+``get_changes`` reads the log after a client's cursor, collapses repeated
+changes of the same object and returns the current state of changed objects,
+so the cost of a sync is proportional to what changed. Events that are no
+longer published are reported as deleted: the synced catalog only holds
+published events.
+
+Ids are allocated when a change is written but become visible when its
+transaction commits, so reading in id order would let a slow transaction commit
+behind a client's cursor. Each change therefore stores the id of the
+transaction that wrote it, and the log is read in the order of transaction ids,
+then of change ids, leaving out changes of transactions at or above the
+``xmin`` of the reader's snapshot: every transaction below it has ended, and
+any change still to be committed sorts after what was served. A transaction
+left open holds back the changes of all later ones until it ends.
+
+The log is pruned after ``RETENTION_DAYS``; clients with an older cursor must
+sync from scratch.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Func, Min, Q
+from django.utils import timezone
+
+from events.models import CatalogChange, Event, Playlist, Tag, VideoAsset
+from events.v1.serializers import PlaylistListSerializer, TagListSerializer, VideoAssetChangeSerializer
+
+Kind = CatalogChange.ObjectKind
+Action = CatalogChange.ChangeAction
+RESULT_KEYS = {
+    Kind.EVENT: 'events',
+    Kind.TAG: 'tags',
+    Kind.PLAYLIST: 'playlists',
+    Kind.VIDEO_ASSET: 'video_assets',
+}
+
+
+class CursorExpired(Exception):
+    """ The changes after a cursor were pruned from the log """
+
+
+class CurrentTransactionId(Func):
+    """ The id of the current transaction, assigning one if it has none yet """
+    template = 'pg_current_xact_id()::text::bigint'
+    output_field = models.BigIntegerField()
+
+
+class SnapshotXmin(Func):
+    """ The lowest id of a transaction still running when the statement's snapshot was taken """
+    template = 'pg_snapshot_xmin(pg_current_snapshot())::text::bigint'
+    output_field = models.BigIntegerField()
+
+
+def record_changes(kind, object_ids, action=Action.UPSERT):
+    """ Append a change of each object to the log """
+    CatalogChange.objects.bulk_create(
+        CatalogChange(kind=kind, object_id=object_id, action=action, xact_id=CurrentTransactionId())
+        for object_id in dict.fromkeys(object_ids)
+    )
+
+
+def latest_cursor():
+    """ The cursor of a client that has just read the whole catalog """
+    return _settled().order_by('-xact_id', '-pk').values_list('pk', flat=True).first() or 0
+
+
+def _settled():
+    """ The changes of transactions that have all ended, no change can be committed before them any more """
+    return CatalogChange.objects.filter(xact_id__lt=SnapshotXmin())
+
+
+def _after(cursor):
+    """ Filter for the changes read after a cursor. Raises CursorExpired when the cursor was pruned """
+    if not cursor:
+        if (CatalogChange.objects.aggregate(oldest=Min('pk'))['oldest'] or 1) > 1:
+            raise CursorExpired()
+        return Q()
+
+    xact_id = CatalogChange.objects.filter(pk=cursor).values_list('xact_id', flat=True).first()
+    if xact_id is None:
+        raise CursorExpired()
+    return Q(xact_id__gt=xact_id) | Q(xact_id=xact_id, pk__gt=cursor)
+
+
+def _serialize(kind, ids, event_serializer):
+    """ Return the current state of the given objects by id, leaving out those that are gone """
+    if kind == Kind.EVENT:
+        rows = list(event_serializer.values(Event.objects.filter(pk__in=ids, status=Event.EventStatus.PUBLISHED)))
+        return {row['id']: data for row, data in zip(rows, event_serializer.to_representation(rows))}
+
+    model, serializer_class = {
+        Kind.TAG: (Tag, TagListSerializer),
+        Kind.PLAYLIST: (Playlist, PlaylistListSerializer),
+        Kind.VIDEO_ASSET: (VideoAsset, VideoAssetChangeSerializer),
+    }[kind]
+    objects = model.objects.filter(pk__in=ids).order_by('pk')
+    return {obj.pk: data for obj, data in zip(objects, serializer_class(objects, many=True).data)}
+
+
+def get_changes(cursor, limit, event_serializer):
+    """
+    Return the changes after a cursor, at most ``limit`` log entries, as
+    ``(next cursor, has more, {'events': {'upserted': [...], 'deleted': [ids]}, 'tags': ...})``.
+    Raises CursorExpired when entries after the cursor were pruned.
+    """
+    entries = list(
+        _settled().filter(_after(cursor)).order_by('xact_id', 'pk').values_list(
+            'pk', 'kind', 'object_id', 'action'
+        )[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Only the last change of an object counts, its current state is what the client needs
+    last_actions = defaultdict(dict)
+    for _, kind, object_id, action in entries:
+        last_actions[kind].pop(object_id, None)
+        last_actions[kind][object_id] = action
+
+    changes = {}
+    for kind in Kind:
+        actions = last_actions.get(kind, {})
+        upserts = [object_id for object_id, action in actions.items() if action == Action.UPSERT]
+        upserted = _serialize(kind, upserts, event_serializer) if upserts else {}
+        changes[RESULT_KEYS[kind]] = {
+            'upserted': [upserted[object_id] for object_id in actions if object_id in upserted],
+            'deleted': [object_id for object_id in actions if object_id not in upserted],
+        }
+    return (entries[-1][0] if entries else cursor), has_more, changes
+
+
+def prune_change_log():
+    """
+    Delete the changes older than the retention period. Returns the number deleted.
+    The latest change is kept so that the latest cursor stays valid.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.CATALOG_CHANGES['RETENTION_DAYS'])
+    deleted, _ = CatalogChange.objects.filter(created__lt=cutoff).exclude(pk=latest_cursor()).delete()
+    return deleted
@@ -0,0 +1,191 @@
+"""
+Progress of video downloads.
+
+A download task counts the bytes it receives with a ``DownloadTracker``. At
+most once every ``REPORT_INTERVAL`` seconds the tracker stores the bytes
+received, the expected size from Content-Length, the transfer rate and the
+time left in a Redis hash of the video asset, and publishes them to the video
+status streams. Nothing is written to the database until the download ends.
+
+The hash is deleted when the download ends and expires after ``TTL`` seconds
+without a report, so a worker that died mid-download leaves nothing behind.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from redis.exceptions import RedisError
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from arbisoft_sessions_portal.services.redis.redis_client import get_redis_client
+from events.video_status import publish_video_status
+
+logger = logging.getLogger("asp_api")
+
+# Weight of the latest interval in the reported rate, smoothing out bursts and stalls
+RATE_SMOOTHING = 0.3
+
+Progress = namedtuple('Progress', ['received', 'total', 'rate', 'eta', 'updated'])
+
+
+def _encode(progress):
+    return {
+        'received': progress.received,
+        'total': '' if progress.total is None else progress.total,
+        'rate': progress.rate,
+        'eta': '' if progress.eta is None else progress.eta,
+        'updated': progress.updated.timestamp(),
+    }
+
+
+def _decode(fields):
+    return Progress(
+        int(fields['received']),
+        int(fields['total']) if fields['total'] else None,
+        float(fields['rate']),
+        float(fields['eta']) if fields['eta'] else None,
+        datetime.fromtimestamp(float(fields['updated']), tz=timezone.utc),
+    )
+
+
+class RedisDownloadProgressStore:
+    """ Download progress store keeping a Redis hash per video asset """
+
+    def __init__(self, key_prefix='download_progress:', ttl=300, **kwargs):  # pylint: disable=unused-argument
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+
+    def set(self, video_asset_id, progress):
+        """ Store the latest progress of a download """
+        key = f"{self.key_prefix}{video_asset_id}"
+        pipeline = get_redis_client().pipeline(transaction=False)
+        pipeline.hset(key, mapping=_encode(progress))
+        pipeline.expire(key, self.ttl)
+        pipeline.execute()
+
+    def get_many(self, video_asset_ids):
+        """
+        Return the progress of the running downloads among some video assets by id.
+        Progress is optional to show, failures are logged and leave it out.
+        """
+        video_asset_ids = list(video_asset_ids)
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for video_asset_id in video_asset_ids:
+            pipeline.hgetall(f"{self.key_prefix}{video_asset_id}")
+        try:
+            results = pipeline.execute()
+        except RedisError as e:
+            logger.warning("Could not read the download progress of %d video assets: %s", len(video_asset_ids), e)
+            return {}
+        return {
+            video_asset_id: _decode(fields)
+            for video_asset_id, fields in zip(video_asset_ids, results) if fields
+        }
+
+    def delete(self, video_asset_id):
+        """ Forget the progress of a download that ended """
+        get_redis_client().delete(f"{self.key_prefix}{video_asset_id}")
+
+
+class InMemoryDownloadProgressStore:
+    """ Process-local download progress store, used in tests and single-process setups """
+
+    def __init__(self, **kwargs):  # pylint: disable=unused-argument
+        self._progress = {}
+        self._lock = threading.Lock()
+
+    def set(self, video_asset_id, progress):
+        """ Store the latest progress of a download """
+        with self._lock:
+            self._progress[video_asset_id] = progress
+
+    def get_many(self, video_asset_ids):
+        """ Return the progress of the running downloads among some video assets by id """
+        with self._lock:
+            return {
+                video_asset_id: self._progress[video_asset_id]
+                for video_asset_id in video_asset_ids if video_asset_id in self._progress
+            }
+
+    def delete(self, video_asset_id):
+        """ Forget the progress of a download that ended """
+        with self._lock:
+            self._progress.pop(video_asset_id, None)
+
+    def reset(self):
+        """ Forget all progress """
+        with self._lock:
+            self._progress.clear()
+
+
+@lru_cache(maxsize=None)
+def get_download_progress_store():
+    """ Return the process-wide store configured by ``settings.DOWNLOAD_PROGRESS`` """
+    config = settings.DOWNLOAD_PROGRESS
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def get_download_progress(video_asset_id):
+    """ Return the progress of the running download of a video asset, None if there is none """
+    return get_download_progress_store().get_many([video_asset_id]).get(video_asset_id)
+
+
+def describe(progress):
+    """ A short human readable summary of a download progress """
+    received = f"{progress.received / (1024 * 1024):.1f} MB"
+    if progress.total:
+        received = f"{received} of {progress.total / (1024 * 1024):.1f} MB ({progress.received / progress.total:.0%})"
+    summary = f"{received} at {progress.rate / (1024 * 1024):.2f} MB/s"
+    if progress.eta is not None:
+        summary = f"{summary}, {int(progress.eta) // 60}m {int(progress.eta) % 60:02d}s left"
+    return summary
+
+
+class DownloadTracker:
+    """ Counts the bytes of a download and reports its progress, at most once every ``REPORT_INTERVAL`` seconds """
+
+    def __init__(self, video_asset, total=None):
+        self.video_asset = video_asset
+        self.total = total
+        self.received = 0
+        self.rate = None
+        self._last_report = (time.monotonic(), 0)
+
+    def add(self, size):
+        """ Count received bytes, reporting the progress if it was not reported for a while """
+        self.received += size
+        now = time.monotonic()
+        if now - self._last_report[0] >= settings.DOWNLOAD_PROGRESS['REPORT_INTERVAL']:
+            self.report(now)
+
+    def report(self, now=None):
+        """ Store and publish the current progress. Failures are logged, never raised """
+        now = time.monotonic() if now is None else now
+        last_time, last_received = self._last_report
+        if now > last_time:
+            rate = (self.received - last_received) / (now - last_time)
+            self.rate = rate if self.rate is None else RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self.rate
+        self._last_report = (now, self.received)
+
+        rate = self.rate or 0
+        eta = max(self.total - self.received, 0) / rate if self.total and rate else None
+        progress = Progress(self.received, self.total, rate, eta, datetime.now(tz=timezone.utc))
+        try:
+            get_download_progress_store().set(self.video_asset.pk, progress)
+        except RedisError as e:
+            logger.warning("Could not store the download progress of VideoAsset %s: %s", self.video_asset.pk, e)
+        publish_video_status(
+            self.video_asset, received=progress.received, total=progress.total, rate=progress.rate, eta=progress.eta
+        )
+
+    def finish(self):
+        """ Forget the progress once the download ended, successfully or not """
+        try:
+            get_download_progress_store().delete(self.video_asset.pk)
+        except RedisError as e:
+            logger.warning("Could not clear the download progress of VideoAsset %s: %s", self.video_asset.pk, e)
@@ -0,0 +1,103 @@
+"""
+Bulk export of the catalog.
+
+Events are read in primary key order through a server-side cursor (unless
+``DISABLE_SERVER_SIDE_CURSORS`` is set for a transaction pooler, in which case
+Django fetches in chunks) and serialized ``CHUNK_SIZE`` at a time with the same
+``EventRowSerializer`` as the listings, plus every video of the event. Only one
+chunk is held in memory, whatever the size of the catalog, and no ``COUNT(*)``
+is run.
+
+Each event is one line of NDJSON, or one CSV row where lists and objects are
+written as JSON. CSV cells that a spreadsheet would run as a formula are
+prefixed with a quote.
+
+Django's ASGI handler reads a sync iterator into a list before sending it, so
+under ASGI the lines are handed over through ``aiter_lines`` instead, a chunk at
+a time from the thread holding the request's database connection.
+"""
+import csv
+import io
+from collections import defaultdict
+from itertools import islice
+
+import orjson
+from asgiref.sync import sync_to_async
+
+from arbisoft_sessions_portal.renderers import dumps
+from events.models import Event, VideoAsset
+from events.v1.serializers import EVENT_FIELDS, EXPANDABLE_EVENT_FIELDS, EventRowSerializer
+
+CHUNK_SIZE = 1000
+EXPORT_FIELDS = (*EVENT_FIELDS, 'videos')
+VIDEO_EXPORT_FIELDS = ('id', 'title', 'status', 'duration', 'file_size', 'created')
+# Leading characters that make spreadsheets read a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _videos_by_event(event_ids):
+    videos = defaultdict(list)
+    rows = VideoAsset.objects.filter(event_id__in=event_ids).order_by('pk').values('event_id', *VIDEO_EXPORT_FIELDS)
+    for row in rows:
+        videos[row.pop('event_id')].append(row)
+    return videos
+
+
+def iter_events(chunk_size=CHUNK_SIZE):
+    """ Yield every event as a dict of EXPORT_FIELDS, in primary key order """
+    serializer = EventRowSerializer(EVENT_FIELDS, EXPANDABLE_EVENT_FIELDS)
+    rows = serializer.values(Event.objects.order_by('pk')).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        videos = _videos_by_event([row['id'] for row in chunk])
+        for row, event in zip(chunk, serializer.to_representation(chunk)):
+            event['videos'] = videos.get(row['id'], [])
+            yield event
+
+
+def iter_ndjson(events):
+    """ Yield each event as a line of JSON bytes """
+    for event in events:
+        yield dumps(event) + b'\n'
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return orjson.dumps(value, default=str).decode()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return '' if value is None else value
+
+
+def iter_csv(events):
+    """ Yield a header line, then each event as a CSV line """
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def take_line():
+        value = line.getvalue()
+        line.seek(0)
+        line.truncate()
+        return value
+
+    writer.writerow(EXPORT_FIELDS)
+    yield take_line()
+    for event in events:
+        writer.writerow([_csv_value(event[field]) for field in EXPORT_FIELDS])
+        yield take_line()
+
+
+async def aiter_lines(lines, chunk_size=CHUNK_SIZE):
+    """ Yield the lines of a sync iterator to async code, reading ``chunk_size`` at a time in the sync thread """
+    take = sync_to_async(lambda: list(islice(lines, chunk_size)), thread_sensitive=True)
+    try:
+        while chunk := await take():
+            for line in chunk:
+                yield line
+    finally:
+        await sync_to_async(lines.close, thread_sensitive=True)()
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', iter_ndjson),
+    'csv': ('text/csv', iter_csv),
+}
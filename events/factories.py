@@ -29,7 +29,7 @@ class EventFactory(factory.django.DjangoModelFactory):
 
     creator = factory.SubFactory(UserFactory)
     title = factory.Faker("sentence", nb_words=4)
-    slug = factory.LazyAttribute(lambda obj: slugify(obj.title))
+    slug = factory.LazyAttributeSequence(lambda obj, n: f"{slugify(obj.title)}-{n}")
     description = factory.Faker("paragraph")
     event_time = factory.LazyFunction(lambda: timezone.now() + timezone.timedelta(days=30))
     event_type = Event.EventType.SESSION
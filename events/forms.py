@@ -3,7 +3,7 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.forms import TextInput
 
-from events.models import Event, EventPresenter, VideoAsset
+from events.models import Event, EventPresenter, PlaylistItem, VideoAsset
 
 User = get_user_model()
 
@@ -83,3 +83,26 @@ class EventPresenterForm(forms.ModelForm):
     class Meta:
         model = EventPresenter
         fields = "__all__"
+
+
+class PlaylistItemForm(forms.ModelForm):
+    """ Custom form for PlaylistItem Model, new items left without a position are appended """
+
+    class Meta:
+        model = PlaylistItem
+        fields = "__all__"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['position'].required = False
+        self.fields['position'].initial = None
+        self.fields['position'].help_text = "Leave blank to add the event at the end of the playlist."
+        if self.instance.pk is None:
+            self.initial.pop('position', None)
+
+    def clean_position(self):
+        """ Keep the position of existing items when it is cleared """
+        position = self.cleaned_data.get('position')
+        if position is None and self.instance.pk is not None:
+            return self.instance.position
+        return position
@@ -0,0 +1,164 @@
+"""
+Home page feed.
+
+The home page shows a few rows of events: what the user was watching, then
+featured, trending and latest events and the events of the most used tags.
+Except for continue watching, rows are the same for everyone, so their event
+ids are computed by ``refresh_home_candidates`` and kept in a shared cache,
+refreshed every ``REFRESH_INTERVAL`` seconds.
+
+Should the periodic refresh fall behind, the first request finding the rows
+older than two intervals refreshes them under a lock while other requests keep
+serving the old rows, so expiry does not send every request to the database.
+Requests compute the rows without caching them when the cache is unreachable.
+
+``get_home_feed`` reads the candidate ids, serializes the events of all rows
+with one ``EventRowSerializer`` pass and splits them back into rows. The number
+of queries does not depend on the number of rows or events. Candidates that
+were unpublished since the last refresh are dropped.
+"""
+import logging
+import time
+
+from redis.exceptions import RedisError
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+
+from events.models import Event, Tag, VideoAsset
+from events.watch_progress import get_watch_progress
+
+logger = logging.getLogger("asp_api")
+
+CANDIDATES_KEY = 'home:candidates'
+REFRESH_LOCK_KEY = 'home:candidates:refreshing'
+
+
+def _cache():
+    return caches[settings.HOME_FEED['CACHE_ALIAS']]
+
+
+def _listed_events():
+    """ Published events with a video, the events listings show """
+    return Event.objects.filter(
+        Exists(VideoAsset.objects.filter(event=OuterRef('pk'))), status=Event.EventStatus.PUBLISHED
+    )
+
+
+def _ids(queryset, size):
+    return list(queryset.values_list('pk', flat=True)[:size])
+
+
+def _tag_rows(size, count):
+    """ The most used tags, each with the ids of its latest listed events """
+    tags = list(Tag.objects.filter(published_event_count__gt=0).order_by('-published_event_count', 'name').values(
+        'id', 'name'
+    )[:count])
+    links = Event.tags.through.objects.filter(
+        tag__in=[tag['id'] for tag in tags], event__in=_listed_events()
+    ).annotate(
+        rank=Window(RowNumber(), partition_by=F('tag'), order_by=(F('event__event_time').desc(), F('event').desc()))
+    ).filter(rank__lte=size).order_by('tag', 'rank').values_list('tag', 'event')
+
+    events = {tag['id']: [] for tag in tags}
+    for tag_id, event_id in links:
+        events[tag_id].append(event_id)
+    return [
+        {'key': f"tag:{tag['id']}", 'title': tag['name'], 'events': events[tag['id']]}
+        for tag in tags if events[tag['id']]
+    ]
+
+
+def _compute_candidates():
+    """ The event ids of the rows shared by all users """
+    config = settings.HOME_FEED
+    size = config['ROW_SIZE']
+    listed = _listed_events()
+    rows = [
+        {'key': 'featured', 'title': 'Featured', 'events': _ids(
+            listed.filter(is_featured=True).order_by('-event_time', '-id'), size
+        )},
+        {'key': 'trending', 'title': 'Trending', 'events': _ids(
+            listed.filter(trending_score__gt=0).order_by('-trending_score', '-id'), size
+        )},
+        {'key': 'latest', 'title': 'Latest', 'events': _ids(listed.order_by('-event_time', '-id'), size)},
+        *_tag_rows(size, config['TAG_ROWS']),
+    ]
+    return rows
+
+
+def refresh_home_candidates():
+    """ Compute the event ids of the rows shared by all users and cache them. Returns the rows """
+    interval = settings.HOME_FEED['REFRESH_INTERVAL']
+    rows = _compute_candidates()
+    # Kept past the next refresh so that a late or failed refresh does not leave the home page without rows
+    _cache().set(CANDIDATES_KEY, {'rows': rows, 'stale_at': time.time() + 2 * interval}, timeout=interval * 3)
+    return rows
+
+
+def get_home_candidates():
+    """
+    The cached rows shared by all users. Rows that are missing or stale are refreshed by
+    the request taking the lock, other requests serve stale rows or compute them uncached.
+    """
+    try:
+        cached = _cache().get(CANDIDATES_KEY)
+        if cached is not None and cached['stale_at'] > time.time():
+            return cached['rows']
+        if _cache().add(REFRESH_LOCK_KEY, True, timeout=settings.HOME_FEED['REFRESH_INTERVAL']):
+            try:
+                return refresh_home_candidates()
+            finally:
+                _cache().delete(REFRESH_LOCK_KEY)
+    except RedisError as e:
+        logger.warning("Could not read the home feed rows from the cache, computing them: %s", e)
+        return _compute_candidates()
+    return _compute_candidates() if cached is None else cached['rows']
+
+
+def _continue_watching(user):
+    """ The events of the videos a user started but did not finish, with their position, most recent first """
+    unfinished = sorted(
+        ((video_asset_id, heartbeat) for video_asset_id, heartbeat in get_watch_progress(user.pk).items()
+         if not heartbeat.completed),
+        key=lambda item: item[1].updated,
+        reverse=True,
+    )[:settings.HOME_FEED['ROW_SIZE']]
+    events = dict(VideoAsset.objects.filter(pk__in=[video_asset_id for video_asset_id, _ in unfinished]).values_list(
+        'pk', 'event_id'
+    ))
+
+    positions = {}
+    for video_asset_id, heartbeat in unfinished:
+        if video_asset_id in events:
+            positions.setdefault(events[video_asset_id], heartbeat.position)
+    return positions
+
+
+def get_home_feed(user, serializer):
+    """
+    Return the rows of the home page of a user, their events serialized by an ``EventRowSerializer``.
+    Events the user started watching carry their playback position.
+    """
+    rows = [dict(row) for row in get_home_candidates()]
+    if user.is_authenticated:
+        positions = _continue_watching(user)
+        rows.insert(0, {'key': 'continue_watching', 'title': 'Continue watching', 'events': list(positions)})
+    else:
+        positions = {}
+
+    event_ids = {event_id for row in rows for event_id in row['events']}
+    values = list(serializer.values(_listed_events().filter(pk__in=event_ids)))
+    events = {value['id']: event for value, event in zip(values, serializer.to_representation(values))}
+
+    feed = []
+    for row in rows:
+        row['events'] = [
+            {**events[event_id], 'position': positions[event_id]} if event_id in positions else events[event_id]
+            for event_id in row['events'] if event_id in events
+        ]
+        if row['events']:
+            feed.append(row)
+    return feed
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Benchmark simulated requests with a new database connection each against persistent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Simulated requests per mode')
+        parser.add_argument('--database', default='default', help='Database alias to benchmark')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        configured = {key: connection.settings_dict[key] for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        modes = {
+            'new connection per request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+            'persistent': {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': False},
+            'persistent + health checks': {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': True},
+        }
+
+        self.stdout.write(
+            f"Configured: CONN_MAX_AGE={configured['CONN_MAX_AGE']} "
+            f"CONN_HEALTH_CHECKS={configured['CONN_HEALTH_CHECKS']}"
+        )
+        self.stdout.write(f"{'mode':<28} {'mean':>10} {'p95':>10}")
+        try:
+            for name, mode in modes.items():
+                connection.close()
+                connection.settings_dict.update(mode)
+                timings = sorted(self._request(connection) for _ in range(options['requests']))
+                mean = sum(timings) / len(timings)
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                self.stdout.write(f"{name:<28} {mean * 1000:>7.2f} ms {p95 * 1000:>7.2f} ms")
+        finally:
+            connection.close()
+            connection.settings_dict.update(configured)
+
+    @staticmethod
+    def _request(connection):
+        """ Time one request cycle: Django closes obsolete connections when a request starts and finishes """
+        start = time.perf_counter()
+        request_started.send(sender=Command)
+        Event.objects.using(connection.alias).filter(status=Event.EventStatus.PUBLISHED).exists()
+        request_finished.send(sender=Command)
+        return time.perf_counter() - start
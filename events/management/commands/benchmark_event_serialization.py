@@ -0,0 +1,89 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from events.models import Event, EventPresenter, Playlist, Tag, VideoAsset
+from events.v1.serializers import EventRowSerializer, EventSerializer
+
+User = get_user_model()
+PAGE_SIZES = (10, 100, 1000)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark EventSerializer against EventRowSerializer on a synthetic catalog (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per page size, the best one counts')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(max(PAGE_SIZES))
+            queryset = Event.objects.filter(title__startswith="Benchmark session").order_by('-event_time', '-id')
+
+            row_serializer = EventRowSerializer()
+            self.stdout.write(f"{'rows':>6} {'EventSerializer':>18} {'EventRowSerializer':>20} {'speedup':>8}")
+            for page_size in PAGE_SIZES:
+                model_rate = self._rows_per_second(
+                    lambda size=page_size: EventSerializer(queryset[:size], many=True).data,
+                    page_size, options['repeat'],
+                )
+                row_rate = self._rows_per_second(
+                    lambda size=page_size: row_serializer.to_representation(row_serializer.values(queryset)[:size]),
+                    page_size, options['repeat'],
+                )
+                self.stdout.write(
+                    f"{page_size:>6} {model_rate:>12.0f} rows/s {row_rate:>14.0f} rows/s {row_rate / model_rate:>7.1f}x"
+                )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _rows_per_second(serialize, page_size, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            serialize()
+            best = min(best, time.perf_counter() - start)
+        return page_size / best
+
+    @staticmethod
+    def _seed(count):
+        creator = User.objects.create(username="benchmark-serialization", email="benchmark@example.com")
+        presenters = User.objects.bulk_create(
+            User(username=f"benchmark-presenter-{i}", first_name="Presenter", last_name=str(i)) for i in range(20)
+        )
+        tags = Tag.objects.bulk_create(Tag(name=f"benchmark-tag-{i}") for i in range(30))
+        playlists = Playlist.objects.bulk_create(Playlist(name=f"benchmark-playlist-{i}") for i in range(10))
+
+        now = timezone.now()
+        events = Event.objects.bulk_create(
+            Event(
+                creator=creator,
+                title=f"Benchmark session {i}",
+                description="Synthetic event description " * 20,
+                event_time=now - timezone.timedelta(hours=i),
+                status=Event.EventStatus.PUBLISHED,
+            )
+            for i in range(count)
+        )
+        VideoAsset.objects.bulk_create(
+            VideoAsset(
+                event=event, title=event.title, status=VideoAsset.VideoStatus.READY, duration=1800,
+                video_file=f"benchmark/{event.pk}.mp4", thumbnail=f"benchmark/{event.pk}.jpg",
+            )
+            for event in events
+        )
+        EventPresenter.objects.bulk_create(
+            EventPresenter(event=event, user=presenters[i % len(presenters)]) for i, event in enumerate(events)
+        )
+        Event.tags.through.objects.bulk_create(
+            Event.tags.through(event=event, tag=tags[(i + offset) % len(tags)])
+            for i, event in enumerate(events) for offset in range(3)
+        )
+        Event.playlists.through.objects.bulk_create(
+            Event.playlists.through(event=event, playlist=playlists[i % len(playlists)])
+            for i, event in enumerate(events)
+        )
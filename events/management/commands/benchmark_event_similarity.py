@@ -0,0 +1,67 @@
+import random
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from events.similarity import BATCH_SIZE, MIN_SCORE, NEIGHBOUR_COUNT, tfidf_matrix, top_neighbours
+
+WORDS = (
+    "python", "django", "react", "kubernetes", "docker", "testing", "design", "patterns", "data", "machine",
+    "learning", "security", "cloud", "devops", "frontend", "backend", "performance", "postgres", "redis",
+    "architecture", "career", "leadership", "agile", "scrum", "mobile", "android", "ios", "flutter", "golang",
+    "rust", "typescript", "javascript", "graphql", "microservices", "observability", "analytics", "product",
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the TF-IDF neighbour computation on synthetic events against a pure Python cosine search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10000, help='Number of synthetic events')
+        parser.add_argument('--sample', type=int, default=20, help='Events searched with pure Python')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Events compared per batch')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        # A long tail of rare words makes the vocabulary as sparse as real descriptions
+        vocabulary = list(WORDS) + [f"term{index}" for index in range(5000)]
+        documents = [
+            rng.choices(WORDS, k=rng.randint(4, 10)) + rng.choices(vocabulary, k=rng.randint(20, 60))
+            for _ in range(options['events'])
+        ]
+
+        start = time.perf_counter()
+        matrix = tfidf_matrix(documents)
+        vectorized = time.perf_counter() - start
+        start = time.perf_counter()
+        neighbours = dict(top_neighbours(matrix, range(matrix.shape[0]), NEIGHBOUR_COUNT, options['batch_size']))
+        searched = time.perf_counter() - start
+
+        rows = [{column: matrix[row, column] for column in matrix[row].indices} for row in range(matrix.shape[0])]
+        sample = rng.sample(range(len(rows)), options['sample'])
+        start = time.perf_counter()
+        naive = {row: self._naive_neighbours(rows, row) for row in sample}
+        naive_per_event = (time.perf_counter() - start) / len(sample)
+
+        agree = sum(
+            {column for column, _ in neighbours[row]} == {column for column, _ in naive[row]} for row in sample
+        )
+        self.stdout.write(f"Events: {len(documents)}, vocabulary: {matrix.shape[1]}, nonzeros: {matrix.nnz}")
+        self.stdout.write(f"  TF-IDF matrix:           {vectorized * 1000:>10.0f} ms")
+        self.stdout.write(f"  top {NEIGHBOUR_COUNT} neighbours (all): {searched * 1000:>10.0f} ms")
+        self.stdout.write(
+            f"  pure Python (estimated): {naive_per_event * len(rows) * 1000:>10.0f} ms "
+            f"({naive_per_event * 1000:.1f} ms per event)"
+        )
+        style = self.style.SUCCESS if agree == len(sample) else self.style.WARNING
+        self.stdout.write(style(f"Sampled events with identical neighbours: {agree}/{len(sample)}"))
+
+    @staticmethod
+    def _naive_neighbours(rows, row):
+        vector = rows[row]
+        scores = Counter({
+            other: sum(weight * others.get(term, 0) for term, weight in vector.items())
+            for other, others in enumerate(rows) if other != row
+        })
+        return [(other, score) for other, score in scores.most_common(NEIGHBOUR_COUNT) if score >= MIN_SCORE]
@@ -0,0 +1,73 @@
+import time
+
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework.renderers import JSONRenderer
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from arbisoft_sessions_portal.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = "Benchmark the orjson renderer against DRF's JSONRenderer on event pages and the OpenAPI schema"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Timed renders per payload, the best one counts')
+
+    def handle(self, *args, **options):
+        payloads = {
+            f"events page ({size} rows)": self._events_page(size) for size in (10, 100, 1000)
+        }
+        payloads['OpenAPI schema'] = SchemaGenerator().get_schema(request=None, public=True)
+
+        self.stdout.write(f"{'payload':<24} {'bytes':>9} {'JSONRenderer':>14} {'ORJSONRenderer':>16} {'speedup':>8}")
+        for name, data in payloads.items():
+            drf_output = JSONRenderer().render(data)
+            orjson_output = ORJSONRenderer().render(data)
+            drf_time = self._best_time(JSONRenderer().render, data, options['repeat'])
+            orjson_time = self._best_time(ORJSONRenderer().render, data, options['repeat'])
+            self.stdout.write(
+                f"{name:<24} {len(drf_output):>9} {drf_time * 1000:>11.2f} ms {orjson_time * 1000:>13.2f} ms "
+                f"{drf_time / orjson_time:>7.1f}x" + ("" if drf_output == orjson_output else "  OUTPUT DIFFERS")
+            )
+
+    @staticmethod
+    def _best_time(render, data, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render(data)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    @staticmethod
+    def _events_page(size):
+        now = timezone.now()
+        return {
+            'count': size,
+            'next': None,
+            'previous': None,
+            'results': [
+                {
+                    'id': i,
+                    'title': f"Benchmark session {i}",
+                    'slug': f"benchmark-session-{i}",
+                    'description': "Synthetic event description " * 20,
+                    'publisher': {'id': 1, 'first_name': "Jane", 'last_name': "Doe"},
+                    'event_time': now - timezone.timedelta(hours=i),
+                    'event_type': "SESSION",
+                    'status': "PUBLISHED",
+                    'is_featured': i % 10 == 0,
+                    'tags': ["python", "django", "performance"],
+                    'thumbnail': f"/media/thumbnails/{i}.jpg",
+                    'video_duration': 1800,
+                    'presenters': [
+                        {'user_id': 2, 'first_name': "John", 'last_name': "Roe", 'email': "john@example.com"},
+                    ],
+                    'playlists': ["Tech talks"],
+                    'video_file': f"/media/videos/{i}.mp4",
+                }
+                for i in range(size)
+            ],
+        }
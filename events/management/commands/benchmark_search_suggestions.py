@@ -0,0 +1,72 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from events.models import SearchSuggestion
+from events.suggestions import _suggestion_rows, get_suggestions
+
+WORDS = (
+    "python", "django", "react", "kubernetes", "docker", "testing", "design", "patterns", "data", "machine",
+    "learning", "security", "cloud", "devops", "frontend", "backend", "performance", "postgres", "redis",
+    "architecture", "career", "leadership", "agile", "scrum", "mobile", "android", "ios", "flutter", "golang",
+    "rust", "typescript", "javascript", "graphql", "microservices", "observability", "analytics", "product",
+)
+TARGET_MS = 10
+
+
+class Command(BaseCommand):
+    help = 'Benchmark search suggestion lookups against a synthetic catalog (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=5000, help='Number of synthetic event titles')
+        parser.add_argument('--queries', type=int, default=1000, help='Number of prefix lookups to time')
+        parser.add_argument('--limit', type=int, default=5, help='Suggestions per kind')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            SearchSuggestion.objects.all().delete()
+            SearchSuggestion.objects.bulk_create(self._synthetic_rows(rng, options['events']), batch_size=5000)
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {SearchSuggestion._meta.db_table}")
+
+            prefixes = [rng.choice(WORDS)[:rng.randint(1, 5)] for _ in range(options['queries'])]
+            timings = []
+            for prefix in prefixes:
+                start = time.perf_counter()
+                get_suggestions(prefix, options['limit'])
+                timings.append((time.perf_counter() - start) * 1000)
+
+            transaction.set_rollback(True)
+
+        self._report(timings)
+
+    @staticmethod
+    def _synthetic_rows(rng, event_count):
+        kinds = SearchSuggestion.SuggestionKind
+        rows = []
+        for index in range(event_count):
+            title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))).capitalize()
+            rows += _suggestion_rows(kinds.TITLE, index, title, rng.randint(0, 20000), f"event-{index}")
+        for index, word in enumerate(WORDS):
+            rows += _suggestion_rows(kinds.TAG, index, word.title(), rng.randint(1, 500))
+            rows += _suggestion_rows(kinds.PLAYLIST, index, f"{word.title()} series", rng.randint(1, 50))
+            rows += _suggestion_rows(kinds.PRESENTER, index, f"{word.title()} Presenter", rng.randint(1, 30))
+        return rows
+
+    def _report(self, timings):
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(f"Lookups: {len(timings)}")
+        self.stdout.write(f"  mean: {statistics.mean(timings):.2f} ms")
+        self.stdout.write(f"  p50:  {statistics.median(timings):.2f} ms")
+        self.stdout.write(f"  p95:  {p95:.2f} ms")
+        self.stdout.write(f"  p99:  {timings[int(len(timings) * 0.99) - 1]:.2f} ms")
+        self.stdout.write(f"  max:  {timings[-1]:.2f} ms")
+
+        style = self.style.SUCCESS if p95 < TARGET_MS else self.style.ERROR
+        self.stdout.write(style(f"p95 target of {TARGET_MS} ms {'met' if p95 < TARGET_MS else 'missed'}"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from arbisoft_sessions_portal.schema import schema_artifact_path, write_schema_artifact
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema artifact for the current CODE_VERSION'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate the artifact even if it already exists')
+
+    def handle(self, *args, **options):
+        path = schema_artifact_path()
+        if path is None:
+            self.stdout.write(self.style.WARNING(
+                "CODE_VERSION is not set, the schema will be generated on first request instead"
+            ))
+            return
+        if path.exists() and not options['force']:
+            self.stdout.write(f"OpenAPI schema for this version already exists at {path}")
+            return
+
+        write_schema_artifact()
+        self.stdout.write(self.style.SUCCESS(f"Wrote OpenAPI schema to {path}"))
@@ -6,6 +6,7 @@ from celery.result import AsyncResult
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 
+from events.download_progress import describe, get_download_progress_store
 from events.models import VideoAsset
 
 logger = logging.getLogger(__name__)
@@ -79,6 +80,9 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f"\n=== Video Assets Status ({video_assets.count()} assets) ===\n"))
 
         status_counts = {}
+        progress = get_download_progress_store().get_many(
+            asset.pk for asset in video_assets if asset.status == VideoAsset.VideoStatus.PROCESSING
+        )
 
         for asset in video_assets:
 
@@ -95,6 +99,9 @@ class Command(BaseCommand):
             self.stdout.write(f"  Created: {created_date}")
             self.stdout.write(f"  Status: {asset.status}")
 
+            if asset.pk in progress:
+                self.stdout.write(f"  Download: {describe(progress[asset.pk])}")
+
             if hasattr(asset, 'video_file') and asset.video_file:
                 self.stdout.write(f"  File: {asset.video_file}")
 
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from events.export import CHUNK_SIZE, EXPORT_FORMATS, iter_events
+
+
+class Command(BaseCommand):
+    help = 'Export every event, with its relations and videos, as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson', dest='export_format')
+        parser.add_argument('--output', help='File to write, standard output if not given')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Events serialized at a time')
+
+    def handle(self, *args, **options):
+        _, encode = EXPORT_FORMATS[options['export_format']]
+        lines = (
+            line.decode() if isinstance(line, bytes) else line
+            for line in encode(iter_events(options['chunk_size']))
+        )
+
+        if options['output'] is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            output.writelines(lines)
+        self.stderr.write(self.style.SUCCESS(f"Exported events to {options['output']}"))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.similarity import BATCH_SIZE, NEIGHBOUR_COUNT, rebuild_event_neighbours
+
+
+class Command(BaseCommand):
+    help = 'Recompute the content-based similar events of every published event'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbours', type=int, default=NEIGHBOUR_COUNT, help='Similar events kept per event')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Events compared per batch')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = rebuild_event_neighbours(options['neighbours'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt event neighbours: {count} rows in {time.perf_counter() - start:.2f}s"
+        ))
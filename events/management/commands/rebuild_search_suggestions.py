@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from events.suggestions import rebuild_search_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search box autocomplete suggestions from the current catalog'
+
+    def handle(self, *args, **options):
+        count = rebuild_search_suggestions()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search suggestions: {count} terms"))
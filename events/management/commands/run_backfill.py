@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.backfills import BACKFILLS, get_backfill
+from events.models import BackfillCheckpoint
+
+
+class Command(BaseCommand):
+    help = 'Run a registered backfill in primary key batches, resuming from its last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', help=f"Backfill to run: {', '.join(sorted(BACKFILLS))}")
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per batch and transaction')
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.1,
+            help='Seconds to sleep between batches to leave room for regular traffic'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint and start over from the first row'
+        )
+        parser.add_argument('--list', action='store_true', help='List the backfills and their progress')
+
+    def handle(self, *args, **options):
+        if options['list'] or not options['name']:
+            self._list()
+            return
+
+        try:
+            backfill = get_backfill(options['name'])
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        def report(checkpoint, rows_per_second):
+            self.stdout.write(
+                f"{checkpoint.name}: {checkpoint.rows_processed} rows done, "
+                f"last pk {checkpoint.last_pk}, {rows_per_second:.0f} rows/sec"
+            )
+
+        started = time.perf_counter()
+        checkpoint = backfill.run(
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            restart=options['restart'],
+            report=report,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfill {checkpoint.name} complete: {checkpoint.rows_processed} rows in total, "
+            f"this run took {elapsed:.1f}s"
+        ))
+
+    def _list(self):
+        checkpoints = {checkpoint.name: checkpoint for checkpoint in BackfillCheckpoint.objects.all()}
+        for name in sorted(BACKFILLS):
+            checkpoint = checkpoints.get(name)
+            if checkpoint is None:
+                state = 'not started'
+            elif checkpoint.completed:
+                state = f"completed {checkpoint.completed:%Y-%m-%d %H:%M}, {checkpoint.rows_processed} rows"
+            else:
+                state = f"in progress, {checkpoint.rows_processed} rows, last pk {checkpoint.last_pk}"
+            self.stdout.write(f"{name}: {state}")
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.21 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_add_pg_trgm_extension'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='last_used',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='published_event_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='last_used',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='published_event_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+    ]
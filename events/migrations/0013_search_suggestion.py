@@ -0,0 +1,28 @@
+# Generated by Django 4.2.21 on 2026-10-19 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_tag_playlist_usage_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('TITLE', 'Title'), ('TAG', 'Tag'), ('PLAYLIST', 'Playlist'), ('PRESENTER', 'Presenter')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('term', models.CharField(max_length=255)),
+                ('text', models.CharField(max_length=255)),
+                ('slug', models.SlugField(blank=True, max_length=255, null=True)),
+                ('weight', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term'], name='suggestion_term_prefix_idx', opclasses=['varchar_pattern_ops'])],
+            },
+        ),
+    ]
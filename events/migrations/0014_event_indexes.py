@@ -0,0 +1,52 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def deduplicate_event_slugs(apps, schema_editor):
+    """ Make slugs unique before the unique index is created, keeping the oldest event's slug as is """
+    Event = apps.get_model('events', 'Event')
+
+    Event.objects.filter(slug='').update(slug=None)
+
+    duplicated = Event.objects.exclude(slug=None).values('slug').annotate(total=Count('id')).filter(total__gt=1)
+    taken = set(Event.objects.exclude(slug=None).values_list('slug', flat=True))
+    for slug in duplicated.values_list('slug', flat=True):
+        for event in Event.objects.filter(slug=slug).order_by('id')[1:]:
+            new_slug = f"{slug}-{event.id}"
+            while new_slug in taken:
+                new_slug = f"{new_slug}-{event.id}"
+            taken.add(new_slug)
+            event.slug = new_slug
+            event.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_search_suggestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_event_slugs, reverse_code=migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='event',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('status', 'PUBLISHED')), fields=['-event_time', '-id'], name='event_published_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', '-event_time'], name='event_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['event_type', 'status', '-event_time'], name='event_type_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['is_featured', 'status', '-event_time'], name='event_featured_time_idx'),
+        ),
+    ]
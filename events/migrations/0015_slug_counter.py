@@ -0,0 +1,24 @@
+# Generated by Django 4.2.21 on 2026-10-19 11:59
+
+from django.db import migrations, models
+import events.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_event_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlugCounter',
+            fields=[
+                ('base', models.SlugField(max_length=255, primary_key=True, serialize=False)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+            managers=[
+                ('objects', events.models.SlugCounterManager()),
+            ],
+        ),
+    ]
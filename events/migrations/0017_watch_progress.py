@@ -0,0 +1,34 @@
+# Generated by Django 4.2.21 on 2026-10-19 12:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0016_backfill_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_progress', to=settings.AUTH_USER_MODEL)),
+                ('video_asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_progress', to='events.videoasset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-updated'], name='watch_progress_recent_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='watchprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'video_asset'), name='watch_progress_user_video_uniq'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.21 on 2026-10-19 12:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0017_watch_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('unique_viewers', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('status', 'PUBLISHED')), fields=['-trending_score', '-id'], name='event_trending_idx'),
+        ),
+        migrations.AddField(
+            model_name='eventdailystats',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='events.event'),
+        ),
+        migrations.AddIndex(
+            model_name='eventdailystats',
+            index=models.Index(fields=['date'], name='event_daily_stats_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventdailystats',
+            constraint=models.UniqueConstraint(fields=('event', 'date'), name='event_daily_stats_event_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.21 on 2026-10-19 12:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0018_event_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventNeighbour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='events.event')),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbour_of', to='events.event')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='eventneighbour',
+            constraint=models.UniqueConstraint(fields=('event', 'neighbour'), name='event_neighbour_uniq'),
+        ),
+    ]
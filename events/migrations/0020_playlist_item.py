@@ -0,0 +1,59 @@
+# Generated by Django 4.2.21 on 2026-10-19 12:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Existing playlists keep the order they were listed in, oldest event first
+NUMBER_POSITIONS_SQL = """
+UPDATE events_event_playlists SET position = ranked.position
+FROM (
+    SELECT item.id, ROW_NUMBER() OVER (
+        PARTITION BY item.playlist_id ORDER BY event.event_time, event.id
+    ) - 1 AS position
+    FROM events_event_playlists item JOIN events_event event ON event.id = item.event_id
+) ranked
+WHERE events_event_playlists.id = ranked.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0019_event_neighbour'),
+    ]
+
+    operations = [
+        # The automatic many-to-many table already has these columns and its unique constraint
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='PlaylistItem',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='playlist_items', to='events.event')),
+                        ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='events.playlist')),
+                    ],
+                    options={
+                        'db_table': 'events_event_playlists',
+                        'unique_together': {('event', 'playlist')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='event',
+                    name='playlists',
+                    field=models.ManyToManyField(blank=True, related_name='events', through='events.PlaylistItem', to='events.playlist'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='playlistitem',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(NUMBER_POSITIONS_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='playlistitem',
+            index=models.Index(fields=['playlist', 'position', 'event'], name='playlist_item_position_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.21 on 2026-10-19 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0020_playlist_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('EVENT', 'Event'), ('TAG', 'Tag'), ('PLAYLIST', 'Playlist'), ('VIDEO_ASSET', 'Video asset')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('UPSERT', 'Created or updated'), ('DELETE', 'Deleted')], max_length=10)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
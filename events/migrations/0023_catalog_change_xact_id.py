@@ -0,0 +1,24 @@
+# Generated by Django 4.2.21 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0022_video_upload'),
+    ]
+
+    operations = [
+        # Changes logged before have all been committed, they sort before any new one
+        migrations.AddField(
+            model_name='catalogchange',
+            name='xact_id',
+            field=models.BigIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='catalogchange',
+            index=models.Index(fields=['xact_id', 'id'], name='catalog_change_order_idx'),
+        ),
+    ]
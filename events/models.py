@@ -1,5 +1,6 @@
 import logging
 import os
+from collections import defaultdict
 
 import ffmpeg
 
@@ -7,7 +8,10 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.base import File
 from django.core.files.storage import FileSystemStorage
-from django.db import models
+from django.db import connections, models, router
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
 logger = logging.getLogger("asp_api")
@@ -23,13 +27,43 @@ thumbnail_storage = FileSystemStorage(
 )
 
 
+class EventUsageQuerySet(models.QuerySet):
+    """ QuerySet for models that keep a count of the published events using them """
+
+    def _published_event_count(self):
+        """ The number of published events using each row, computed from the events """
+        event_field = self.model._meta.get_field('events').field.name
+        published_events = Event.objects.filter(
+            status=Event.EventStatus.PUBLISHED,
+            **{event_field: OuterRef('pk')}
+        ).order_by().values(event_field).annotate(count=Count('pk')).values('count')
+        return Coalesce(Subquery(published_events), 0)
+
+    def refresh_published_event_counts(self, **fields):
+        """
+        Recompute published_event_count for every row in the queryset with a single UPDATE.
+        Any extra ``fields`` are set in the same statement.
+        """
+        return self.update(published_event_count=self._published_event_count(), **fields)
+
+    def stale_published_event_counts(self):
+        """ The rows whose published_event_count differs from the number of published events using them """
+        return self.alias(actual_count=self._published_event_count()).exclude(
+            published_event_count=F('actual_count')
+        )
+
+
 class Tag(models.Model):
     """ Model to store tags for events """
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    published_event_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    last_used = models.DateTimeField(null=True, blank=True, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
+    objects = EventUsageQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -38,13 +72,108 @@ class Playlist(models.Model):
     """ Model to store playlists for events """
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    published_event_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    last_used = models.DateTimeField(null=True, blank=True, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
+    objects = EventUsageQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
 
+SLUG_NUMBER_RESERVE = 11  # room for a "-<number>" suffix within the slug max_length
+
+
+def slug_base(title):
+    """ Return the unnumbered slug for an event title """
+    max_length = Event._meta.get_field('slug').max_length - SLUG_NUMBER_RESERVE
+    return slugify(title)[:max_length].strip('-') or 'event'
+
+
+def numbered_slug(base, number):
+    """ Return the slug for the nth event sharing a base slug, the first one gets the base itself """
+    return base if number == 1 else f"{base}-{number}"
+
+
+class SlugCounterManager(models.Manager):
+    """ Manager handing out slug numbers from per base slug counters """
+    use_in_migrations = True
+
+    def reserve(self, base, count=1):
+        """
+        Reserve ``count`` consecutive numbers for a base slug with a single upsert
+        and return the first of them. Concurrent callers never get the same number.
+        """
+        db_connection = connections[self.db]
+        table = db_connection.ops.quote_name(self.model._meta.db_table)
+        with db_connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (base, last_number) VALUES (%s, %s) "
+                f"ON CONFLICT (base) DO UPDATE SET last_number = {table}.last_number + EXCLUDED.last_number "
+                "RETURNING last_number",
+                [base, count],
+            )
+            return cursor.fetchone()[0] - count + 1
+
+    def allocate(self, titles):
+        """
+        Return a unique slug for every title, in order.
+        Titles sharing a base slug reserve their numbers together, and slugs already
+        taken by existing events (set by hand or by older slug schemes) are skipped.
+        """
+        event_model = self.model._meta.apps.get_model('events', 'Event')
+        bases = [slug_base(title) for title in titles]
+        slugs = [None] * len(titles)
+
+        pending = list(range(len(titles)))
+        while pending:
+            by_base = defaultdict(list)
+            for index in pending:
+                by_base[bases[index]].append(index)
+
+            candidates = {}
+            for base, indexes in by_base.items():
+                first = self.reserve(base, len(indexes))
+                candidates.update((index, numbered_slug(base, first + offset)) for offset, index in enumerate(indexes))
+
+            taken = set(
+                event_model.objects.using(self.db).filter(
+                    slug__in=candidates.values()
+                ).values_list('slug', flat=True)
+            )
+            pending = [index for index, slug in candidates.items() if slug in taken]
+            for index, slug in candidates.items():
+                if slug not in taken:
+                    slugs[index] = slug
+        return slugs
+
+
+class SlugCounter(models.Model):
+    """ Model to store the last number handed out for each base slug """
+    base = models.SlugField(max_length=255, primary_key=True)
+    last_number = models.PositiveIntegerField(default=0)
+
+    objects = SlugCounterManager()
+
+    def __str__(self):
+        return f"{self.base} ({self.last_number})"
+
+
+class EventQuerySet(models.QuerySet):
+    """ QuerySet for events that allocates missing slugs on bulk creation """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """ Allocate slugs for all events without one, then insert them """
+        objs = list(objs)
+        missing_slug = [event for event in objs if not event.slug]
+        slugs = SlugCounter.objects.db_manager(self.db).allocate([event.title for event in missing_slug])
+        for event, slug in zip(missing_slug, slugs):
+            event.slug = slug
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Event(models.Model):
     """ Model to store events """
     class EventType(models.TextChoices):
@@ -59,22 +188,60 @@ class Event(models.Model):
 
     creator = models.ForeignKey(User, on_delete=models.DO_NOTHING, related_name='events')
     title = models.CharField(max_length=255)
-    slug = models.SlugField(max_length=255, blank=True, null=True)
+    slug = models.SlugField(max_length=255, unique=True, blank=True, null=True)
     description = models.TextField()
     event_time = models.DateTimeField()
     event_type = models.CharField(max_length=20, choices=EventType.choices, default=EventType.SESSION)
     status = models.CharField(max_length=20, choices=EventStatus.choices, default=EventStatus.DRAFT)
     workstream_id = models.CharField(max_length=100, blank=True, null=True)
     is_featured = models.BooleanField(default=False)
+    trending_score = models.FloatField(default=0)  # time-decayed views, see events.popularity
     tags = models.ManyToManyField(Tag, related_name='events', blank=True)
-    playlists = models.ManyToManyField(Playlist, related_name='events', blank=True)
+    playlists = models.ManyToManyField(Playlist, through='PlaylistItem', related_name='events', blank=True)
     presenters = models.ManyToManyField(User, through='EventPresenter', related_name='events_presented')
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Published listings, newest first, with id as the tie breaker
+            models.Index(
+                fields=['-event_time', '-id'], name='event_published_time_idx', condition=Q(status='PUBLISHED')
+            ),
+            # EventFilter fields combined with the default newest first ordering
+            models.Index(fields=['status', '-event_time'], name='event_status_time_idx'),
+            models.Index(fields=['event_type', 'status', '-event_time'], name='event_type_status_time_idx'),
+            models.Index(fields=['is_featured', 'status', '-event_time'], name='event_featured_time_idx'),
+            models.Index(
+                fields=['-trending_score', '-id'], name='event_trending_idx', condition=Q(status='PUBLISHED')
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """ Remember the stored status, so that saving can tell a status change without querying it again """
+        instance = super().from_db(db, field_names, values)
+        instance.__dict__['_loaded_status'] = instance.__dict__.get('status')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        """ Remember the status read again """
+        super().refresh_from_db(using, fields)
+        if 'status' in self.__dict__:
+            self.__dict__['_loaded_status'] = self.status
+
+    def save(self, *args, **kwargs):
+        """ Allocate a unique slug before the first insert so no follow-up update is needed """
+        if self._state.adding and not self.slug:
+            using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+            self.slug = SlugCounter.objects.db_manager(using).allocate([self.title])[0]
+        super().save(*args, **kwargs)
+
 
 class VideoAsset(models.Model):
     """ Model to store video assets """
@@ -178,3 +345,193 @@ class EventPresenter(models.Model):
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name}"
+
+
+class PlaylistItemQuerySet(models.QuerySet):
+    """ QuerySet for the ordered events of playlists """
+
+    def last_positions(self):
+        """ The position of the last item in the queryset of each playlist, by playlist id """
+        return dict(self.order_by().values('playlist').annotate(last=Max('position')).values_list('playlist', 'last'))
+
+
+class PlaylistItem(models.Model):
+    """ Model to store the events of a playlist, in order """
+    playlist = models.ForeignKey(Playlist, on_delete=models.CASCADE, related_name='items')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='playlist_items')
+    # Events added without a position are appended, see events.signals and events.admin
+    position = models.PositiveIntegerField(default=0)
+
+    objects = PlaylistItemQuerySet.as_manager()
+
+    class Meta:
+        # The table used to be the automatic many-to-many table of Event.playlists
+        db_table = 'events_event_playlists'
+        unique_together = ('event', 'playlist')
+        indexes = [
+            models.Index(fields=['playlist', 'position', 'event'], name='playlist_item_position_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.playlist_id} #{self.position}: {self.event_id}"
+
+
+class EventDailyStats(models.Model):
+    """ Model to store the views of an event per day, rolled up from the Redis view counters """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    plays = models.PositiveIntegerField(default=0)
+    unique_viewers = models.PositiveIntegerField(default=0)  # approximate, counted with HyperLogLog
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'date'], name='event_daily_stats_event_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='event_daily_stats_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} on {self.date}: {self.plays} plays"
+
+
+class EventNeighbour(models.Model):
+    """ Model to store the most similar published events of an event, computed by events.similarity """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='neighbours')
+    neighbour = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='neighbour_of')
+    score = models.FloatField()  # cosine similarity of the TF-IDF vectors, in (0, 1]
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'neighbour'], name='event_neighbour_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} ~ {self.neighbour_id}: {self.score:.3f}"
+
+
+class SearchSuggestion(models.Model):
+    """
+    Model to store prefix-searchable terms for search box autocomplete.
+    Each suggestion is stored once per word it can be matched from, so typing
+    the start of any word of a title or name finds it with an index range scan.
+    """
+    class SuggestionKind(models.TextChoices):
+        """ Enum for suggestion kinds """
+        TITLE = "TITLE", _("Title")
+        TAG = "TAG", _("Tag")
+        PLAYLIST = "PLAYLIST", _("Playlist")
+        PRESENTER = "PRESENTER", _("Presenter")
+
+    kind = models.CharField(max_length=20, choices=SuggestionKind.choices)
+    object_id = models.BigIntegerField()
+    term = models.CharField(max_length=255)
+    text = models.CharField(max_length=255)
+    slug = models.SlugField(max_length=255, blank=True, null=True)
+    weight = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term'], name='suggestion_term_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.text}"
+
+
+class CatalogChange(models.Model):
+    """
+    Model to store an append-only log of catalog changes, read by the changes endpoint.
+    Changes are read in the order of the transaction that wrote them, then of id, and
+    the id of the last one read is the sync cursor; a change only says which object
+    changed, clients receive its state as of when they read the log.
+    """
+    class ObjectKind(models.TextChoices):
+        """ Enum for the kinds of changed objects """
+        EVENT = "EVENT", _("Event")
+        TAG = "TAG", _("Tag")
+        PLAYLIST = "PLAYLIST", _("Playlist")
+        VIDEO_ASSET = "VIDEO_ASSET", _("Video asset")
+
+    class ChangeAction(models.TextChoices):
+        """ Enum for change actions """
+        UPSERT = "UPSERT", _("Created or updated")
+        DELETE = "DELETE", _("Deleted")
+
+    kind = models.CharField(max_length=20, choices=ObjectKind.choices)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ChangeAction.choices)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    # pg_current_xact_id() of the transaction that wrote the change
+    xact_id = models.BigIntegerField(editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['xact_id', 'id'], name='catalog_change_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.action} {self.kind} {self.object_id}"
+
+
+class BackfillCheckpoint(models.Model):
+    """ Model to store the progress of a batched backfill so it can resume """
+    name = models.CharField(max_length=100, unique=True)
+    last_pk = models.BigIntegerField(default=0)
+    rows_processed = models.BigIntegerField(default=0)
+    completed = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    def restart(self):
+        """ Forget the progress so the backfill starts over from the first row """
+        self.last_pk = 0
+        self.rows_processed = 0
+        self.completed = None
+        self.save(update_fields=['last_pk', 'rows_processed', 'completed', 'modified'])
+
+
+class WatchProgress(models.Model):
+    """
+    Model to store how far a user has watched a video.
+    Rows are written in batches from buffered player heartbeats, see events.watch_progress.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='watch_progress')
+    video_asset = models.ForeignKey(VideoAsset, on_delete=models.CASCADE, related_name='watch_progress')
+    position = models.PositiveIntegerField(default=0)  # in seconds
+    completed = models.BooleanField(default=False)
+    updated = models.DateTimeField()  # time of the latest heartbeat, not of the write
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'video_asset'], name='watch_progress_user_video_uniq'),
+        ]
+        indexes = [
+            # Continue watching, most recently watched first
+            models.Index(fields=['user', '-updated'], name='watch_progress_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.video_asset_id}: {self.position}s"
+
+
+class VideoUpload(models.Model):
+    """
+    Model to store a resumable upload of a video file, see events.uploads.
+    Chunks are written in place into ``file_name`` of the video storage, of which
+    the first ``offset`` bytes out of ``length`` have been received.
+    """
+    video_asset = models.OneToOneField(VideoAsset, on_delete=models.CASCADE, related_name='upload')
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='video_uploads')
+    file_name = models.CharField(max_length=255)
+    length = models.BigIntegerField()  # in bytes
+    offset = models.BigIntegerField(default=0)  # in bytes
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+    completed = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.file_name}: {self.offset}/{self.length}"
@@ -0,0 +1,158 @@
+"""
+View counting and trending ranking.
+
+Opening a video counts a play (a Redis hash increment) and its viewer (a
+HyperLogLog per event) in the counters of the current UTC day. Daily counters
+only grow, so ``rollup_event_views`` can copy their current values into
+``EventDailyStats`` as often as it runs: the upsert is idempotent and no
+counter is ever reset.
+
+After each rollup ``update_trending_scores`` stores on every event the sum of
+its daily views over the last ``WINDOW_DAYS`` days, each day weighted by
+``0.5 ** (age / HALF_LIFE_DAYS)``. Listings then rank by popularity through an
+index on ``Event.trending_score`` without reading any view data.
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from functools import lru_cache
+
+from redis.exceptions import RedisError
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from arbisoft_sessions_portal.services.redis.redis_client import get_redis_client
+from events.models import Event, EventDailyStats
+
+logger = logging.getLogger("asp_api")
+
+# Repeated plays by the same viewers count for less than new viewers
+PLAYS_WEIGHT = 0.25
+# Counters are kept a little longer than a day so late rollups still find them
+COUNTER_TTL = 3 * 24 * 60 * 60
+
+
+class RedisViewCounter:
+    """ View counter keeping per day play counts and HyperLogLogs of viewers in Redis """
+
+    def __init__(self, key_prefix='views:', **kwargs):  # pylint: disable=unused-argument
+        self.key_prefix = key_prefix
+
+    def _plays_key(self, day):
+        return f"{self.key_prefix}{day.isoformat()}:plays"
+
+    def _viewers_key(self, day, event_id):
+        return f"{self.key_prefix}{day.isoformat()}:viewers:{event_id}"
+
+    def record(self, event_id, viewer_id, day):
+        """ Count a play of an event by a viewer """
+        plays_key, viewers_key = self._plays_key(day), self._viewers_key(day, event_id)
+        pipeline = get_redis_client().pipeline(transaction=False)
+        pipeline.hincrby(plays_key, event_id, 1)
+        pipeline.pfadd(viewers_key, viewer_id)
+        pipeline.expire(plays_key, COUNTER_TTL)
+        pipeline.expire(viewers_key, COUNTER_TTL)
+        pipeline.execute()
+
+    def counts(self, day):
+        """ Return ``{event_id: (plays, unique_viewers)}`` for a day """
+        client = get_redis_client()
+        plays = {int(event_id): int(count) for event_id, count in client.hgetall(self._plays_key(day)).items()}
+        pipeline = client.pipeline(transaction=False)
+        for event_id in plays:
+            pipeline.pfcount(self._viewers_key(day, event_id))
+        return {event_id: (plays[event_id], viewers) for event_id, viewers in zip(plays, pipeline.execute())}
+
+
+class InMemoryViewCounter:
+    """ Process-local view counter with exact viewer sets, used in tests and single-process setups """
+
+    def __init__(self, **kwargs):  # pylint: disable=unused-argument
+        self._plays = defaultdict(lambda: defaultdict(int))
+        self._viewers = defaultdict(lambda: defaultdict(set))
+        self._lock = threading.Lock()
+
+    def record(self, event_id, viewer_id, day):
+        """ Count a play of an event by a viewer """
+        with self._lock:
+            self._plays[day][event_id] += 1
+            self._viewers[day][event_id].add(viewer_id)
+
+    def counts(self, day):
+        """ Return ``{event_id: (plays, unique_viewers)}`` for a day """
+        with self._lock:
+            return {
+                event_id: (plays, len(self._viewers[day][event_id]))
+                for event_id, plays in self._plays[day].items()
+            }
+
+    def reset(self):
+        """ Forget all counters """
+        with self._lock:
+            self._plays.clear()
+            self._viewers.clear()
+
+
+@lru_cache(maxsize=None)
+def get_view_counter():
+    """ Return the process-wide view counter configured by ``settings.VIEW_COUNTER`` """
+    config = settings.VIEW_COUNTER
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def record_view(event_id, viewer_id):
+    """ Count a play of an event by a viewer today. Failures are logged, never raised """
+    try:
+        get_view_counter().record(event_id, viewer_id, timezone.now().date())
+    except RedisError as e:
+        logger.warning("Could not count a view of Event %s: %s", event_id, e)
+
+
+def rollup_event_views(days=(1, 0)):
+    """
+    Copy the view counters of recent days, by default yesterday and today, into EventDailyStats
+    and refresh the trending scores. Returns the number of daily rows written.
+    """
+    today = timezone.now().date()
+    rows = []
+    for day in (today - timedelta(days=age) for age in days):
+        counts = get_view_counter().counts(day)
+        existing = set(Event.objects.filter(pk__in=counts).values_list('pk', flat=True))
+        rows.extend(
+            EventDailyStats(event_id=event_id, date=day, plays=plays, unique_viewers=viewers)
+            for event_id, (plays, viewers) in counts.items() if event_id in existing
+        )
+    EventDailyStats.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['event', 'date'], update_fields=['plays', 'unique_viewers'],
+    )
+    update_trending_scores(today)
+    return len(rows)
+
+
+def update_trending_scores(today=None):
+    """ Recompute ``Event.trending_score`` from the daily stats of the trending window """
+    config = settings.TRENDING
+    today = today or timezone.now().date()
+    start = today - timedelta(days=config['WINDOW_DAYS'] - 1)
+
+    decay = Case(
+        *[
+            When(date=today - timedelta(days=age), then=Value(0.5 ** (age / config['HALF_LIFE_DAYS'])))
+            for age in range(config['WINDOW_DAYS'])
+        ],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    scores = EventDailyStats.objects.filter(event=OuterRef('pk'), date__gte=start).values('event').annotate(
+        score=Sum((F('unique_viewers') + F('plays') * PLAYS_WEIGHT) * decay, output_field=FloatField())
+    ).values('score')
+
+    # Only events viewed within the window or still carrying a score from an earlier run can change
+    return Event.objects.filter(
+        Q(trending_score__gt=0) | Q(pk__in=EventDailyStats.objects.filter(date__gte=start).values('event'))
+    ).update(trending_score=Coalesce(Subquery(scores, output_field=FloatField()), Value(0.0)))
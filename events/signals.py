@@ -1,24 +1,282 @@
-from django.db.models.signals import post_save
+import logging
+
+from kombu.exceptions import OperationalError
+from redis.exceptions import RedisError
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from django.utils.text import slugify
+from django.utils import timezone
+
+from events.changes import record_changes
+from events.models import CatalogChange, Event, EventPresenter, Playlist, PlaylistItem, Tag, VideoAsset
+from events.tasks import rebuild_search_suggestions_task, update_event_neighbours_task
+from events.video_status import publish, video_status_message
+
+logger = logging.getLogger("asp_api")
+
+SUGGESTIONS_REBUILD_DELAY = 10  # seconds
+NEIGHBOURS_UPDATE_DELAY = 30  # seconds
+
+
+def _refresh_event_usage(event, touch):
+    """ Refresh usage counts of all tags and playlists linked to an event, logging their change """
+    extra_fields = {'last_used': timezone.now()} if touch else {}
+    for model in (Tag, Playlist):
+        usages = model.objects.filter(events=event)
+        usages.refresh_published_event_counts(**extra_fields)
+        record_changes(CHANGE_KINDS[model], usages.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Event.tags.through)
+@receiver(m2m_changed, sender=Event.playlists.through)
+def update_usage_on_link_change(sender, instance, action, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keep published_event_count and last_used of tags and playlists in sync when
+    they are linked to or unlinked from events, from either side of the relation.
+    """
+    reverse, model, pk_set = kwargs['reverse'], kwargs['model'], kwargs['pk_set']
+
+    if action == 'pre_clear' and not reverse:
+        instance.__dict__['_cleared_usage_pks'] = set(
+            model.objects.filter(events=instance).values_list('pk', flat=True)
+        )
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        usage_model, pks = type(instance), {instance.pk}
+        touch = action == 'post_add' and Event.objects.filter(
+            pk__in=pk_set, status=Event.EventStatus.PUBLISHED
+        ).exists()
+    else:
+        usage_model = model
+        pks = instance.__dict__.pop('_cleared_usage_pks', set()) if action == 'post_clear' else pk_set
+        touch = action == 'post_add' and instance.status == Event.EventStatus.PUBLISHED
+
+    if pks:
+        extra_fields = {'last_used': timezone.now()} if touch else {}
+        usage_model.objects.filter(pk__in=pks).refresh_published_event_counts(**extra_fields)
+
+
+@receiver(m2m_changed, sender=PlaylistItem)
+def append_playlist_items(sender, instance, action, **kwargs):  # pylint: disable=unused-argument
+    """
+    Move events added to playlists through the many-to-many relation, from either side,
+    after the last event of each playlist. Events added together are ordered by event time.
+    """
+    if action != 'post_add' or not kwargs['pk_set']:
+        return
+
+    if kwargs['reverse']:
+        added = PlaylistItem.objects.filter(playlist=instance, event__in=kwargs['pk_set'])
+    else:
+        added = PlaylistItem.objects.filter(event=instance, playlist__in=kwargs['pk_set'])
+    added = list(added.order_by('playlist', 'event__event_time', 'event'))
+
+    last_positions = PlaylistItem.objects.filter(playlist__in={item.playlist_id for item in added}).exclude(
+        pk__in=[item.pk for item in added]
+    ).last_positions()
+    for item in added:
+        item.position = last_positions[item.playlist_id] = last_positions.get(item.playlist_id, -1) + 1
+    PlaylistItem.objects.bulk_update(added, ['position'])
+
+
+@receiver(pre_save, sender=Event)
+def remember_previous_status(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remember the stored status of an event so post_save can detect status changes. It is
+    known from loading the event, only events built with their pk or loaded without it are queried.
+    """
+    if instance.pk is None or (update_fields is not None and 'status' not in update_fields):
+        return
+    previous_status = instance.__dict__.get('_loaded_status')
+    if previous_status is None:
+        previous_status = Event.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    instance.__dict__['_previous_status'] = previous_status
+
+
+@receiver(post_save, sender=Event)
+def update_usage_on_status_change(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """ Refresh usage counts when an event is published or unpublished """
+    previous_status = instance.__dict__.pop('_previous_status', None)
+    if kwargs['update_fields'] is None or 'status' in kwargs['update_fields']:
+        instance.__dict__['_loaded_status'] = instance.status
+    if created or previous_status is None or previous_status == instance.status:
+        return
+
+    published = Event.EventStatus.PUBLISHED
+    if published in (previous_status, instance.status):
+        _refresh_event_usage(instance, touch=instance.status == published)
 
-from events.models import Event
+
+@receiver(pre_delete, sender=Event)
+def remember_usage_before_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """ Remember the tags and playlists of an event that is about to be deleted """
+    instance.__dict__['_deleted_usage_pks'] = {
+        model: set(model.objects.filter(events=instance).values_list('pk', flat=True))
+        for model in (Tag, Playlist)
+    }
+
+
+@receiver(post_delete, sender=Event)
+def update_usage_on_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """ Refresh usage counts of the tags and playlists a deleted event was linked to, logging their change """
+    for model, pks in instance.__dict__.pop('_deleted_usage_pks', {}).items():
+        model.objects.filter(pk__in=pks).refresh_published_event_counts()
+        record_changes(CHANGE_KINDS[model], pks)
 
 
 @receiver(post_save, sender=Event)
-def set_slug_on_create(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Playlist)
+@receiver(post_delete, sender=Playlist)
+@receiver(post_save, sender=EventPresenter)
+@receiver(post_delete, sender=EventPresenter)
+@receiver(m2m_changed, sender=Event.tags.through)
+@receiver(m2m_changed, sender=Event.playlists.through)
+def schedule_suggestions_rebuild(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Schedule a rebuild of the autocomplete suggestions once the change is committed.
+    Changes within SUGGESTIONS_REBUILD_DELAY seconds of each other share one rebuild,
+    across processes as the flag is kept in the shared cache.
+    """
+    def schedule():
+        try:
+            if not caches['shared'].add(
+                'search-suggestions:rebuild-scheduled', True, timeout=SUGGESTIONS_REBUILD_DELAY
+            ):
+                return
+            rebuild_search_suggestions_task.apply_async(countdown=SUGGESTIONS_REBUILD_DELAY)
+        except (OperationalError, RedisError) as e:
+            logger.warning("Could not schedule search suggestions rebuild: %s", e)
+
+    transaction.on_commit(schedule)
+
+
+def _schedule_neighbours_update(event_ids):
     """
-    Set a slug for the event instance if it is created and does not have a slug.
-    The slug is generated from the title and includes the event ID to ensure uniqueness.
+    Schedule a neighbours update for events once the change is committed,
+    at most once per delay and event across processes.
     """
-    if created and not instance.slug:
-        base_slug = slugify(instance.title)
-        exists_with_title = Event.objects.filter(title=instance.title).exclude(pk=instance.pk).exists()
+    def schedule():
+        try:
+            scheduled = [
+                event_id for event_id in event_ids
+                if caches['shared'].add(
+                    f'event-neighbours:update-scheduled:{event_id}', True, timeout=NEIGHBOURS_UPDATE_DELAY
+                )
+            ]
+            if not scheduled:
+                return
+            update_event_neighbours_task.apply_async(args=[scheduled], countdown=NEIGHBOURS_UPDATE_DELAY)
+        except (OperationalError, RedisError) as e:
+            logger.warning("Could not schedule event neighbours update: %s", e)
+
+    transaction.on_commit(schedule)
+
+
+@receiver(post_save, sender=Event)
+def update_neighbours_on_save(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """ Refresh the similar events of an event whose text or status may have changed """
+    if update_fields is None or {'title', 'description', 'status'} & set(update_fields):
+        _schedule_neighbours_update([instance.pk])
+
+
+@receiver(m2m_changed, sender=Event.tags.through)
+@receiver(m2m_changed, sender=Event.playlists.through)
+def update_neighbours_on_link_change(sender, instance, action, **kwargs):  # pylint: disable=unused-argument
+    """ Refresh the similar events of events linked to or unlinked from tags and playlists """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not kwargs['reverse']:
+        _schedule_neighbours_update([instance.pk])
+    elif kwargs['pk_set']:
+        _schedule_neighbours_update(sorted(kwargs['pk_set']))
+
+
+CHANGE_KINDS = {
+    Event: CatalogChange.ObjectKind.EVENT,
+    Tag: CatalogChange.ObjectKind.TAG,
+    Playlist: CatalogChange.ObjectKind.PLAYLIST,
+    VideoAsset: CatalogChange.ObjectKind.VIDEO_ASSET,
+}
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Playlist)
+@receiver(post_save, sender=VideoAsset)
+def log_catalog_save(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """ Log a change of a saved catalog object, and of the events showing its name or video """
+    record_changes(CHANGE_KINDS[sender], [instance.pk])
+    if sender is VideoAsset and instance.event_id:
+        record_changes(CatalogChange.ObjectKind.EVENT, [instance.event_id])
+    elif sender in (Tag, Playlist) and not created:
+        record_changes(CatalogChange.ObjectKind.EVENT, instance.events.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Playlist)
+def remember_events_before_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """ Remember the events of a tag or playlist that is about to be deleted """
+    instance.__dict__['_deleted_event_pks'] = list(instance.events.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Playlist)
+@receiver(post_delete, sender=VideoAsset)
+def log_catalog_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """ Log the deletion of a catalog object, and a change of the events that showed it """
+    record_changes(CHANGE_KINDS[sender], [instance.pk], CatalogChange.ChangeAction.DELETE)
+    event_ids = instance.__dict__.pop('_deleted_event_pks', [])
+    if sender is VideoAsset and instance.event_id:
+        event_ids = [instance.event_id]
+    record_changes(CatalogChange.ObjectKind.EVENT, event_ids)
+
+
+@receiver(post_save, sender=EventPresenter)
+@receiver(post_delete, sender=EventPresenter)
+@receiver(post_save, sender=PlaylistItem)
+@receiver(post_delete, sender=PlaylistItem)
+def log_event_link_change(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """ Log a change of an event whose presenters or playlists were edited one by one, e.g. in the admin """
+    record_changes(CatalogChange.ObjectKind.EVENT, [instance.event_id])
+    if sender is PlaylistItem:
+        record_changes(CatalogChange.ObjectKind.PLAYLIST, [instance.playlist_id])
+
+
+@receiver(m2m_changed, sender=Event.tags.through)
+@receiver(m2m_changed, sender=Event.playlists.through)
+def log_link_change(sender, instance, action, **kwargs):  # pylint: disable=unused-argument
+    """ Log a change of the events and of the tags or playlists linked or unlinked, from either side """
+    reverse = kwargs['reverse']
+    field = 'tag' if sender is Event.tags.through else 'playlist'
+
+    if action == 'pre_clear':
+        links = sender.objects.filter(**{field: instance}) if reverse else sender.objects.filter(event=instance)
+        instance.__dict__['_cleared_change_pks'] = list(
+            links.values_list('event_id' if reverse else f'{field}_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    pks = instance.__dict__.pop('_cleared_change_pks', []) if action == 'post_clear' else sorted(kwargs['pk_set'])
+    event_ids, other_ids = (pks, [instance.pk]) if reverse else ([instance.pk], pks)
+    record_changes(CatalogChange.ObjectKind.EVENT, event_ids)
+    record_changes(CHANGE_KINDS[Tag if field == 'tag' else Playlist], other_ids)
 
-        if exists_with_title:
-            slug = f"{base_slug}-{instance.id}"
-        else:
-            slug = base_slug
 
-        instance.slug = slug
-        instance.save(update_fields=['slug'])
+@receiver(post_save, sender=VideoAsset)
+def publish_video_asset_status(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """ Tell the open video status streams about a saved video asset, once the change is committed """
+    if update_fields is None or 'status' in update_fields:
+        message = video_status_message(instance)
+        transaction.on_commit(lambda: publish(message))
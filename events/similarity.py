@@ -0,0 +1,160 @@
+"""
+Content-based event similarity.
+
+Every published event becomes a TF-IDF vector over the words of its title
+(counted twice), description, tags and playlists. Term frequencies are
+sublinear (``1 + log(tf)``), IDF is smoothed and vectors are L2 normalized, so
+the cosine similarity of two events is the dot product of their rows.
+
+The top ``NEIGHBOUR_COUNT`` neighbours of each event are found by multiplying
+a batch of rows with the transposed matrix, which keeps memory bounded by
+``batch_size * event count`` similarities, and are stored in ``EventNeighbour``.
+``rebuild_event_neighbours`` recomputes the whole table; ``update_event_neighbours``
+only recomputes the events that changed and the events whose neighbours they
+enter or leave. Other scores drift slightly as word frequencies change, which
+the periodic rebuild corrects. Both replace rows under one advisory lock, so
+overlapping runs in different workers write one after the other.
+"""
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+from scipy import sparse
+
+from django.db import connection, transaction
+from django.db.models import Count, Min
+
+from events.models import Event, EventNeighbour
+
+NEIGHBOUR_COUNT = 10
+BATCH_SIZE = 500
+# Key of the advisory lock serializing the writers of EventNeighbour rows
+NEIGHBOURS_LOCK_ID = 7301
+# Neighbours sharing only a few common words are not worth recommending
+MIN_SCORE = 0.05
+TOKEN = re.compile(r"[a-z0-9]{2,}")
+STOP_WORDS = frozenset("""
+    a an and are as at be by can do for from has have how in into is it its of on or our so that the their
+    this to was we what when where which who why will with you your
+""".split())
+
+
+def tokenize(text):
+    """ Lower case words of at least two characters, without stop words """
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def event_documents():
+    """ Return the ids of all published events and the tokens describing each of them """
+    events = Event.objects.filter(status=Event.EventStatus.PUBLISHED).order_by('pk')
+    names = defaultdict(list)
+    for through, field in ((Event.tags.through, 'tag__name'), (Event.playlists.through, 'playlist__name')):
+        for event_id, name in through.objects.filter(event__in=events).values_list('event_id', field):
+            names[event_id].append(name)
+
+    ids, documents = [], []
+    for event_id, title, description in events.values_list('pk', 'title', 'description').iterator():
+        ids.append(event_id)
+        documents.append(tokenize(f"{title} {title} {description} {' '.join(names[event_id])}"))
+    return ids, documents
+
+
+def tfidf_matrix(documents):
+    """ Return the L2 normalized TF-IDF matrix of tokenized documents as a CSR matrix, one row per document """
+    vocabulary = {}
+    rows, columns, counts = [], [], []
+    for row, tokens in enumerate(documents):
+        for term, count in Counter(tokens).items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+
+    matrix = sparse.csr_matrix(
+        (np.array(counts, dtype=np.float32), (rows, columns)), shape=(len(documents), len(vocabulary))
+    )
+    matrix.data = 1 + np.log(matrix.data)
+
+    document_frequency = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    matrix = matrix @ sparse.diags(idf.astype(np.float32))
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+
+def top_neighbours(matrix, rows, k=NEIGHBOUR_COUNT, batch_size=BATCH_SIZE):
+    """ Yield ``(row, [(neighbour row, score), ...])`` with the k most similar other rows, best first """
+    transposed = matrix.T.tocsc()
+    k = min(k, matrix.shape[0] - 1)
+    for start in range(0, len(rows), batch_size):
+        batch = np.asarray(rows[start:start + batch_size])
+        similarities = (matrix[batch] @ transposed).toarray()
+        similarities[np.arange(len(batch)), batch] = 0
+
+        if k <= 0:
+            candidates = np.empty((len(batch), 0), dtype=int)
+        else:
+            candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        for index, row in enumerate(batch):
+            ranked = sorted(
+                ((int(column), float(similarities[index, column])) for column in candidates[index]),
+                key=lambda item: item[1], reverse=True,
+            )
+            yield int(row), [(column, score) for column, score in ranked if score >= MIN_SCORE]
+
+
+def _neighbour_rows(ids, matrix, rows, k, batch_size):
+    return [
+        EventNeighbour(event_id=ids[row], neighbour_id=ids[column], score=score)
+        for row, neighbours in top_neighbours(matrix, rows, k, batch_size)
+        for column, score in neighbours
+    ]
+
+
+def _lock_neighbours():
+    """ Wait for other writers of neighbour rows, until the end of the current transaction """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [NEIGHBOURS_LOCK_ID])
+
+
+def rebuild_event_neighbours(k=NEIGHBOUR_COUNT, batch_size=BATCH_SIZE):
+    """ Recompute the neighbours of every published event. Returns the number of neighbour rows """
+    ids, documents = event_documents()
+    neighbours = _neighbour_rows(ids, tfidf_matrix(documents), range(len(ids)), k, batch_size) if ids else []
+    with transaction.atomic():
+        _lock_neighbours()
+        EventNeighbour.objects.all().delete()
+        EventNeighbour.objects.bulk_create(neighbours, batch_size=1000)
+    return len(neighbours)
+
+
+def update_event_neighbours(event_ids, k=NEIGHBOUR_COUNT, batch_size=BATCH_SIZE):
+    """
+    Recompute the neighbours of changed events, of the events listing one of them and of the
+    events that would now rank one of them among their k best. Returns the number of events updated.
+    """
+    ids, documents = event_documents()
+    row_of = {event_id: row for row, event_id in enumerate(ids)}
+    affected = set(event_ids) | set(
+        EventNeighbour.objects.filter(neighbour__in=event_ids).values_list('event_id', flat=True)
+    )
+
+    matrix = tfidf_matrix(documents)
+    changed_rows = [row_of[event_id] for event_id in event_ids if event_id in row_of]
+    if changed_rows:
+        best = (matrix[changed_rows] @ matrix.T).toarray().max(axis=0)
+        candidates = {ids[row] for row in np.flatnonzero(best >= MIN_SCORE)}
+        current = EventNeighbour.objects.filter(event__in=candidates).values('event').annotate(
+            count=Count('pk'), lowest=Min('score')
+        )
+        full = {row['event']: row['lowest'] for row in current if row['count'] >= k}
+        affected |= {event_id for event_id in candidates if best[row_of[event_id]] > full.get(event_id, 0)}
+
+    rows = sorted(row_of[event_id] for event_id in affected if event_id in row_of)
+    neighbours = _neighbour_rows(ids, matrix, rows, k, batch_size) if rows else []
+    with transaction.atomic():
+        _lock_neighbours()
+        EventNeighbour.objects.filter(event__in=affected).delete()
+        EventNeighbour.objects.bulk_create(neighbours, batch_size=1000)
+    return len(affected)
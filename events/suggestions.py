@@ -0,0 +1,119 @@
+"""
+Autocomplete suggestions for the search box.
+
+Suggestions are denormalized into the SearchSuggestion table, one row per word
+a title or name can be matched from, and looked up with an indexed
+``term LIKE 'prefix%'`` scan. The table is rebuilt wholesale (it is small) by a
+debounced task scheduled whenever the catalog changes, or by the
+``rebuild_search_suggestions`` management command.
+"""
+import re
+import unicodedata
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from events.models import Event, Playlist, SearchSuggestion, Tag
+
+User = get_user_model()
+
+SUGGESTION_LIMIT = 5
+MAX_SUGGESTION_LIMIT = 20
+TERM_MAX_LENGTH = SearchSuggestion._meta.get_field('term').max_length
+RESULT_KEYS = {
+    SearchSuggestion.SuggestionKind.TITLE: 'titles',
+    SearchSuggestion.SuggestionKind.TAG: 'tags',
+    SearchSuggestion.SuggestionKind.PLAYLIST: 'playlists',
+    SearchSuggestion.SuggestionKind.PRESENTER: 'presenters',
+}
+_word_boundary = re.compile(r'[^\w]+')
+
+
+def normalize(text):
+    """ Lowercase, strip accents and collapse separators so prefixes compare predictably """
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_word_boundary.sub(' ', text.lower()).split())
+
+
+def _terms(text):
+    """ Return the normalized text starting at every word, e.g. 'intro to python', 'to python', 'python' """
+    words = normalize(text).split(' ')
+    return {' '.join(words[index:])[:TERM_MAX_LENGTH] for index in range(len(words)) if words[index]}
+
+
+def _suggestion_rows(kind, object_id, text, weight, slug=None):
+    return [
+        SearchSuggestion(kind=kind, object_id=object_id, term=term, text=text, slug=slug, weight=weight)
+        for term in _terms(text)
+    ]
+
+
+def _title_rows():
+    kind = SearchSuggestion.SuggestionKind.TITLE
+    events = Event.objects.filter(status=Event.EventStatus.PUBLISHED).values_list('id', 'title', 'slug', 'event_time')
+    for event_id, title, slug, event_time in events.iterator():
+        # Newer events rank higher
+        yield from _suggestion_rows(kind, event_id, title, int(event_time.timestamp() // 86400), slug)
+
+
+def _usage_rows():
+    kinds = SearchSuggestion.SuggestionKind
+    for kind, model in ((kinds.TAG, Tag), (kinds.PLAYLIST, Playlist)):
+        used = model.objects.filter(published_event_count__gt=0)
+        for object_id, name, count in used.values_list('id', 'name', 'published_event_count'):
+            yield from _suggestion_rows(kind, object_id, name, count)
+
+
+def _presenter_rows():
+    kind = SearchSuggestion.SuggestionKind.PRESENTER
+    presenters = User.objects.annotate(
+        presented=Count('events_presented', filter=Q(events_presented__status=Event.EventStatus.PUBLISHED))
+    ).filter(presented__gt=0).values_list('id', 'first_name', 'last_name', 'presented')
+    for user_id, first_name, last_name, presented in presenters:
+        yield from _suggestion_rows(kind, user_id, f"{first_name} {last_name}".strip(), presented)
+
+
+def build_suggestions():
+    """ Build suggestion rows for published events, tags and playlists in use, and their presenters """
+    return [*_title_rows(), *_usage_rows(), *_presenter_rows()]
+
+
+def rebuild_search_suggestions():
+    """ Replace the suggestion table contents atomically, so readers never see it half built """
+    rows = build_suggestions()
+    with transaction.atomic():
+        SearchSuggestion.objects.all().delete()
+        SearchSuggestion.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def get_suggestions(query, limit=SUGGESTION_LIMIT):
+    """
+    Return up to ``limit`` suggestions of each kind whose words start with ``query``,
+    best weighted first, as a dict keyed by 'titles', 'tags', 'playlists' and 'presenters'.
+    """
+    results = {key: [] for key in RESULT_KEYS.values()}
+    prefix = normalize(query)[:TERM_MAX_LENGTH]
+    if not prefix:
+        return results
+
+    # A suggestion may match from several of its words, so over-fetch before de-duplicating
+    matches = SearchSuggestion.objects.filter(term__startswith=prefix).annotate(
+        rank=Window(RowNumber(), partition_by=F('kind'), order_by=(F('weight').desc(), F('text').asc()))
+    ).filter(rank__lte=2 * limit).order_by('kind', 'rank').values_list('kind', 'object_id', 'text', 'slug')
+
+    seen = set()
+    for kind, object_id, text, slug in matches:
+        entries = results[RESULT_KEYS[kind]]
+        if (kind, object_id) in seen or len(entries) >= limit:
+            continue
+        seen.add((kind, object_id))
+        entry = {'id': object_id, 'text': text}
+        if kind == SearchSuggestion.SuggestionKind.TITLE:
+            entry['slug'] = slug
+        entries.append(entry)
+
+    return results
@@ -10,7 +10,17 @@ from celery import shared_task
 from django.conf import settings
 from django.core.files import File
 
-from events.models import VideoAsset
+from events.changes import prune_change_log, record_changes
+from events.download_progress import DownloadTracker
+from events.home import refresh_home_candidates
+from events.models import CatalogChange, VideoAsset
+from events.popularity import rollup_event_views
+from events.similarity import rebuild_event_neighbours, update_event_neighbours
+from events.suggestions import rebuild_search_suggestions
+from events.uploads import complete_stalled_uploads, complete_video_upload, expire_uploads
+from events.usage import reconcile_usage_counts
+from events.video_status import publish_video_status
+from events.watch_progress import flush_watch_progress
 
 
 def _get_file_id(url):
@@ -51,23 +61,35 @@ def _download_google_drive_file(file_id):
     return response
 
 
+def _content_length(response):
+    """Return the size announced by a response, None if it is not known."""
+    length = response.headers.get('content-length', '')
+    return int(length) if length.isdigit() else None
+
+
 def _save_video_file(video_asset, response, filename):
-    """Save the downloaded video file to VideoAsset."""
+    """Save the downloaded video file to VideoAsset, reporting the download progress."""
     videos_dir = Path(settings.MEDIA_ROOT) / 'videos'
     videos_dir.mkdir(parents=True, exist_ok=True)
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_file:
-        total_size = sum(temp_file.write(chunk) for chunk in response.iter_content(chunk_size=8192))
-        temp_file.flush()
+    tracker = DownloadTracker(video_asset, _content_length(response))
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_file:
+            for chunk in response.iter_content(chunk_size=8192):
+                tracker.add(temp_file.write(chunk))
+            temp_file.flush()
+        tracker.report()
 
-    if total_size < 100:
-        raise ValueError(f"Downloaded file is too small: {total_size} bytes")
+        if tracker.received < 100:
+            raise ValueError(f"Downloaded file is too small: {tracker.received} bytes")
 
-    with open(temp_file.name, 'rb') as f:
-        video_asset.video_file.save(filename, File(f), save=False)
+        with open(temp_file.name, 'rb') as f:
+            video_asset.video_file.save(filename, File(f), save=False)
 
-    video_asset.status = VideoAsset.VideoStatus.READY
-    video_asset.save()
+        video_asset.status = VideoAsset.VideoStatus.READY
+        video_asset.save()
+    finally:
+        tracker.finish()
 
 
 @shared_task
@@ -100,5 +122,74 @@ def download_google_drive_video(video_asset_id, drive_link):
         print(f"Error processing file: {e}")
 
     print(f"Failed to process VideoAsset ID: {video_asset_id}")
-    VideoAsset.objects.filter(id=video_asset_id).update(status=VideoAsset.VideoStatus.FAILED)
+    video_assets = VideoAsset.objects.filter(id=video_asset_id)
+    if video_assets.update(status=VideoAsset.VideoStatus.FAILED):
+        video_asset = video_assets.only('pk', 'event_id', 'status').get()
+        # update() sends no signals, so the change is logged here
+        record_changes(CatalogChange.ObjectKind.VIDEO_ASSET, [video_asset.pk])
+        if video_asset.event_id:
+            record_changes(CatalogChange.ObjectKind.EVENT, [video_asset.event_id])
+        publish_video_status(video_asset)
     return False
+
+
+@shared_task
+def rebuild_search_suggestions_task():
+    """Rebuild the search box autocomplete suggestions from the current catalog."""
+    return rebuild_search_suggestions()
+
+
+@shared_task
+def flush_watch_progress_task():
+    """Write the buffered watch progress heartbeats to the database."""
+    return flush_watch_progress()
+
+
+@shared_task
+def rollup_event_views_task():
+    """Roll the Redis view counters up into daily stats and refresh trending scores."""
+    return rollup_event_views()
+
+
+@shared_task
+def rebuild_event_neighbours_task():
+    """Recompute the content-based neighbours of every published event."""
+    return rebuild_event_neighbours()
+
+
+@shared_task
+def update_event_neighbours_task(event_ids):
+    """Recompute the content-based neighbours affected by changes to some events."""
+    return update_event_neighbours(event_ids)
+
+
+@shared_task
+def refresh_home_candidates_task():
+    """Recompute the cached event rows of the home page."""
+    return len(refresh_home_candidates())
+
+
+@shared_task
+def prune_change_log_task():
+    """Delete the catalog changes older than the retention period."""
+    return prune_change_log()
+
+
+@shared_task
+def reconcile_usage_counts_task():
+    """Fix the published event counts of tags and playlists left behind by writes without signals."""
+    return reconcile_usage_counts()
+
+
+@shared_task
+def complete_video_upload_task(upload_id):
+    """Attach the file of a complete resumable upload to its VideoAsset."""
+    complete_video_upload(upload_id)
+
+
+@shared_task
+def expire_video_uploads_task():
+    """Delete the resumable uploads left unfinished, with their files, and attach complete ones left processing."""
+    expired = expire_uploads()
+    complete_stalled_uploads()
+    return expired
@@ -1,23 +1,39 @@
 import pytest
 
-from django.db import connection
-from django.db.models.signals import post_save
+from django.core.cache import caches
+from django.db import connections
 
-from events.models import Event
-from events.signals import set_slug_on_create
+from events.download_progress import get_download_progress_store
+from events.popularity import get_view_counter
+from events.uploads import get_upload_locks
+from events.video_status import get_video_status_channel
+from events.watch_progress import get_watch_progress_buffer
 
 
 @pytest.fixture(autouse=True)
-def disable_event_signals():
-    """ Disable the post_save signal for Event during tests """
-    post_save.disconnect(set_slug_on_create, sender=Event)
-    yield
-    post_save.connect(set_slug_on_create, sender=Event)
+def reset_buffered_counters():
+    """
+    Start every test without counted views, buffered watch or download progress,
+    video status subscribers and upload locks
+    """
+    get_view_counter().reset()
+    get_watch_progress_buffer().reset()
+    get_download_progress_store().reset()
+    get_video_status_channel().reset()
+    get_upload_locks().reset()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """ Start every test with empty caches, e.g. without home feed candidates of earlier tests """
+    for cache in caches.all():
+        cache.clear()
 
 
 @pytest.fixture(scope='session', autouse=True)
 def setup_test_database(django_db_setup, django_db_blocker):  # pylint: disable=unused-argument
-    """Ensure test database has trigram extension"""
+    """Ensure test databases have trigram extension"""
     with django_db_blocker.unblock():
-        with connection.cursor() as cursor:
-            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        for db_connection in connections.all():
+            with db_connection.cursor() as cursor:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
@@ -0,0 +1,56 @@
+import pytest
+
+from django.urls import reverse
+
+from events.factories import EventFactory, PlaylistFactory
+from events.models import PlaylistItem
+
+
+@pytest.mark.django_db
+class TestPlaylistAdmin:
+    """ Test cases for the playlist admin """
+
+    @staticmethod
+    def change_data(playlist, items):
+        """ The change form data of a playlist with the given (existing item or None, position, event) items """
+        data = {
+            'name': playlist.name,
+            'description': playlist.description,
+            'items-TOTAL_FORMS': len(items),
+            'items-INITIAL_FORMS': sum(1 for item, _, _ in items if item),
+            'items-MIN_NUM_FORMS': 0,
+            'items-MAX_NUM_FORMS': 1000,
+        }
+        for index, (item, position, event) in enumerate(items):
+            data.update({
+                f'items-{index}-id': item.pk if item else '',
+                f'items-{index}-playlist': playlist.pk,
+                f'items-{index}-position': '' if position is None else position,
+                f'items-{index}-event': event.pk,
+            })
+        return data
+
+    def test_new_items_are_appended(self, admin_client):
+        """ Test that events added without a position go after the last event of the playlist """
+        playlist = PlaylistFactory()
+        first, second, third, fourth = EventFactory.create_batch(4)
+        existing = PlaylistItem.objects.create(playlist=playlist, event=first, position=3)
+
+        response = admin_client.post(
+            reverse('admin:events_playlist_change', args=[playlist.pk]),
+            self.change_data(playlist, [(existing, 3, first), (None, None, second), (None, 7, third),
+                                        (None, None, fourth)]),
+        )
+
+        assert response.status_code == 302
+        assert list(playlist.items.order_by('position').values_list('event', 'position')) == [
+            (first.pk, 3), (third.pk, 7), (second.pk, 8), (fourth.pk, 9),
+        ]
+
+    def test_new_item_form_has_no_position(self, admin_client):
+        """ Test that the form of a new item leaves the position blank """
+        playlist = PlaylistFactory()
+
+        response = admin_client.get(reverse('admin:events_playlist_change', args=[playlist.pk]))
+
+        assert response.context['inline_admin_formsets'][0].formset.empty_form['position'].value() is None
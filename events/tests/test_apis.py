@@ -1,13 +1,29 @@
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from unittest.mock import patch
+
 import pytest
 from faker import Faker
+from redis.exceptions import RedisError
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.urls import reverse
+from django.utils import timezone
 
 from events.factories import EventFactory, PlaylistFactory, TagFactory, UserFactory, VideoAssetFactory
-from events.models import VideoAsset
+from events.home import REFRESH_LOCK_KEY, get_home_candidates, refresh_home_candidates
+from events.models import Event, PlaylistItem, VideoAsset
+from events.popularity import get_view_counter, record_view, rollup_event_views
+from events.similarity import rebuild_event_neighbours
+from events.suggestions import rebuild_search_suggestions
+from events.tasks import refresh_home_candidates_task
+from events.v1.throttling import SearchRateThrottle
+from events.v1.utils import get_event_facets
+from events.watch_progress import record_heartbeat
 
 fake = Faker()
 User = get_user_model()
@@ -80,6 +96,11 @@ class TestEventsAPI:
         assert len(response.data) == 1
         assert response.data[0]["name"] == "Used Playlist"
 
+        # Playlists only used by draft events are not linked
+        EventFactory(status=Event.EventStatus.DRAFT).playlists.add(unused_playlist)
+        response = api_client.get(reverse("playlist-list"), {'linked_to_events': True})
+        assert [playlist["name"] for playlist in response.data] == ["Used Playlist"]
+
     def test_list_tags(self, api_client):
         """ Test listing all tags """
         used_tag = TagFactory(name="Used Tag")
@@ -96,6 +117,24 @@ class TestEventsAPI:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) == 1
         assert response.data[0]["name"] == "Used Tag"
+        assert response.data[0]["event_count"] == 1
+
+        # Tags only used by draft events are not linked
+        EventFactory(status=Event.EventStatus.DRAFT).tags.add(unused_tag)
+        response = api_client.get(reverse("tag-list"), {'linked_to_events': True})
+        assert [tag["name"] for tag in response.data] == ["Used Tag"]
+
+    def test_list_tags_ordered_by_popularity(self, api_client):
+        """ Test ordering tags by the number of published events using them """
+        tags = [TagFactory(name=name) for name in ("Rare", "Popular", "Common")]
+        for tag, event_count in zip(tags, (1, 3, 2)):
+            for event in EventFactory.create_batch(event_count):
+                event.tags.add(tag)
+
+        response = api_client.get(reverse("tag-list"), {'ordering': '-event_count'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [tag["name"] for tag in response.data] == ["Popular", "Common", "Rare"]
+        assert [tag["event_count"] for tag in response.data] == [3, 2, 1]
 
     def test_event_recommendations(self, api_client):
         """ Test retrieving event recommendations """
@@ -128,3 +167,312 @@ class TestEventsAPI:
         assert event.id not in returned_ids
         # Similar events + 5 latest events
         assert len(results) == 6
+
+    def test_list_events_sparse_fields(self, api_client, django_assert_num_queries):
+        """ Test that fields limits both the response and the queries behind it """
+        event = EventFactory(description="Long description")
+        event.tags.add(TagFactory())
+        VideoAssetFactory(event=event, duration=90)
+
+        # Count, page, first video
+        with django_assert_num_queries(3) as context:
+            response = api_client.get(reverse("events-list"), {"fields": "title,slug,thumbnail,video_duration"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"] == [
+            {"title": event.title, "slug": event.slug, "thumbnail": "", "video_duration": 90}
+        ]
+        assert all("description" not in query["sql"] for query in context.captured_queries)
+
+    def test_list_events_omit_and_expand(self, api_client):
+        """ Test leaving fields out and collapsing relations to ids """
+        event = EventFactory()
+        presenter = UserFactory()
+        event.presenters.add(presenter)
+        VideoAssetFactory(event=event)
+
+        response = api_client.get(reverse("events-list"), {"omit": "description,tags,playlists"})
+        result = response.data["results"][0]
+        assert not {"description", "tags", "playlists"} & set(result)
+        assert result["publisher"]["id"] == event.creator_id
+        assert result["presenters"][0]["email"] == presenter.email
+
+        response = api_client.get(reverse("events-list"), {"fields": "id,publisher,presenters", "expand": ""})
+        assert response.data["results"] == [
+            {"id": event.id, "publisher": event.creator_id, "presenters": [presenter.id]}
+        ]
+
+        response = api_client.get(reverse("events-list"), {"fields": "publisher,presenters", "expand": "publisher"})
+        assert response.data["results"][0]["presenters"] == [presenter.id]
+        assert response.data["results"][0]["publisher"]["first_name"] == event.creator.first_name
+
+    def test_list_events_unknown_field(self, api_client):
+        """ Test that unknown field names are rejected """
+        response = api_client.get(reverse("events-list"), {"fields": "title,secret", "expand": "tags"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.data) == {"fields", "expand"}
+
+    def test_event_recommendations_sparse_fields(self, api_client):
+        """ Test that recommendations honour the fields parameter and keep their order """
+        event = EventFactory()
+        older, newer = EventFactory(event_time=timezone.now()), EventFactory(event_time=timezone.now() + timedelta(1))
+
+        response = api_client.get(reverse("recommendation", args=[event.slug]), {"fields": "id,slug"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"] == [
+            {"id": newer.id, "slug": newer.slug}, {"id": older.id, "slug": older.slug}
+        ]
+
+    def test_event_recommendations_use_neighbours(self, api_client):
+        """ Test that precomputed content-based neighbours are recommended most similar first """
+        event = EventFactory(title="Profiling django orm queries", description="")
+        closest = EventFactory(title="Optimizing django orm queries", description="")
+        close = EventFactory(title="Django templates", description="")
+        EventFactory(title="Kubernetes operators", description="")
+        rebuild_event_neighbours()
+
+        response = api_client.get(reverse("recommendation", args=[event.slug]), {"fields": "id"})
+        assert response.data["results"] == [{"id": closest.id}, {"id": close.id}]
+
+    def test_search_is_throttled(self, api_client):
+        """ Test that search requests are rate limited while plain listing is not """
+        with patch.dict(SearchRateThrottle.THROTTLE_RATES, {SearchRateThrottle.scope: "1/min"}):
+            response = api_client.get(reverse("events-list"), {"search": "python"})
+            assert response.status_code == status.HTTP_200_OK
+
+            response = api_client.get(reverse("events-list"), {"search": "django"})
+            assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+            assert "Retry-After" in response
+
+            response = api_client.get(reverse("events-list"))
+            assert response.status_code == status.HTTP_200_OK
+
+    def test_faceted_search(self, api_client, django_assert_num_queries):
+        """ Test that search results carry facet counts over all matching events """
+        python, django = TagFactory(name="Python"), TagFactory(name="Django")
+        playlist = PlaylistFactory(name="Backend")
+        presenter = UserFactory(first_name="Ada", last_name="Lovelace")
+
+        for index in range(3):
+            event = EventFactory(
+                title=f"Python talk {index}",
+                event_time=datetime(2023 + index % 2, 5, 1, tzinfo=dt_timezone.utc),
+            )
+            VideoAssetFactory(event=event)
+            event.tags.add(python)
+            if index:
+                event.tags.add(django)
+                event.playlists.add(playlist)
+                event.presenters.add(presenter)
+        VideoAssetFactory(event=EventFactory(title="Unrelated"))
+
+        response = api_client.get(reverse("events-search"), {"search": "Python", "page_size": 1})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 3
+        assert len(response.data["results"]) == 1
+
+        facets = response.data["facets"]
+        assert facets["tags"] == [
+            {"value": python.id, "label": "Python", "count": 3},
+            {"value": django.id, "label": "Django", "count": 2},
+        ]
+        assert facets["playlists"] == [{"value": playlist.id, "label": "Backend", "count": 2}]
+        assert facets["presenters"] == [{"value": presenter.id, "label": "Ada Lovelace", "count": 2}]
+        assert facets["event_type"] == [{"value": "SESSION", "label": "Session", "count": 3}]
+        assert facets["year"] == [
+            {"value": 2024, "label": "2024", "count": 1},
+            {"value": 2023, "label": "2023", "count": 2},
+        ]
+
+        with django_assert_num_queries(1):
+            get_event_facets(Event.objects.filter(title__startswith="Python"))
+
+    def test_search_suggestions(self, api_client):
+        """ Test prefix suggestions for titles, tags, playlists and presenters """
+        tag, playlist = TagFactory(name="Python"), PlaylistFactory(name="Pythonic Patterns")
+        presenter = UserFactory(first_name="Pyotr", last_name="Ilyich")
+        event = EventFactory(title="Intro to Python typing")
+        event.tags.add(tag)
+        event.playlists.add(playlist)
+        event.presenters.add(presenter)
+        EventFactory(title="Python drafts", status=Event.EventStatus.DRAFT)
+        TagFactory(name="Pytest")
+        rebuild_search_suggestions()
+
+        response = api_client.get(reverse("search-suggestions"), {"q": "Py"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["titles"] == [{"id": event.id, "text": event.title, "slug": event.slug}]
+        assert response.data["tags"] == [{"id": tag.id, "text": "Python"}]
+        assert response.data["playlists"] == [{"id": playlist.id, "text": "Pythonic Patterns"}]
+        assert response.data["presenters"] == [{"id": presenter.id, "text": "Pyotr Ilyich"}]
+        assert "max-age=60" in response["Cache-Control"]
+
+        response = api_client.get(reverse("search-suggestions"), {"q": "typ"})
+        assert [title["id"] for title in response.data["titles"]] == [event.id]
+        assert response.data["tags"] == []
+
+    def test_search_suggestions_ranking_and_limit(self, api_client):
+        """ Test that suggestions are ordered by weight and truncated per kind """
+        tags = [TagFactory(name=f"Data {name}") for name in ("Science", "Engineering", "Mesh")]
+        for tag, event_count in zip(tags, (2, 3, 1)):
+            for event in EventFactory.create_batch(event_count):
+                event.tags.add(tag)
+        rebuild_search_suggestions()
+
+        response = api_client.get(reverse("search-suggestions"), {"q": "data", "limit": 2})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [tag["text"] for tag in response.data["tags"]] == ["Data Engineering", "Data Science"]
+
+    def test_search_suggestions_require_query(self, api_client):
+        """ Test that the q parameter is required """
+        response = api_client.get(reverse("search-suggestions"))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_video_views_are_counted(self, api_client):
+        """ Test that opening a video counts a play and its viewer """
+        event = EventFactory(status=Event.EventStatus.PUBLISHED)
+        VideoAssetFactory(event=event)
+        for _ in range(3):
+            response = api_client.get(reverse('video-asset-detail', args=[event.slug]))
+            assert response.status_code == status.HTTP_200_OK
+        assert api_client.head(reverse('video-asset-detail', args=[event.slug])).status_code == status.HTTP_200_OK
+        record_view(event.pk, UserFactory().pk)
+
+        assert get_view_counter().counts(timezone.now().date()) == {event.pk: (4, 2)}
+
+        # Counting is best effort, the video is still served when the counter is unreachable
+        with patch.object(get_view_counter(), 'record', side_effect=RedisError("connection refused")):
+            response = api_client.get(reverse('video-asset-detail', args=[event.slug]))
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_trending_endpoint(self, api_client):
+        """ Test that trending lists viewed published events by score """
+        low, high, draft, _ = [VideoAssetFactory(event__status=Event.EventStatus.PUBLISHED).event for _ in range(4)]
+        Event.objects.filter(pk=draft.pk).update(status=Event.EventStatus.DRAFT)
+        for viewer_id in range(3):
+            record_view(high.pk, viewer_id)
+            record_view(draft.pk, viewer_id)
+        record_view(low.pk, 1)
+        rollup_event_views()
+
+        response = api_client.get(reverse('events-trending'))
+        assert response.status_code == status.HTTP_200_OK
+        assert [event['id'] for event in response.data['results']] == [high.pk, low.pk]
+
+        response = api_client.get(reverse('events-list'), {'ordering': '-trending', 'status': 'PUBLISHED'})
+        assert [event['id'] for event in response.data['results']][:2] == [high.pk, low.pk]
+
+
+@pytest.mark.django_db
+class TestHomeFeedAPI:
+    """ Test cases for the home feed API """
+
+    @pytest.fixture
+    def user(self):
+        """ Returns a user """
+        return UserFactory()
+
+    @pytest.fixture
+    def api_client(self, user):
+        """ Returns an APIClient authenticated as the user """
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def test_home_feed(self, user, api_client, django_assert_num_queries):
+        """ Test that the home feed returns every non-empty row in one response with a bounded number of queries """
+        tag = TagFactory(name="Python")
+        events = [VideoAssetFactory(event__status=Event.EventStatus.PUBLISHED).event for _ in range(4)]
+        featured, tagged, watched, viewed = events
+        Event.objects.filter(pk=featured.pk).update(is_featured=True)
+        tagged.tags.add(tag)
+        record_view(viewed.pk, user.pk)
+        rollup_event_views()
+        record_heartbeat(user.pk, watched.videos.get().pk, 42, False, timezone.now())
+        refresh_home_candidates_task()
+
+        # Watch progress, events of the watched videos, events, tags, playlists, presenters, first videos
+        with django_assert_num_queries(7):
+            response = api_client.get(reverse("events-home"), {"omit": "description,event_time"})
+
+        assert response.status_code == status.HTTP_200_OK
+        rows = {row["key"]: row for row in response.data["rows"]}
+        assert list(rows) == ["continue_watching", "featured", "trending", "latest", f"tag:{tag.pk}"]
+        assert [(event["id"], event["position"]) for event in rows["continue_watching"]["events"]] == [(watched.pk, 42)]
+        assert [event["id"] for event in rows["featured"]["events"]] == [featured.pk]
+        assert [event["id"] for event in rows["trending"]["events"]] == [viewed.pk]
+        assert {event["id"] for event in rows["latest"]["events"]} == {event.pk for event in events}
+        assert rows[f"tag:{tag.pk}"]["title"] == "Python"
+        assert rows[f"tag:{tag.pk}"]["events"][0]["tags"] == ["Python"]
+
+    def test_home_feed_drops_unpublished_candidates(self, api_client):
+        """ Test that events unpublished after the candidates were computed are left out """
+        featured = VideoAssetFactory(event__status=Event.EventStatus.PUBLISHED, event__is_featured=True).event
+        refresh_home_candidates()
+        Event.objects.filter(pk=featured.pk).update(status=Event.EventStatus.DRAFT)
+
+        response = api_client.get(reverse("events-home"))
+        assert response.data["rows"] == []
+
+    def test_home_feed_stale_rows_refreshed_once(self, settings):
+        """ Test that stale rows are refreshed by the request holding the lock while others serve them """
+        settings.HOME_FEED = {**settings.HOME_FEED, 'REFRESH_INTERVAL': 60}
+        assert refresh_home_candidates_task() == 3
+        featured = VideoAssetFactory(event__status=Event.EventStatus.PUBLISHED, event__is_featured=True).event
+
+        with patch('events.home.time.time', return_value=time.time() + 150):
+            caches['shared'].add(REFRESH_LOCK_KEY, True)
+            assert get_home_candidates()[0]['events'] == []
+            caches['shared'].delete(REFRESH_LOCK_KEY)
+            assert get_home_candidates()[0]['events'] == [featured.pk]
+        assert get_home_candidates()[0]['events'] == [featured.pk]
+
+    def test_home_feed_without_cache(self, api_client):
+        """ Test that the rows are computed when the cache is unreachable """
+        featured = VideoAssetFactory(event__status=Event.EventStatus.PUBLISHED, event__is_featured=True).event
+        with patch.object(caches['shared'], 'get', side_effect=RedisError("connection refused")):
+            response = api_client.get(reverse("events-home"))
+        assert response.status_code == status.HTTP_200_OK
+        assert [event["id"] for event in response.data["rows"][0]["events"]] == [featured.pk]
+
+
+@pytest.mark.django_db
+class TestPlaylistDetailAPI:
+    """ Test cases for the playlist detail API """
+
+    @pytest.fixture
+    def api_client(self):
+        """ Returns an authenticated instance of APIClient """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        return client
+
+    def test_playlist_detail(self, api_client, django_assert_num_queries):
+        """ Test that the playlist comes with its published events in playlist order, in constant queries """
+        playlist = PlaylistFactory(name="Backend", description="Server side talks")
+        events = [VideoAssetFactory(event__status=Event.EventStatus.PUBLISHED).event for _ in range(12)]
+        playlist.events.add(*events)
+        for position, event in enumerate(reversed(events)):
+            PlaylistItem.objects.filter(playlist=playlist, event=event).update(position=position)
+        Event.objects.filter(pk=events[-2].pk).update(status=Event.EventStatus.DRAFT)
+        playlist.events.add(EventFactory(status=Event.EventStatus.PUBLISHED))
+
+        # Playlist, count, page, tags, playlists, presenters, first videos
+        with django_assert_num_queries(7):
+            response = api_client.get(reverse("playlist-detail", args=[playlist.pk]), {"page_size": 5})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 11
+        assert [event["id"] for event in response.data["results"]] == [
+            events[-1].pk, *[event.pk for event in events[-3:-7:-1]]
+        ]
+        assert response.data["results"][0]["playlists"] == ["Backend"]
+        assert response.data["playlist"]["description"] == "Server side talks"
+
+    def test_playlist_detail_not_found(self, api_client):
+        """ Test that an unknown playlist is a 404 """
+        response = api_client.get(reverse("playlist-detail", args=[1234]))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,86 @@
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from events.backfills import EventSlugBackfill, get_backfill
+from events.factories import EventFactory, TagFactory
+from events.models import BackfillCheckpoint, Event, Tag
+
+
+@pytest.mark.django_db
+class TestBackfills:
+    """ Test cases for batched, resumable backfills """
+
+    @pytest.fixture
+    def events_without_slugs(self):
+        """ Five events that lost their slugs """
+        events = EventFactory.create_batch(5, title="Weekly Sync")
+        Event.objects.update(slug=None)
+        return events
+
+    def test_slug_backfill_in_batches(self, events_without_slugs):
+        """ Test that the slug backfill fills every slug and records its progress per batch """
+        reports = []
+        checkpoint = get_backfill('event_slugs').run(batch_size=2, report=lambda c, _: reports.append(c.last_pk))
+
+        slugs = set(Event.objects.values_list('slug', flat=True))
+        assert slugs == {"weekly-sync", "weekly-sync-2", "weekly-sync-3", "weekly-sync-4", "weekly-sync-5"}
+        assert reports == [events_without_slugs[1].pk, events_without_slugs[3].pk, events_without_slugs[4].pk]
+        assert checkpoint.rows_processed == 5
+        assert checkpoint.completed is not None
+
+    def test_backfill_resumes_after_failure(self, events_without_slugs):
+        """ Test that a failed run keeps the committed batches and the next run continues after them """
+        original = EventSlugBackfill.process_batch
+        calls = []
+
+        def fail_on_second_batch(backfill, pks):
+            calls.append(pks)
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            original(backfill, pks)
+
+        with patch.object(EventSlugBackfill, 'process_batch', fail_on_second_batch):
+            with pytest.raises(RuntimeError):
+                get_backfill('event_slugs').run(batch_size=2)
+
+        checkpoint = BackfillCheckpoint.objects.get(name='event_slugs')
+        assert checkpoint.last_pk == events_without_slugs[1].pk
+        assert Event.objects.filter(slug=None).count() == 3
+
+        checkpoint = get_backfill('event_slugs').run(batch_size=2)
+        assert checkpoint.rows_processed == 5
+        assert not Event.objects.filter(slug=None).exists()
+
+    def test_usage_count_backfill(self):
+        """ Test that the tag backfill recomputes stale usage counts """
+        tag = TagFactory()
+        EventFactory().tags.add(tag)
+        Tag.objects.update(published_event_count=0, last_used=None)
+
+        get_backfill('tag_usage_counts').run()
+
+        tag.refresh_from_db()
+        assert tag.published_event_count == 1
+        assert tag.last_used is not None
+
+    def test_run_backfill_command(self, events_without_slugs):  # pylint: disable=unused-argument
+        """ Test running and listing backfills from the command line """
+        out = StringIO()
+        call_command('run_backfill', 'event_slugs', '--batch-size', '3', '--pause', '0', stdout=out)
+        assert "rows/sec" in out.getvalue()
+        assert "Backfill event_slugs complete: 5 rows in total" in out.getvalue()
+
+        out = StringIO()
+        call_command('run_backfill', '--list', stdout=out)
+        assert "event_slugs: completed" in out.getvalue()
+        assert "tag_usage_counts: not started" in out.getvalue()
+
+    def test_unknown_backfill(self):
+        """ Test that an unknown backfill name is reported """
+        with pytest.raises(CommandError, match="Unknown backfill"):
+            call_command('run_backfill', 'nope')
@@ -0,0 +1,164 @@
+from unittest.mock import patch
+
+import pytest
+import requests
+from rest_framework.test import APIClient
+
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+
+from events.changes import prune_change_log
+from events.factories import EventFactory, PlaylistFactory, TagFactory, UserFactory, VideoAssetFactory
+from events.models import CatalogChange, Event, VideoAsset
+from events.tasks import download_google_drive_video
+
+
+# Changes are only served once the transaction that wrote them has ended, so every write is committed
+@pytest.mark.django_db(transaction=True)
+class TestCatalogChanges:
+    """ Test cases for the catalog change log and the changes endpoint """
+
+    @pytest.fixture
+    def client(self):
+        """ Returns an APIClient authenticated as a new user """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        return client
+
+    @staticmethod
+    def sync(client, cursor, **params):
+        """ Fetch the changes after a cursor """
+        response = client.get(reverse("catalog-changes"), {"cursor": cursor, **params})
+        assert response.status_code == 200
+        return response.data
+
+    def test_changes_since_cursor(self, client, django_assert_max_num_queries):
+        """ Test that only objects changed after the cursor are returned, in their current state """
+        untouched = VideoAssetFactory(event__status=Event.EventStatus.PUBLISHED).event
+        edited = VideoAssetFactory(event__status=Event.EventStatus.PUBLISHED).event
+        archived = VideoAssetFactory(event__status=Event.EventStatus.PUBLISHED).event
+        cursor = client.get(reverse("catalog-changes")).data["cursor"]
+
+        tag = TagFactory(name="Python")
+        edited.tags.add(tag)
+        edited.title = "Renamed"
+        edited.save()
+        archived.status = Event.EventStatus.ARCHIVED
+        archived.save()
+        deleted_video = archived.videos.get()
+        deleted_video_id = deleted_video.pk
+        deleted_video.delete()
+
+        # Cursor check, log, events and their relations, tags, video assets
+        with django_assert_max_num_queries(9):
+            data = self.sync(client, cursor, fields="id,title,tags")
+
+        assert data["has_more"] is False
+        assert data["events"]["upserted"] == [{"id": edited.pk, "title": "Renamed", "tags": ["Python"]}]
+        assert data["events"]["deleted"] == [archived.pk]
+        assert [row["name"] for row in data["tags"]["upserted"]] == ["Python"]
+        assert data["video_assets"]["deleted"] == [deleted_video_id]
+        assert untouched.pk not in data["events"]["deleted"]
+
+        assert self.sync(client, data["cursor"])["events"] == {"upserted": [], "deleted": []}
+
+    def test_changes_are_batched(self, client):
+        """ Test that large change sets are paged through with the returned cursor """
+        playlist = PlaylistFactory()
+        cursor = client.get(reverse("catalog-changes")).data["cursor"]
+        events = EventFactory.create_batch(3, status=Event.EventStatus.PUBLISHED)
+        playlist.events.add(*events)
+
+        seen, has_more = [], True
+        while has_more:
+            data = self.sync(client, cursor, limit=2, fields="id")
+            cursor, has_more = data["cursor"], data["has_more"]
+            seen.extend(event["id"] for event in data["events"]["upserted"])
+        assert set(seen) == {event.pk for event in events}
+
+    def test_link_changes_from_either_side(self):
+        """ Test that linking and clearing from the tag side logs the events """
+        tag = TagFactory()
+        events = EventFactory.create_batch(2)
+        start = CatalogChange.objects.latest("pk").pk
+
+        tag.events.add(*events)
+        tag.events.clear()
+        logged = CatalogChange.objects.filter(pk__gt=start, kind=CatalogChange.ObjectKind.EVENT)
+        assert sorted(logged.values_list("object_id", flat=True)) == sorted([event.pk for event in events] * 2)
+
+    @staticmethod
+    def logged_since(start, kind):
+        """ The ids of the objects of a kind logged after a change log id """
+        return set(CatalogChange.objects.filter(pk__gt=start, kind=kind).values_list("object_id", flat=True))
+
+    def test_failed_download_is_logged(self):
+        """ Test that a video asset marked as failed by the download task is logged with its event """
+        video_asset = VideoAssetFactory(status=VideoAsset.VideoStatus.PROCESSING)
+        start = CatalogChange.objects.latest("pk").pk
+
+        with patch("events.tasks._download_google_drive_file", side_effect=requests.exceptions.RequestException()):
+            assert download_google_drive_video(video_asset.pk, "https://drive.google.com/file/d/abc/view") is False
+
+        assert self.logged_since(start, CatalogChange.ObjectKind.VIDEO_ASSET) == {video_asset.pk}
+        assert self.logged_since(start, CatalogChange.ObjectKind.EVENT) == {video_asset.event_id}
+
+    def test_usage_counts_are_logged(self, client):
+        """ Test that publishing and deleting an event logs its tags and playlists, whose counts changed """
+        tag, playlist = TagFactory(), PlaylistFactory()
+        event = EventFactory(status=Event.EventStatus.DRAFT)
+        event.tags.add(tag)
+        event.playlists.add(playlist)
+        cursor = client.get(reverse("catalog-changes")).data["cursor"]
+
+        event.status = Event.EventStatus.PUBLISHED
+        event.save()
+        data = self.sync(client, cursor)
+        assert [(row["id"], row["event_count"]) for row in data["tags"]["upserted"]] == [(tag.pk, 1)]
+        assert [(row["id"], row["event_count"]) for row in data["playlists"]["upserted"]] == [(playlist.pk, 1)]
+
+        event.delete()
+        data = self.sync(client, data["cursor"])
+        assert [(row["id"], row["event_count"]) for row in data["tags"]["upserted"]] == [(tag.pk, 0)]
+
+    def test_changes_of_open_transactions_are_held_back(self, client):
+        """ Test that a change committed while an earlier transaction is open waits for it, so neither is skipped """
+        event, tag = EventFactory(status=Event.EventStatus.PUBLISHED), TagFactory()
+        cursor = client.get(reverse("catalog-changes")).data["cursor"]
+
+        slow = connections.create_connection("default")
+        try:
+            slow.set_autocommit(False)
+            with slow.cursor() as cursor_of_slow:
+                cursor_of_slow.execute(
+                    "INSERT INTO events_catalogchange (kind, object_id, action, created, xact_id) "
+                    "VALUES ('TAG', %s, 'UPSERT', now(), pg_current_xact_id()::text::bigint)",
+                    [tag.pk],
+                )
+            event.title = "Committed first"
+            event.save()
+
+            data = self.sync(client, cursor, fields="id")
+            assert (data["cursor"], data["events"]["upserted"]) == (cursor, [])
+            slow.commit()
+        finally:
+            slow.close()
+
+        data = self.sync(client, cursor, fields="id")
+        assert data["events"]["upserted"] == [{"id": event.pk}]
+        assert [row["id"] for row in data["tags"]["upserted"]] == [tag.pk]
+
+    def test_expired_cursor(self, client):
+        """ Test that a cursor older than the kept log is rejected """
+        EventFactory.create_batch(3)
+        CatalogChange.objects.update(created=timezone.now() - timezone.timedelta(days=60))
+        first, count = CatalogChange.objects.earliest("pk").pk, CatalogChange.objects.count()
+
+        assert prune_change_log() == count - 1
+        response = client.get(reverse("catalog-changes"), {"cursor": first})
+        assert response.status_code == 410
+
+        latest = CatalogChange.objects.get().pk
+        assert self.sync(client, latest)["cursor"] == latest
+        assert client.get(reverse("catalog-changes"), {"cursor": 0}).status_code == 410
@@ -0,0 +1,103 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+
+import pytest
+from redis.exceptions import RedisError
+from rest_framework.test import APIClient
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from events.download_progress import (
+    DownloadTracker,
+    RedisDownloadProgressStore,
+    get_download_progress,
+    get_download_progress_store,
+)
+from events.factories import UserFactory, VideoAssetFactory
+from events.models import Event, VideoAsset
+from events.tasks import _save_video_file
+from events.video_status import get_video_status_channel
+
+
+@pytest.mark.django_db
+class TestDownloadProgress:
+    """ Test cases for reporting the progress of video downloads """
+
+    @pytest.fixture
+    def video_asset(self):
+        """ Returns a video asset being downloaded """
+        return VideoAssetFactory(status=VideoAsset.VideoStatus.PROCESSING, event__status=Event.EventStatus.PUBLISHED)
+
+    def test_reports_are_throttled(self, settings, video_asset):
+        """ Test that progress is reported once per interval with the rate and time left """
+        settings.DOWNLOAD_PROGRESS = {**settings.DOWNLOAD_PROGRESS, 'REPORT_INTERVAL': 2}
+
+        with patch('events.download_progress.time.monotonic', side_effect=[0, 1, 2, 2.5, 3]), \
+                patch.object(get_video_status_channel(), 'publish') as publish:
+            tracker = DownloadTracker(video_asset, total=10000)
+            tracker.add(1000)
+            assert get_download_progress(video_asset.pk) is None
+
+            tracker.add(1000)
+            progress = get_download_progress(video_asset.pk)
+            assert (progress.received, progress.total, progress.rate, progress.eta) == (2000, 10000, 1000, 8)
+
+            tracker.add(1000)
+            tracker.add(1000)
+            assert get_download_progress(video_asset.pk).received == 2000
+
+        assert publish.call_count == 1
+        assert publish.call_args.args[0] == {
+            'id': video_asset.pk, 'event': video_asset.event_id, 'status': 'PROCESSING',
+            'received': 2000, 'total': 10000, 'rate': 1000, 'eta': 8,
+        }
+
+        tracker.finish()
+        assert get_download_progress(video_asset.pk) is None
+
+    def test_cleared_when_download_fails(self, video_asset):
+        """ Test that a download reports what it received without Content-Length and clears it when it ends """
+        response = Mock(headers={}, iter_content=Mock(return_value=[b'x' * 50]))
+
+        with patch.object(get_download_progress_store(), 'delete') as delete, \
+                pytest.raises(ValueError, match="too small"):
+            _save_video_file(video_asset, response, 'video.mp4')
+
+        progress = get_download_progress(video_asset.pk)
+        assert (progress.received, progress.total, progress.eta) == (50, None, None)
+        delete.assert_called_once_with(video_asset.pk)
+
+    def test_status_api(self, video_asset):
+        """ Test that the status of a video asset includes the progress of its download """
+        tracker = DownloadTracker(video_asset, total=400)
+        tracker.add(100)
+        tracker.report()
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+
+        response = client.get(reverse('video-asset-status', args=[video_asset.pk]))
+        assert response.status_code == 200
+        assert response.data['status'] == 'PROCESSING'
+        assert response.data['progress']['total'] == 400
+
+        hidden = VideoAssetFactory(event__status=Event.EventStatus.DRAFT)
+        assert client.get(reverse('video-asset-status', args=[hidden.pk])).status_code == 404
+
+    def test_check_videoasset_status(self, video_asset):
+        """ Test that the status command shows the progress of running downloads """
+        tracker = DownloadTracker(video_asset, total=4 * 1024 * 1024)
+        tracker.add(1024 * 1024)
+        tracker.report()
+        out = StringIO()
+
+        call_command('check_videoasset_status', video_asset.pk, stdout=out)
+        assert "Download: 1.0 MB of 4.0 MB (25%)" in out.getvalue()
+
+    def test_redis_unreachable(self):
+        """ Test that progress is left out when Redis cannot be reached """
+        redis_client = Mock()
+        redis_client.pipeline.return_value.execute.side_effect = RedisError("connection refused")
+
+        with patch('events.download_progress.get_redis_client', return_value=redis_client):
+            assert RedisDownloadProgressStore().get_many([1, 2]) == {}
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from rest_framework.test import APIClient
+
+from django.core.management import call_command
+from django.test import AsyncClient
+from django.urls import reverse
+
+from events.export import EXPORT_FIELDS, iter_events
+from events.factories import EventFactory, TagFactory, UserFactory, VideoAssetFactory
+
+
+@pytest.mark.django_db
+class TestEventExport:
+    """ Test cases for the streaming catalog export """
+
+    @pytest.fixture
+    def events(self):
+        """ Three events, the first one tagged and with two videos """
+        events = EventFactory.create_batch(3)
+        events[0].tags.add(TagFactory(name="Python"))
+        events[0].presenters.add(UserFactory())
+        VideoAssetFactory.create_batch(2, event=events[0])
+        return events
+
+    @staticmethod
+    def export(user, **params):
+        """ Request an export as a user and return the response """
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.get(reverse("events-export"), params)
+
+    def test_ndjson_export(self, events):
+        """ Test that staff get every event as a line of JSON """
+        response = self.export(UserFactory(is_staff=True))
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        assert [line["id"] for line in lines] == [event.pk for event in events]
+        assert tuple(lines[0]) == EXPORT_FIELDS
+        assert lines[0]["tags"] == ["Python"]
+        assert lines[0]["presenters"][0]["email"] == events[0].presenters.get().email
+        assert len(lines[0]["videos"]) == 2
+        assert lines[1]["videos"] == []
+
+    def test_csv_export(self, events):
+        """ Test that the CSV export has a header and JSON encoded lists """
+        response = self.export(UserFactory(is_staff=True), export_format="csv")
+
+        assert response["Content-Type"] == "text/csv"
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        assert [int(row["id"]) for row in rows] == [event.pk for event in events]
+        assert json.loads(rows[0]["tags"]) == ["Python"]
+
+    def test_csv_cells_are_not_formulas(self):
+        """ Test that text a spreadsheet would run as a formula is exported quoted """
+        EventFactory(title="=HYPERLINK(\"http://example.com\")", description="-1+2")
+
+        response = self.export(UserFactory(is_staff=True), export_format="csv")
+        row = next(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        assert (row["title"], row["description"]) == ("'=HYPERLINK(\"http://example.com\")", "'-1+2")
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_under_asgi(self, events):
+        """ Test that the ASGI handler gets an async iterator it streams instead of reading it into a list """
+        client = AsyncClient()
+        client.force_login(UserFactory(is_staff=True))
+
+        async def export():
+            response = await client.get(reverse("events-export"))
+            return response.is_async, [line async for line in response.streaming_content]
+
+        is_async, lines = async_to_sync(export)()
+        assert is_async
+        assert [json.loads(line)["id"] for line in lines] == [event.pk for event in events]
+
+    def test_export_is_for_staff(self, events):  # pylint: disable=unused-argument
+        """ Test that other users cannot export the catalog """
+        assert self.export(UserFactory()).status_code == 403
+
+    def test_chunks_use_constant_queries(self, events, django_assert_num_queries):
+        """ Test that each chunk costs the same few queries, whatever its size """
+        # The events, then per chunk of two: tags, playlists, presenters, first videos, all videos
+        with django_assert_num_queries(1 + 2 * 5):
+            assert len(list(iter_events(chunk_size=2))) == len(events)
+
+    def test_export_command(self, events):
+        """ Test that the command writes the same NDJSON """
+        out = io.StringIO()
+        call_command("export_events", stdout=out)
+        assert [json.loads(line)["id"] for line in out.getvalue().splitlines()] == [event.pk for event in events]
@@ -92,6 +92,20 @@ class TestEventFilters:
         assert len(response.data["results"]) == 1
         assert response.data["results"][0]["title"] == "Python Event"
 
+    def test_events_id_filters(self, api_client):
+        """ Test filtering events by tag and playlist ids """
+        tag, playlist = TagFactory(), PlaylistFactory()
+        tagged = self._create_event_with_video(title="Tagged")
+        tagged.tags.add(tag)
+        listed = self._create_event_with_video(title="Listed")
+        listed.playlists.add(playlist)
+
+        response = api_client.get(reverse("events-list"), {'tag_id': tag.pk})
+        assert [event["title"] for event in response.data["results"]] == ["Tagged"]
+
+        response = api_client.get(reverse("events-list"), {'playlist_id': playlist.pk})
+        assert [event["title"] for event in response.data["results"]] == ["Listed"]
+
     def test_events_ordering_by_event_type(self, api_client):
         """ Test ordering events by event type """
         self._create_event_with_video(title="Conference A", event_type="conference")
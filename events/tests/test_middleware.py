@@ -0,0 +1,126 @@
+import gzip
+import json
+from unittest.mock import patch
+
+import brotli
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+
+from arbisoft_sessions_portal import middleware
+from arbisoft_sessions_portal.middleware import CompressionMiddleware, negotiate_encoding
+from events.factories import EventFactory, UserFactory, VideoAssetFactory
+
+DATA = [{'title': f"Session {i}", 'description': "Long description"} for i in range(100)]
+BODY = json.dumps(DATA).encode()
+
+
+def json_response():
+    """ A JSON response large enough to be compressed """
+    return JsonResponse(DATA, safe=False)
+
+
+def respond(response, accept_encoding='gzip, deflate, br'):
+    """ Run a response through the compression middleware """
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+    return CompressionMiddleware(lambda _: response)(request)
+
+
+class TestCompressionMiddleware:
+    """ Test cases for response compression """
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        """ Start every test without cached compressed variants """
+        caches['shared'].clear()
+
+    @pytest.mark.parametrize('accept_encoding, expected', [
+        ('gzip, deflate, br', 'br'),
+        ('gzip', 'gzip'),
+        ('br;q=0.5, gzip;q=0.8', 'gzip'),
+        ('br;q=0, gzip', 'gzip'),
+        ('*', 'br'),
+        ('gzip;q=0, identity', None),
+        ('', None),
+    ])
+    def test_negotiation(self, accept_encoding, expected):
+        """ Test picking an encoding from Accept-Encoding """
+        assert negotiate_encoding(accept_encoding) == expected
+
+    def test_gzip_without_brotli(self):
+        """ Test that gzip is used when the brotli package is not installed """
+        with patch.object(middleware, 'brotli', None):
+            assert negotiate_encoding('gzip, br') == 'gzip'
+
+    def test_brotli(self):
+        """ Test that JSON is compressed with brotli when accepted """
+        response = respond(json_response())
+        assert response['Content-Encoding'] == 'br'
+        assert response['Vary'] == 'Accept-Encoding'
+        assert int(response['Content-Length']) == len(response.content) < len(BODY)
+        assert brotli.decompress(response.content) == BODY
+
+    def test_gzip(self):
+        """ Test that JSON is compressed with gzip when brotli is not accepted """
+        response = respond(json_response(), 'gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.content) == BODY
+
+    @pytest.mark.parametrize('response', [
+        JsonResponse({'small': True}),
+        HttpResponse(BODY, content_type='image/png'),
+        StreamingHttpResponse(iter([BODY]), content_type='application/x-ndjson'),
+    ])
+    def test_skipped_responses(self, response):
+        """ Test that small, binary and streaming responses are left alone """
+        assert not respond(response).has_header('Content-Encoding')
+
+    def test_reusable_response_is_compressed_once(self):
+        """ Test that responses with an ETag reuse their cached compressed variant """
+        with patch.object(middleware, 'compress', wraps=middleware.compress) as compress:
+            for _ in range(3):
+                response = json_response()
+                response['ETag'] = '"v1"'
+                response = respond(response)
+                assert brotli.decompress(response.content) == BODY
+                assert response['ETag'] == 'W/"v1"'
+
+            response = json_response()
+            patch_cache_control(response, max_age=60)
+            respond(response)
+        assert compress.call_count == 1
+
+    def test_gzip_is_not_cached(self):
+        """ Test that reusable responses sent with gzip are compressed every time, with fresh padding """
+        with patch.object(middleware, 'compress', wraps=middleware.compress) as compress:
+            for _ in range(2):
+                response = json_response()
+                response['ETag'] = '"v1"'
+                assert gzip.decompress(respond(response, 'gzip').content) == BODY
+        assert compress.call_count == 2
+
+    def test_unique_responses_are_not_cached(self):
+        """ Test that responses without an ETag or max-age are compressed every time """
+        with patch.object(middleware, 'compress', wraps=middleware.compress) as compress:
+            for _ in range(2):
+                respond(json_response())
+        assert compress.call_count == 2
+
+    @pytest.mark.django_db
+    def test_events_list_is_compressed(self):
+        """ Test compression of a real API response """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        for _ in range(10):
+            VideoAssetFactory(event=EventFactory())
+
+        response = client.get(reverse("events-list"), HTTP_ACCEPT_ENCODING='br')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Encoding'] == 'br'
+        assert len(json.loads(brotli.decompress(response.content))['results']) == 10
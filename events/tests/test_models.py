@@ -0,0 +1,63 @@
+import pytest
+
+from events.factories import EventFactory
+from events.models import Event, SlugCounter
+
+
+@pytest.mark.django_db
+class TestEventSlugAllocation:
+    """ Test cases for allocating event slugs before insert """
+
+    def test_slug_from_title(self):
+        """ Test that a new event gets the slugified title """
+        event = EventFactory(title="Intro to Django!", slug=None)
+        event.refresh_from_db()
+        assert event.slug == "intro-to-django"
+
+    def test_same_title_gets_numbered_slug(self):
+        """ Test that events sharing a title get numbered slugs """
+        slugs = [EventFactory(title="Weekly Sync", slug=None).slug for _ in range(3)]
+        assert slugs == ["weekly-sync", "weekly-sync-2", "weekly-sync-3"]
+
+    def test_existing_slug_is_skipped(self):
+        """ Test that a slug already taken by another event is never handed out again """
+        EventFactory(title="Something else", slug="weekly-sync")
+        EventFactory(title="Other", slug="weekly-sync-2")
+        event = EventFactory(title="Weekly Sync", slug=None)
+        assert event.slug == "weekly-sync-3"
+
+    def test_explicit_slug_is_kept(self):
+        """ Test that a slug set by hand is not replaced """
+        event = EventFactory(title="Weekly Sync", slug="custom")
+        assert event.slug == "custom"
+        assert not SlugCounter.objects.exists()
+
+    def test_create_has_no_follow_up_update(self, django_assert_num_queries):
+        """ Test that creating an event reserves its slug without updating the event afterwards """
+        creator = EventFactory().creator
+        # Reserve the number, check it is free, insert the event, log the change
+        with django_assert_num_queries(4) as context:
+            Event(creator=creator, title="Weekly Sync", description="", event_time="2025-01-01T00:00Z").save()
+        assert not any(query['sql'].startswith('UPDATE') for query in context.captured_queries)
+
+    def test_bulk_create_allocates_slugs(self):
+        """ Test that bulk created events get unique slugs """
+        creator = EventFactory(title="Weekly Sync", slug="weekly-sync").creator
+        events = Event.objects.bulk_create(
+            Event(creator=creator, title=title, description="", event_time="2025-01-01T00:00Z")
+            for title in ("Weekly Sync", "Weekly Sync", "Retro", "???")
+        )
+        assert sorted(event.slug for event in events[:2]) == ["weekly-sync-2", "weekly-sync-3"]
+        assert [event.slug for event in events[2:]] == ["retro", "event"]
+
+    def test_allocate_reserves_numbers_per_base(self):
+        """ Test that titles sharing a base slug reserve their numbers in one go """
+        assert SlugCounter.objects.allocate(["Demo", "demo", "DEMO!"]) == ["demo", "demo-2", "demo-3"]
+        assert SlugCounter.objects.get(base="demo").last_number == 3
+
+    def test_long_title_leaves_room_for_number(self):
+        """ Test that numbered slugs of long titles still fit the slug column """
+        title = "word " * 100
+        slugs = SlugCounter.objects.allocate([title, title])
+        assert all(len(slug) <= Event._meta.get_field('slug').max_length for slug in slugs)
+        assert slugs[1] == f"{slugs[0]}-2"
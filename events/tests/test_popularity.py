@@ -0,0 +1,56 @@
+import pytest
+
+from django.utils import timezone
+
+from events.factories import EventFactory, VideoAssetFactory
+from events.models import Event, EventDailyStats
+from events.popularity import record_view, rollup_event_views, update_trending_scores
+from events.tasks import rollup_event_views_task
+
+
+@pytest.mark.django_db
+class TestPopularity:
+    """ Test cases for view counting and trending ranking """
+
+    @staticmethod
+    def published_event():
+        """ A published event with a video """
+        event = EventFactory(status=Event.EventStatus.PUBLISHED)
+        VideoAssetFactory(event=event)
+        return event
+
+    def test_rollup_is_idempotent(self):
+        """ Test that rolling up the same counters again leaves the daily stats as they are """
+        event = self.published_event()
+        record_view(event.pk, 1)
+        record_view(event.pk, 2)
+        record_view(event.pk + 1000, 1)
+
+        assert rollup_event_views() == 1
+        rollup_event_views_task()
+        stats = EventDailyStats.objects.get()
+        assert (stats.event_id, stats.date, stats.plays, stats.unique_viewers) == (
+            event.pk, timezone.now().date(), 2, 2
+        )
+
+        record_view(event.pk, 1)
+        rollup_event_views()
+        stats.refresh_from_db()
+        assert (stats.plays, stats.unique_viewers) == (3, 2)
+
+    def test_trending_scores_decay(self):
+        """ Test that views lose half their weight every half life and drop out after the window """
+        today = timezone.now().date()
+        fresh, older, expired = (self.published_event() for _ in range(3))
+        EventDailyStats.objects.bulk_create([
+            EventDailyStats(event=fresh, date=today, plays=4, unique_viewers=4),
+            EventDailyStats(event=older, date=today - timezone.timedelta(days=3), plays=4, unique_viewers=4),
+            EventDailyStats(event=expired, date=today - timezone.timedelta(days=30), plays=4, unique_viewers=4),
+        ])
+        Event.objects.filter(pk=expired.pk).update(trending_score=1)
+
+        update_trending_scores(today)
+        scores = dict(Event.objects.values_list('pk', 'trending_score'))
+        assert scores[fresh.pk] == pytest.approx(5)
+        assert scores[older.pk] == pytest.approx(2.5)
+        assert scores[expired.pk] == 0
@@ -0,0 +1,164 @@
+import json
+from datetime import timedelta
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from events.factories import PlaylistFactory, UserFactory
+from events.models import Event, VideoAsset
+
+SEEDED_EVENTS = 500
+# The index Django names after the table and column for the LIKE lookups of an indexed slug
+SLUG_INDEX = 'events_event_slug_b44b2c04_like'
+
+
+def _scans(plan, relation):
+    """ Yield every plan node that reads the given table """
+    if plan.get('Relation Name') == relation:
+        yield plan
+    for child in plan.get('Plans', ()):
+        yield from _scans(child, relation)
+
+
+def _index_names(plan):
+    """ Yield the name of every index read anywhere in a plan """
+    if 'Index Name' in plan:
+        yield plan['Index Name']
+    for child in plan.get('Plans', ()):
+        yield from _index_names(child)
+
+
+def _explain(sql):
+    """
+    EXPLAIN a statement with sequential scans disabled and return its plan.
+    The seeded tables are small enough for a sequential scan to be the cheapest plan, disabling them
+    shows which index the planner picks once the tables are large.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+        cursor.execute("SET LOCAL enable_seqscan = on")
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def _is_full_table_scan(node):
+    """ Whether a scan reads the whole table: a sequential scan, or a primary key walk without an index condition """
+    return node['Node Type'] == 'Seq Scan' or (
+        node.get('Index Name', '').endswith('_pkey') and 'Index Cond' not in node
+    )
+
+
+@pytest.mark.django_db
+class TestEventQueryPlans:
+    """ Make sure the hot Event queries are served by indexes instead of full table scans """
+
+    @pytest.fixture
+    def api_client(self):
+        """ Returns an authenticated instance of APIClient """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        return client
+
+    @pytest.fixture(autouse=True)
+    def seeded_events(self):
+        """ Seed enough events for the planner to tell index and sequential scans apart """
+        creator = UserFactory()
+        now = timezone.now()
+        statuses = list(Event.EventStatus)
+        events = Event.objects.bulk_create(
+            Event(
+                creator=creator,
+                title=f"Session {i}",
+                slug=f"session-{i}",
+                description="Seeded event",
+                event_time=now - timedelta(days=i),
+                status=statuses[i % len(statuses)],
+                is_featured=i % 10 == 0,
+            )
+            for i in range(SEEDED_EVENTS)
+        )
+        VideoAsset.objects.bulk_create(
+            VideoAsset(event=event, title=event.title, status=VideoAsset.VideoStatus.READY) for event in events
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Event._meta.db_table}")
+            cursor.execute(f"ANALYZE {VideoAsset._meta.db_table}")
+        return events
+
+    def assert_uses_indexes(self, api_client, url, *index_names):
+        """
+        Request the url and check that no statement touching events_event scans the whole table,
+        and that the given indexes are among those read, so a less selective index is caught too
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+
+        statements = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and Event._meta.db_table in query['sql']
+        ]
+        assert statements
+        used = set()
+        for sql in statements:
+            plan = _explain(sql)
+            assert not any(map(_is_full_table_scan, _scans(plan, Event._meta.db_table))), (
+                f"Full table scan of {Event._meta.db_table} in: {sql}"
+            )
+            used.update(_index_names(plan))
+        assert set(index_names) <= used, f"Expected {sorted(index_names)} to be used, the plans read {sorted(used)}"
+
+    @pytest.mark.parametrize('query, index_name', [
+        ('status=PUBLISHED', 'event_published_time_idx'),
+        ('status=PUBLISHED&ordering=-event_time', 'event_published_time_idx'),
+        ('is_featured=true&status=PUBLISHED', 'event_featured_time_idx'),
+        # SESSION is the only event type, so the type does not narrow the published events down
+        ('event_type=SESSION&status=PUBLISHED&ordering=-event_time', 'event_published_time_idx'),
+        ('status=PUBLISHED&ordering=-trending', 'event_trending_idx'),
+    ])
+    def test_events_list(self, api_client, query, index_name):
+        """ Test that filtered event listings use the matching Event index """
+        self.assert_uses_indexes(api_client, f"{reverse('events-list')}?{query}", index_name)
+
+    def test_trending(self, api_client, seeded_events):
+        """ Test that trending events are read from the trending index """
+        Event.objects.filter(pk__in=[event.pk for event in seeded_events[:20]]).update(trending_score=1)
+        self.assert_uses_indexes(api_client, reverse('events-trending'), 'event_trending_idx')
+
+    def test_video_asset_detail(self, api_client, seeded_events):
+        """ Test that looking up a video by its event slug uses the slug index """
+        self.assert_uses_indexes(
+            api_client, reverse('video-asset-detail', args=[seeded_events[0].slug]), SLUG_INDEX
+        )
+
+    def test_recommendations(self, api_client, seeded_events):
+        """ Test that recommendations use the slug and published event indexes """
+        self.assert_uses_indexes(
+            api_client, reverse('recommendation', args=[seeded_events[0].slug]), SLUG_INDEX, 'event_published_time_idx'
+        )
+
+    def test_home_feed(self, api_client, seeded_events):
+        """ Test that computing the home feed rows uses the Event indexes """
+        Event.objects.filter(pk__in=[event.pk for event in seeded_events[:20]]).update(trending_score=1)
+        self.assert_uses_indexes(
+            api_client, reverse('events-home'),
+            'event_featured_time_idx', 'event_trending_idx', 'event_published_time_idx',
+        )
+
+    def test_playlist_detail(self, api_client, seeded_events):
+        """ Test that the events of a playlist are read in order from the playlist position index """
+        playlist = PlaylistFactory()
+        playlist.events.add(*seeded_events[:20])
+        self.assert_uses_indexes(
+            api_client, reverse('playlist-detail', args=[playlist.pk]), 'playlist_item_position_idx'
+        )
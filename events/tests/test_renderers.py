@@ -0,0 +1,87 @@
+import datetime
+import decimal
+import io
+import uuid
+from zoneinfo import ZoneInfo
+
+import pytest
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from arbisoft_sessions_portal.parsers import ORJSONParser
+from arbisoft_sessions_portal.renderers import ORJSONRenderer
+from events.factories import EventFactory, TagFactory, UserFactory, VideoAssetFactory
+from events.models import Tag
+
+
+@pytest.mark.django_db
+class TestORJSONRenderer:
+    """ Test cases for the orjson renderer and parser """
+
+    @pytest.fixture
+    def api_client(self):
+        """ Returns an authenticated instance of APIClient """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        return client
+
+    @pytest.mark.parametrize('data', [
+        {'utc': datetime.datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc)},
+        {'whole_seconds': datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)},
+        {'offset': datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=ZoneInfo('Asia/Karachi'))},
+        {'naive': datetime.datetime(2025, 1, 2, 3, 4, 5), 'date': datetime.date(2025, 1, 2)},
+        {'time': datetime.time(3, 4, 5, 6)},
+        {'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'), 'decimal': decimal.Decimal('1.50')},
+        {'lazy': gettext_lazy("Published"), 'unicode': "Café ☕ 日本", 'separators': "a b c"},
+        {'nested': [{'a': 1, 'b': None, 'c': True}, (1, 2.5, "x")], 1: 'int key'},
+    ])
+    def test_parity_with_json_renderer(self, data):
+        """ Test that the output is byte-identical to DRF's JSONRenderer """
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_queryset(self):
+        """ Test that values_list querysets returned by serializer methods are rendered as lists """
+        TagFactory(name="b")
+        TagFactory(name="a")
+        data = {'tags': Tag.objects.order_by('name').values_list('name', flat=True)}
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data) == b'{"tags":["a","b"]}'
+
+    def test_indent_falls_back_to_drf(self):
+        """ Test that indented output, used by the browsable API, matches DRF """
+        data = {'a': [1, 2]}
+        assert ORJSONRenderer().render(data, 'application/json; indent=4') == JSONRenderer().render(
+            data, 'application/json; indent=4'
+        )
+        assert ORJSONRenderer().render(None) == b''
+
+    def test_events_list_parity(self, api_client):
+        """ Test that an events page renders the same as with DRF's JSONRenderer """
+        for _ in range(3):
+            VideoAssetFactory(event=EventFactory(title="Ünïcode session"))
+        response = api_client.get(reverse("events-list"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == JSONRenderer().render(response.data)
+
+    def test_browsable_api(self, api_client):
+        """ Test that the browsable API still renders """
+        response = api_client.get(reverse("tag-list"), HTTP_ACCEPT='text/html')
+        assert response.status_code == status.HTTP_200_OK
+        assert b'<html' in response.content
+
+    def test_parser(self):
+        """ Test that the parser accepts the same documents as DRF's JSONParser """
+        body = '{"title": "Café", "ids": [1, 2], "nested": {"ok": true, "none": null}}'.encode()
+        assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+    @pytest.mark.parametrize('body', [b'{"a": ', b'{"a": NaN}', b''])
+    def test_parser_errors(self, body):
+        """ Test that invalid and non-strict documents are rejected """
+        with pytest.raises(ParseError, match="JSON parse error"):
+            ORJSONParser().parse(io.BytesIO(body))
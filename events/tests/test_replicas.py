@@ -0,0 +1,139 @@
+from unittest.mock import patch
+
+import pytest
+from redis.exceptions import RedisError
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+
+from arbisoft_sessions_portal import replicas
+from arbisoft_sessions_portal.replicas import ReplicaPinMiddleware, is_pinned, pin_to_primary, replica_lag
+from events.factories import EventFactory, TagFactory, UserFactory, VideoAssetFactory
+from events.models import Event
+
+
+@pytest.mark.django_db(databases=['default', 'replica'])
+class TestReplicaRouting:
+    """ Test cases for routing catalog reads to a replica, with the primary and the replica being separate databases """
+
+    @pytest.fixture(autouse=True)
+    def replica(self, settings):
+        """ Enable the replica and start without pins or cached lag checks """
+        settings.DATABASE_REPLICAS = {**settings.DATABASE_REPLICAS, 'ALIASES': ['replica']}
+        replicas._replica_health.clear()  # pylint: disable=protected-access
+        caches['shared'].clear()
+
+    @pytest.fixture
+    def user(self):
+        """ Returns a user """
+        return UserFactory()
+
+    @pytest.fixture
+    def api_client(self, user):
+        """ Returns an authenticated instance of APIClient """
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    @pytest.fixture
+    def event(self):
+        """ An event that only exists on the primary """
+        event = EventFactory()
+        VideoAssetFactory(event=event)
+        return event
+
+    def events_count(self, api_client):
+        """ Number of events the list endpoint sees """
+        response = api_client.get(reverse('events-list'))
+        assert response.status_code == status.HTTP_200_OK
+        return response.data['count']
+
+    def test_reads_from_replica(self, api_client, event):
+        """ Test that catalog reads are served by the replica """
+        assert Event.objects.filter(pk=event.pk).exists()
+        assert self.events_count(api_client) == 0
+
+        TagFactory(name="primary-only")
+        response = api_client.get(reverse('tag-list'))
+        assert response.data == []
+
+    def test_search_facets_from_replica(self, api_client, event):
+        """ Test that the raw facet query runs on the same database as the search """
+        response = api_client.get(reverse('events-search'), {'search': event.title})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 0
+        assert response.data['facets']['tags'] == []
+
+    def test_read_your_writes(self, api_client, user, event):
+        """ Test that a user who just wrote reads from the primary, while others keep using the replica """
+        pin_to_primary(user)
+        assert self.events_count(api_client) == 1
+
+        other_client = APIClient()
+        other_client.force_authenticate(user=UserFactory())
+        assert self.events_count(other_client) == 0
+        assert event.pk
+
+    def test_unreachable_pins_read_from_primary(self, api_client, event):
+        """ Test that reads go to the primary when the pins cannot be read """
+        with patch.object(caches['shared'], 'get', side_effect=RedisError("connection refused")):
+            assert self.events_count(api_client) == 1
+        assert event.pk
+
+    def test_no_replicas_skip_pins(self, api_client, settings, event):
+        """ Test that pins are not looked up when there are no replicas """
+        settings.DATABASE_REPLICAS = {**settings.DATABASE_REPLICAS, 'ALIASES': []}
+        with patch.object(replicas, 'is_pinned') as pinned:
+            assert self.events_count(api_client) == 1
+        assert not pinned.called
+        assert event.pk
+
+    def test_pin_middleware(self, user):
+        """ Test that successful requests writing to the database pin the user, others do not """
+        request_factory = RequestFactory()
+
+        def respond(request, status_code, write):
+            def get_response(_):
+                if write:
+                    TagFactory()
+                return HttpResponse(status=status_code)
+
+            request.user = user
+            return ReplicaPinMiddleware(get_response)(request)
+
+        respond(request_factory.get('/'), 200, write=False)
+        respond(request_factory.post('/'), 202, write=False)
+        respond(request_factory.post('/'), 400, write=True)
+        assert not is_pinned(user)
+
+        respond(request_factory.post('/'), 201, write=True)
+        assert is_pinned(user)
+
+    @pytest.mark.parametrize('lag', [100, DatabaseError("connection refused")])
+    def test_lagging_replica_falls_back_to_primary(self, api_client, event, lag):
+        """ Test that a replica too far behind or unreachable is skipped until it is checked again """
+        with patch.object(replicas, 'replica_lag', side_effect=[lag]) as check:
+            assert self.events_count(api_client) == 1
+            assert self.events_count(api_client) == 1
+        assert check.call_count == 1
+        assert event.pk
+
+    def test_replica_lag(self):
+        """ Test that a database which is not replicating reports no lag """
+        assert replica_lag('replica') == 0
+
+    def test_writes_go_to_primary(self):
+        """ Test that writes use the primary, and that reads made after a write in the same request do too """
+        token = replicas._read_alias.set('replica')  # pylint: disable=protected-access
+        try:
+            assert Event.objects.all().db == 'replica'
+            EventFactory(title="Written during a replica read")
+            assert Event.objects.all().db == 'default'
+        finally:
+            replicas._read_alias.reset(token)  # pylint: disable=protected-access
+        assert Event.objects.using('default').filter(title="Written during a replica read").exists()
@@ -0,0 +1,91 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from arbisoft_sessions_portal import schema
+from arbisoft_sessions_portal.schema import get_cached_schema, schema_artifact_path
+
+
+class TestCachedSchema:
+    """ Test cases for the precomputed OpenAPI schema """
+
+    @pytest.fixture(autouse=True)
+    def clear_cached_schema(self):
+        """ Every test starts without a schema in memory """
+        get_cached_schema.cache_clear()
+        yield
+        get_cached_schema.cache_clear()
+
+    @pytest.fixture
+    def versioned(self, settings, tmp_path):
+        """ Configure a code version with an empty artifact directory """
+        settings.OPENAPI_SCHEMA = {'CODE_VERSION': 'abc123', 'ARTIFACT_DIR': str(tmp_path)}
+        return tmp_path
+
+    def test_generated_once(self):
+        """ Test that the schema is generated on the first request only and served in every format """
+        client = APIClient()
+        with patch.object(schema, 'generate_schema', wraps=schema.generate_schema) as generate:
+            yaml_response = client.get(reverse('schema'))
+            json_response = client.get(reverse('schema'), HTTP_ACCEPT='application/json')
+            client.get(reverse('schema'))
+        assert generate.call_count == 1
+
+        assert yaml_response.status_code == json_response.status_code == status.HTTP_200_OK
+        assert yaml_response['Content-Type'] == 'application/vnd.oai.openapi; charset=utf-8'
+        assert b'/api/v1/events/all/' in yaml_response.content
+        assert '/api/v1/events/all/' in json.loads(json_response.content)['paths']
+        assert yaml_response['ETag'] == json_response['ETag']
+
+    def test_not_modified(self):
+        """ Test that a matching If-None-Match is answered without a body """
+        client = APIClient()
+        etag = client.get(reverse('schema'))['ETag']
+
+        response = client.get(reverse('schema'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+
+    def test_lang_bypasses_cache(self):
+        """ Test that translated schemas are still generated on demand """
+        client = APIClient()
+        with patch.object(schema, 'generate_schema') as generate:
+            response = client.get(reverse('schema'), {'lang': 'en-us'})
+        assert response.status_code == status.HTTP_200_OK
+        assert not response.has_header('ETag')
+        generate.assert_not_called()
+
+    def test_artifact(self, versioned):
+        """ Test that the command writes the versioned artifact and requests are served from it """
+        out = StringIO()
+        call_command('build_openapi_schema', stdout=out)
+        assert schema_artifact_path() == versioned / 'openapi-abc123.json'
+        assert 'Wrote OpenAPI schema' in out.getvalue()
+
+        call_command('build_openapi_schema', stdout=out)
+        assert 'already exists' in out.getvalue()
+
+        with patch.object(schema, 'generate_schema') as generate:
+            response = APIClient().get(reverse('schema'), HTTP_ACCEPT='application/json')
+        generate.assert_not_called()
+        assert json.loads(response.content) == json.loads(schema_artifact_path().read_bytes())
+
+    def test_missing_artifact(self, versioned):
+        """ Test that the schema is generated when the artifact for this version was not built """
+        assert not (versioned / 'openapi-abc123.json').exists()
+        response = APIClient().get(reverse('schema'))
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_command_without_version(self, settings):
+        """ Test that the command does nothing when no code version is configured """
+        settings.OPENAPI_SCHEMA = {'CODE_VERSION': '', 'ARTIFACT_DIR': '/nonexistent'}
+        out = StringIO()
+        call_command('build_openapi_schema', stdout=out)
+        assert 'CODE_VERSION is not set' in out.getvalue()
@@ -0,0 +1,81 @@
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from events.factories import (
+    EventFactory,
+    EventPresenterFactory,
+    PlaylistFactory,
+    TagFactory,
+    UserFactory,
+    VideoAssetFactory,
+)
+from events.models import Event, VideoAsset
+from events.v1.serializers import EventRowSerializer, EventSerializer
+
+
+@pytest.mark.django_db
+class TestEventRowSerializer:
+    """ Test cases for the read-only event row serializer """
+
+    @pytest.fixture
+    def events(self):
+        """ Events covering every related field, including missing ones """
+        tags = [TagFactory(name=name) for name in ("zeta", "alpha", "mid")]
+        playlists = [PlaylistFactory(name=name) for name in ("Series B", "Series A")]
+
+        full = EventFactory(is_featured=True)
+        full.tags.add(*tags)
+        full.playlists.add(*playlists)
+        EventPresenterFactory(event=full, user=UserFactory(first_name="Zoe"))
+        EventPresenterFactory(event=full, user=UserFactory(first_name="Adam"))
+        first_video = VideoAssetFactory(event=full, duration=120)
+        VideoAssetFactory(event=full, duration=300)
+        VideoAsset.objects.filter(pk=first_video.pk).update(
+            thumbnail="thumb nail.jpg", video_file="session video.mp4"
+        )
+
+        bare = EventFactory(status=Event.EventStatus.DRAFT)
+        no_duration = EventFactory()
+        VideoAssetFactory(event=no_duration, duration=0)
+        return [full, bare, no_duration]
+
+    def test_output_matches_event_serializer(self, events):
+        """ Test that both serializers render byte-identical JSON """
+        queryset = Event.objects.filter(pk__in=[event.pk for event in events]).order_by('-id')
+        expected = JSONRenderer().render(EventSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(EventRowSerializer().to_representation(EventRowSerializer().values(queryset)))
+        assert actual == expected
+
+    def test_related_fields(self, events):
+        """ Test ordering and fallbacks of the related fields """
+        data = EventRowSerializer().to_representation(EventRowSerializer().values(Event.objects.order_by('id')))
+        full, bare, no_duration = data[0], data[1], data[2]
+
+        assert full['tags'] == ["alpha", "mid", "zeta"]
+        assert full['playlists'] == ["Series A", "Series B"]
+        assert [presenter['first_name'] for presenter in full['presenters']] == ["Zoe", "Adam"]
+        assert full['thumbnail'] == "/media/thumbnails/thumb%20nail.jpg"
+        assert full['video_file'] == "/media/videos/session%20video.mp4"
+        assert full['video_duration'] == 120
+        assert full['publisher']['id'] == events[0].creator_id
+        assert (bare['tags'], bare['thumbnail'], bare['video_file'], bare['video_duration']) == ([], '', '', None)
+        assert no_duration['video_duration'] is None
+
+    def test_query_count_is_constant(self, django_assert_num_queries):
+        """ Test that a page costs one query per relation regardless of its size """
+        for _ in range(20):
+            event = EventFactory()
+            event.tags.add(TagFactory())
+            event.playlists.add(PlaylistFactory())
+            EventPresenterFactory(event=event)
+            VideoAssetFactory(event=event)
+
+        # Events, tags, playlists, presenters, videos
+        with django_assert_num_queries(5):
+            data = EventRowSerializer().to_representation(EventRowSerializer().values(Event.objects.all()))
+        assert len(data) == 20
+
+    def test_empty_page(self, django_assert_num_queries):
+        """ Test that an empty page does not query related data """
+        with django_assert_num_queries(0):
+            assert not EventRowSerializer().to_representation([])
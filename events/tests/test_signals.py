@@ -0,0 +1,171 @@
+from unittest.mock import patch
+
+import pytest
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from events.factories import EventFactory, PlaylistFactory, TagFactory
+from events.models import CatalogChange, Event, Playlist, PlaylistItem, Tag
+from events.signals import NEIGHBOURS_UPDATE_DELAY
+from events.tasks import reconcile_usage_counts_task
+
+
+@pytest.mark.django_db
+class TestUsageCountSignals:
+    """ Test cases for keeping tag and playlist usage counts in sync """
+
+    @staticmethod
+    def _counts(*objects):
+        return [type(obj).objects.get(pk=obj.pk).published_event_count for obj in objects]
+
+    def test_counts_follow_links_from_event_side(self):
+        """ Test adding, removing and clearing tags and playlists on an event """
+        tag, other_tag, playlist = TagFactory(), TagFactory(), PlaylistFactory()
+        event = EventFactory()
+
+        event.tags.add(tag, other_tag)
+        event.playlists.add(playlist)
+        assert self._counts(tag, other_tag, playlist) == [1, 1, 1]
+        assert Tag.objects.get(pk=tag.pk).last_used is not None
+
+        event.tags.remove(tag)
+        event.tags.remove(tag)
+        assert self._counts(tag, other_tag) == [0, 1]
+
+        event.tags.clear()
+        event.playlists.clear()
+        assert self._counts(tag, other_tag, playlist) == [0, 0, 0]
+
+    def test_counts_follow_links_from_tag_side(self):
+        """ Test linking events through the reverse relation """
+        tag = TagFactory()
+        events = EventFactory.create_batch(2)
+
+        tag.events.add(*events)
+        assert self._counts(tag) == [2]
+
+        tag.events.remove(events[0])
+        assert self._counts(tag) == [1]
+
+    def test_only_published_events_are_counted(self):
+        """ Test that draft events are ignored and status changes are tracked """
+        tag, playlist = TagFactory(), PlaylistFactory()
+        event = EventFactory(status=Event.EventStatus.DRAFT)
+        event.tags.add(tag)
+        event.playlists.add(playlist)
+        assert self._counts(tag, playlist) == [0, 0]
+        assert Playlist.objects.get(pk=playlist.pk).last_used is None
+
+        event.status = Event.EventStatus.PUBLISHED
+        event.save()
+        assert self._counts(tag, playlist) == [1, 1]
+        assert Playlist.objects.get(pk=playlist.pk).last_used is not None
+
+        event.status = Event.EventStatus.ARCHIVED
+        event.save(update_fields=['status'])
+        assert self._counts(tag, playlist) == [0, 0]
+
+    def test_status_change_of_loaded_event_is_not_queried(self):
+        """ Test that the status an event was loaded with tells a status change, without reading it again """
+        tag = TagFactory()
+        EventFactory(status=Event.EventStatus.DRAFT).tags.add(tag)
+        event = Event.objects.get()
+
+        event.status = Event.EventStatus.PUBLISHED
+        with CaptureQueriesContext(connection) as queries:
+            event.save()
+        assert not [query for query in queries if query['sql'].startswith('SELECT "events_event"."status"')]
+        assert self._counts(tag) == [1]
+
+        event.status = Event.EventStatus.DRAFT
+        event.save(update_fields=['status'])
+        assert self._counts(tag) == [0]
+
+    def test_drifted_counts_are_reconciled(self):
+        """ Test that counts left behind by updates without signals are fixed and logged """
+        tag, playlist, untouched = TagFactory(), PlaylistFactory(), TagFactory()
+        event = EventFactory()
+        event.tags.add(tag)
+        event.playlists.add(playlist)
+        EventFactory().tags.add(untouched)
+        Event.objects.filter(pk=event.pk).update(status=Event.EventStatus.DRAFT)
+        assert self._counts(tag, playlist) == [1, 1]
+        CatalogChange.objects.all().delete()
+
+        assert reconcile_usage_counts_task() == 2
+        assert self._counts(tag, playlist, untouched) == [0, 0, 1]
+        assert set(CatalogChange.objects.values_list('kind', 'object_id')) == {
+            (CatalogChange.ObjectKind.TAG, tag.pk), (CatalogChange.ObjectKind.PLAYLIST, playlist.pk)
+        }
+        assert reconcile_usage_counts_task() == 0
+
+    def test_counts_are_refreshed_on_delete(self):
+        """ Test that deleting an event releases its tags """
+        tag = TagFactory()
+        event = EventFactory()
+        event.tags.add(tag)
+
+        event.delete()
+        assert self._counts(tag) == [0]
+
+
+@pytest.mark.django_db
+class TestPlaylistItemSignals:
+    """ Test cases for ordering events added to playlists """
+
+    def test_added_events_are_appended(self):
+        """ Test that events added from either side go after the last event of the playlist """
+        playlist, other_playlist = PlaylistFactory(), PlaylistFactory()
+        first, second, third = EventFactory.create_batch(3)
+        PlaylistItem.objects.create(playlist=playlist, event=first, position=5)
+
+        playlist.events.add(third, second)
+        first.playlists.add(other_playlist)
+        third.playlists.add(other_playlist)
+
+        assert list(playlist.items.order_by('position').values_list('event', 'position')) == [
+            (first.pk, 5), (second.pk, 6), (third.pk, 7)
+        ]
+        assert list(other_playlist.items.order_by('position').values_list('event', 'position')) == [
+            (first.pk, 0), (third.pk, 1)
+        ]
+
+    def test_readded_event_goes_last(self):
+        """ Test that an event removed from a playlist and added again is moved to the end """
+        playlist = PlaylistFactory()
+        first, second = EventFactory.create_batch(2)
+        playlist.events.add(first, second)
+
+        playlist.events.remove(first)
+        playlist.events.add(first)
+        assert list(playlist.items.order_by('position').values_list('event', flat=True)) == [second.pk, first.pk]
+
+
+@pytest.mark.django_db
+class TestScheduledRebuildSignals:
+    """ Test cases for debouncing the rebuilds scheduled by catalog changes """
+
+    def test_suggestions_rebuild_is_scheduled_once(self, django_capture_on_commit_callbacks):
+        """ Test that changes within the delay share one rebuild, flagged in the shared cache """
+        with patch('events.signals.rebuild_search_suggestions_task') as task, \
+                patch('events.signals.update_event_neighbours_task'), \
+                django_capture_on_commit_callbacks(execute=True):
+            EventFactory()
+            TagFactory()
+
+        task.apply_async.assert_called_once()
+        assert caches['shared'].get('search-suggestions:rebuild-scheduled')
+
+    def test_neighbours_update_is_scheduled_once_per_event(self, django_capture_on_commit_callbacks):
+        """ Test that an event changed twice within the delay gets one neighbours update """
+        event = EventFactory()
+        with patch('events.signals.rebuild_search_suggestions_task'), \
+                patch('events.signals.update_event_neighbours_task') as task, \
+                django_capture_on_commit_callbacks(execute=True):
+            event.save()
+            event.save()
+
+        task.apply_async.assert_called_once_with(args=[[event.pk]], countdown=NEIGHBOURS_UPDATE_DELAY)
+        assert caches['shared'].get(f'event-neighbours:update-scheduled:{event.pk}')
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from django.db import OperationalError, connection, connections
+
+from events.factories import EventFactory, TagFactory
+from events.models import Event, EventNeighbour
+from events.similarity import (
+    NEIGHBOURS_LOCK_ID,
+    rebuild_event_neighbours,
+    tfidf_matrix,
+    tokenize,
+    top_neighbours,
+    update_event_neighbours,
+)
+from events.tasks import rebuild_event_neighbours_task, update_event_neighbours_task
+
+TOPICS = (
+    "django rest framework apis",
+    "django orm queries",
+    "kubernetes cluster operations",
+    "kubernetes helm charts",
+    "react hooks components",
+)
+
+
+def neighbour_table():
+    """ All stored neighbours as ``{event_id: [(neighbour_id, rounded score), ...]}`` """
+    table = {}
+    for row in EventNeighbour.objects.order_by('event', '-score', 'neighbour'):
+        table.setdefault(row.event_id, []).append((row.neighbour_id, round(row.score, 5)))
+    return table
+
+
+class TestTfidf:
+    """ Test cases for the TF-IDF vectors and the neighbour search """
+
+    def test_tokenize(self):
+        """ Test that words are lower cased and stop words and single characters dropped """
+        assert tokenize("Scaling the Django ORM: a C++ story") == ["scaling", "django", "orm", "story"]
+
+    def test_rows_are_normalized(self):
+        """ Test that every non-empty document has a unit vector and shared rare words score higher """
+        matrix = tfidf_matrix([["django", "orm"], ["django", "rest"], ["react", "rest"], []])
+        assert np.allclose(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel(), [1, 1, 1, 0])
+
+        similarities = (matrix @ matrix.T).toarray()
+        assert similarities[0, 1] > 0
+        assert similarities[0, 2] == 0
+
+    def test_top_neighbours_are_ranked_across_batches(self):
+        """ Test that neighbours exclude the row itself and are best first whatever the batch size """
+        documents = [topic.split() for topic in TOPICS]
+        matrix = tfidf_matrix(documents)
+        neighbours = dict(top_neighbours(matrix, range(len(documents)), k=2, batch_size=2))
+
+        assert [column for column, _ in neighbours[0]] == [1]
+        assert [column for column, _ in neighbours[2]] == [3]
+        assert not neighbours[4]
+        assert all(row not in {column for column, _ in found} for row, found in neighbours.items())
+
+
+@pytest.mark.django_db
+class TestEventNeighbours:
+    """ Test cases for storing and updating the neighbours of events """
+
+    @staticmethod
+    def topic_events():
+        """ One published event per topic, with unrelated descriptions """
+        return [EventFactory(title=topic, description="") for topic in TOPICS]
+
+    def test_rebuild(self):
+        """ Test that only published events with shared words become neighbours """
+        events = self.topic_events()
+        EventFactory(title="django orm internals", description="", status=Event.EventStatus.DRAFT)
+
+        assert rebuild_event_neighbours_task() == 4
+        table = neighbour_table()
+        assert [neighbour for neighbour, _ in table[events[0].pk]] == [events[1].pk]
+        assert [neighbour for neighbour, _ in table[events[2].pk]] == [events[3].pk]
+        assert events[4].pk not in table
+
+    def test_tags_count_as_words(self):
+        """ Test that events sharing a tag are similar """
+        events = self.topic_events()
+        tag = TagFactory(name="Frontend")
+        events[1].tags.add(tag)
+        events[4].tags.add(tag)
+
+        rebuild_event_neighbours()
+        assert events[4].pk in dict(neighbour_table()[events[1].pk])
+
+    def test_update_matches_rebuild(self):
+        """ Test that updating the neighbours of changed events gives the same table as a full rebuild """
+        events = self.topic_events()
+        rebuild_event_neighbours(k=2)
+
+        events[4].title = "django hooks"
+        events[4].save()
+        events[2].status = Event.EventStatus.DRAFT
+        events[2].save()
+        update_event_neighbours([events[4].pk, events[2].pk], k=2)
+        updated = neighbour_table()
+
+        rebuild_event_neighbours(k=2)
+        assert updated == neighbour_table()
+        assert events[4].pk in dict(updated[events[0].pk])
+        assert events[3].pk not in updated
+
+    def test_update_task_for_missing_event(self):
+        """ Test that updating a deleted event only removes it from the other lists """
+        events = self.topic_events()
+        rebuild_event_neighbours()
+        event_id = events[1].pk
+        events[1].delete()
+
+        update_event_neighbours_task([event_id])
+        assert events[0].pk not in neighbour_table()
+
+    @pytest.mark.parametrize('write', [rebuild_event_neighbours, lambda: update_event_neighbours([1])])
+    def test_writers_wait_for_each_other(self, write):
+        """ Test that neighbour rows are not written while another writer holds the lock """
+        other = connections.create_connection('default')
+        try:
+            other.set_autocommit(False)
+            with other.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [NEIGHBOURS_LOCK_ID])
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL lock_timeout = '100ms'")
+            with pytest.raises(OperationalError, match="lock timeout"):
+                write()
+        finally:
+            other.rollback()
+            other.close()
@@ -66,12 +66,14 @@ class TestGoogleDriveDownloadTasks:
         result = download_google_drive_video(video_asset.id, "https://invalid.link")
         assert result is False
 
+    @patch('events.tasks.publish_video_status')
     @patch('events.tasks._get_file_id')
     @patch('events.tasks._download_google_drive_file')
     def test_download_google_drive_video_download_error(
         self,
         mock_download_file,
-        mock_get_file_id
+        mock_get_file_id,
+        mock_publish,
     ):
         """ Test handling of download errors """
         video_asset = VideoAssetFactory(status=VideoAsset.VideoStatus.PROCESSING)
@@ -84,3 +86,5 @@ class TestGoogleDriveDownloadTasks:
 
         assert result is False
         assert video_asset.status == VideoAsset.VideoStatus.FAILED
+        published = mock_publish.call_args.args[0]
+        assert (published.pk, published.status) == (video_asset.pk, VideoAsset.VideoStatus.FAILED)
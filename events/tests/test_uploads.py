@@ -0,0 +1,204 @@
+import base64
+import hashlib
+from unittest.mock import Mock, patch
+
+import ffmpeg
+import pytest
+from kombu.exceptions import OperationalError
+from rest_framework.test import APIClient
+
+from django.db import DatabaseError
+from django.urls import reverse
+from django.utils import timezone
+
+from events.factories import EventFactory, UserFactory
+from events.models import VideoAsset, VideoUpload, video_storage
+from events.tasks import expire_video_uploads_task
+from events.uploads import (
+    TUS_VERSION,
+    InMemoryUploadLocks,
+    RedisUploadLocks,
+    complete_stalled_uploads,
+    complete_video_upload,
+    expire_uploads,
+    get_upload_locks,
+)
+
+CONTENT = b'0123456789' * 100
+
+
+def encode(value):
+    """ A value of Upload-Metadata """
+    return base64.b64encode(str(value).encode()).decode()
+
+
+@pytest.mark.django_db
+class TestVideoUploads:
+    """ Test cases for resumable video uploads """
+
+    @pytest.fixture(autouse=True)
+    def storage(self, monkeypatch, tmp_path):
+        """ Keep the uploaded files in a temporary directory """
+        monkeypatch.setattr(video_storage, 'location', str(tmp_path))
+        return tmp_path
+
+    @pytest.fixture
+    def client(self):
+        """ Returns an APIClient authenticated as staff, speaking tus """
+        client = APIClient(HTTP_TUS_RESUMABLE=TUS_VERSION)
+        client.force_authenticate(user=UserFactory(is_staff=True))
+        return client
+
+    @staticmethod
+    def create(client, length=len(CONTENT), **metadata):
+        """ Create an upload, returning its URL """
+        metadata = {'filename': 'talk.mp4', **metadata}
+        return client.post(
+            reverse('video-uploads'),
+            HTTP_UPLOAD_LENGTH=str(length),
+            HTTP_UPLOAD_METADATA=','.join(f"{key} {encode(value)}" for key, value in metadata.items()),
+        )
+
+    @staticmethod
+    def send(client, url, offset, chunk, **headers):
+        """ Send a chunk at an offset """
+        return client.patch(
+            url, chunk, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset), **headers
+        )
+
+    def test_resumable_upload(self, client, storage, django_capture_on_commit_callbacks):
+        """ Test that chunks are written in place, checked and resumed from the last offset """
+        event = EventFactory()
+        response = self.create(client, title="Talk", event=event.pk)
+        assert response.status_code == 201
+        url = response['Location']
+        upload = VideoUpload.objects.get()
+        assert (upload.video_asset.title, upload.video_asset.event, upload.video_asset.status) == (
+            "Talk", event, VideoAsset.VideoStatus.PROCESSING
+        )
+        assert (storage / upload.file_name).stat().st_size == len(CONTENT)
+
+        checksum = f"sha1 {base64.b64encode(hashlib.sha1(CONTENT[:400]).digest()).decode()}"
+        assert self.send(client, url, 0, CONTENT[:400], HTTP_UPLOAD_CHECKSUM=checksum)['Upload-Offset'] == '400'
+        assert self.send(client, url, 0, CONTENT[:400]).status_code == 409
+        assert self.send(client, url, 400, b'x' * 100, HTTP_UPLOAD_CHECKSUM=checksum).status_code == 460
+
+        response = client.head(url)
+        assert (response.status_code, response['Upload-Offset'], response['Upload-Length']) == (200, '400', '1000')
+
+        with patch('events.v1.views.complete_video_upload_task') as task, \
+                django_capture_on_commit_callbacks(execute=True):
+            response = self.send(client, url, 400, CONTENT[400:])
+        assert (response.status_code, response['Upload-Offset']) == (204, '1000')
+        task.delay.assert_called_once_with(upload.pk)
+        assert (storage / upload.file_name).read_bytes() == CONTENT
+
+        with patch('events.models.ffmpeg.probe', side_effect=ffmpeg.Error('ffprobe', b'', b'')):
+            video_asset = complete_video_upload(upload.pk)
+        video_asset.refresh_from_db()
+        assert (video_asset.video_file.name, video_asset.file_size) == (upload.file_name, len(CONTENT))
+        assert video_asset.status == VideoAsset.VideoStatus.READY
+
+    def test_protocol_errors(self, client, settings):
+        """ Test that requests outside the protocol or its limits are rejected """
+        settings.VIDEO_UPLOADS = {**settings.VIDEO_UPLOADS, 'MAX_SIZE': 100}
+        assert self.create(client, length=101).status_code == 400
+        assert self.create(APIClient(HTTP_TUS_RESUMABLE=TUS_VERSION)).status_code == 401
+
+        plain = APIClient()
+        plain.force_authenticate(user=UserFactory(is_staff=True))
+        assert self.create(plain, length=10).status_code == 412
+
+        response = client.options(reverse('video-uploads'))
+        assert (response['Tus-Version'], response['Tus-Max-Size']) == (TUS_VERSION, '100')
+
+        url = self.create(client, length=10)['Location']
+        assert client.patch(url, b'0123', content_type='application/octet-stream').status_code == 415
+        assert self.send(client, url, 0, b'0123', HTTP_UPLOAD_CHECKSUM='crc32 AAAA').status_code == 400
+        assert self.send(client, url, 0, b'0123', CONTENT_LENGTH='four').status_code == 400
+        assert self.send(client, url, 0, b'').status_code == 411
+
+        get_upload_locks().acquire(VideoUpload.objects.get().pk)
+        assert self.send(client, url, 0, b'0123').status_code == 423
+
+    def test_cancel_and_expire(self, client, storage):
+        """ Test that cancelled and abandoned uploads are deleted with their file and video asset """
+        cancelled = self.create(client)['Location']
+        self.create(client)
+
+        assert client.delete(cancelled).status_code == 204
+        assert VideoUpload.objects.count() == VideoAsset.objects.count() == 1
+        assert len(list(storage.iterdir())) == 1
+
+        VideoUpload.objects.update(modified=timezone.now() - timezone.timedelta(days=2))
+        assert expire_uploads() == 1
+        assert not VideoUpload.objects.exists() and not VideoAsset.objects.exists()
+        assert not list(storage.iterdir())
+
+    def test_completion_not_queued(self, client, django_capture_on_commit_callbacks):
+        """ Test that a complete upload whose completion could not be queued is completed by the expiry task """
+        url = self.create(client)['Location']
+        with patch('events.v1.views.complete_video_upload_task') as task, \
+                django_capture_on_commit_callbacks(execute=True):
+            task.delay.side_effect = OperationalError("broker down")
+            assert self.send(client, url, 0, CONTENT).status_code == 204
+
+        assert complete_stalled_uploads() == 0
+        VideoUpload.objects.update(completed=timezone.now() - timezone.timedelta(hours=1))
+        with patch('events.models.ffmpeg.probe', side_effect=ffmpeg.Error('ffprobe', b'', b'')):
+            assert complete_stalled_uploads() == 1
+        assert VideoAsset.objects.get().status == VideoAsset.VideoStatus.READY
+        assert complete_stalled_uploads() == 0
+
+    def test_stalled_upload_failure_is_isolated(self, client):
+        """ Test that an upload failing to complete neither stops the others nor the expiry of unfinished ones """
+        for url in (self.create(client)['Location'], self.create(client)['Location']):
+            with patch('events.v1.views.complete_video_upload_task'):
+                self.send(client, url, 0, CONTENT)
+        VideoUpload.objects.update(completed=timezone.now() - timezone.timedelta(hours=1))
+        failing, working = VideoUpload.objects.order_by('pk').values_list('pk', flat=True)
+        self.create(client)
+        VideoUpload.objects.filter(completed__isnull=True).update(modified=timezone.now() - timezone.timedelta(days=2))
+
+        def complete(upload_id):
+            if upload_id == failing:
+                raise OSError("file missing")
+            return complete_video_upload(upload_id)
+
+        with patch('events.uploads.complete_video_upload', side_effect=complete), \
+                patch('events.models.ffmpeg.probe', side_effect=ffmpeg.Error('ffprobe', b'', b'')):
+            assert expire_video_uploads_task() == 1
+        statuses = dict(VideoUpload.objects.values_list('pk', 'video_asset__status'))
+        assert statuses == {failing: VideoAsset.VideoStatus.PROCESSING, working: VideoAsset.VideoStatus.READY}
+
+    def test_lock_released_by_its_writer_only(self):
+        """ Test that a writer whose lock expired cannot release the lock of the next writer """
+        locks = InMemoryUploadLocks(timeout=-1)
+        expired = locks.acquire(1)
+        locks.timeout = 60
+        current = locks.acquire(1)
+        assert current and current != expired
+
+        locks.release(1, expired)
+        assert locks.acquire(1) is None
+        locks.release(1, current)
+        assert locks.acquire(1)
+
+    def test_redis_lock_release_checks_token(self):
+        """ Test that the Redis lock is taken with a token and only deleted if it still holds it """
+        redis_client = Mock()
+        with patch('events.uploads.get_redis_client', return_value=redis_client):
+            locks = RedisUploadLocks()
+            token = locks.acquire(1)
+            locks.release(1, token)
+
+        redis_client.set.assert_called_once_with('video-upload:lock:1', token, nx=True, ex=locks.timeout)
+        redis_client.register_script.return_value.assert_called_once_with(keys=['video-upload:lock:1'], args=[token])
+
+    def test_failed_creation_leaves_no_file(self, client, storage):
+        """ Test that the file of an upload whose rows could not be created is deleted """
+        with patch('events.uploads.VideoUpload.objects.create', side_effect=DatabaseError("connection lost")), \
+                pytest.raises(DatabaseError):
+            self.create(client)
+        assert not list(storage.iterdir())
+        assert not VideoAsset.objects.exists()
@@ -0,0 +1,194 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from rest_framework.test import APIClient
+
+from django.core import signing
+from django.test import AsyncClient
+from django.urls import reverse
+
+from events.factories import UserFactory, VideoAssetFactory
+from events.models import Event, VideoAsset
+from events.v1.authentication import issue_video_status_ticket
+from events.video_status import (
+    InMemoryVideoStatusChannel,
+    RedisVideoStatusChannel,
+    get_video_status_channel,
+    stream_video_status,
+)
+
+
+def read_stream(video_asset_ids, count, publish_after=0, messages=()):
+    """ Collect ``count`` chunks of a stream, publishing messages once ``publish_after`` chunks were read """
+    async def read():
+        chunks = []
+        stream = stream_video_status(video_asset_ids)
+        async for chunk in stream:
+            chunks.append(chunk)
+            if len(chunks) == publish_after:
+                for message in messages:
+                    get_video_status_channel().publish(message)
+            if len(chunks) == count:
+                break
+        await stream.aclose()
+        return chunks
+    return async_to_sync(read)()
+
+
+def parse_events(chunks):
+    """ The data of the status events among the chunks of a stream """
+    return [json.loads(chunk.split('data: ')[1]) for chunk in chunks if chunk.startswith('event: status')]
+
+
+@pytest.mark.django_db
+class TestVideoStatusStream:
+    """ Test cases for streaming the status of video assets """
+
+    def test_current_status_then_changes(self):
+        """ Test that a stream starts with the current status and only follows the requested video assets """
+        followed = VideoAssetFactory(status=VideoAsset.VideoStatus.PROCESSING)
+        other = VideoAssetFactory(status=VideoAsset.VideoStatus.PROCESSING)
+        messages = [
+            {'id': other.pk, 'event': other.event_id, 'status': 'READY'},
+            {'id': followed.pk, 'event': followed.event_id, 'status': 'PROCESSING', 'received': 512},
+            {'id': followed.pk, 'event': followed.event_id, 'status': 'READY'},
+        ]
+
+        chunks = read_stream({followed.pk}, count=4, publish_after=2, messages=messages)
+
+        assert chunks[0].startswith('retry: ')
+        assert parse_events(chunks) == [
+            {'id': followed.pk, 'event': followed.event_id, 'status': 'PROCESSING'},
+            messages[1],
+            messages[2],
+        ]
+
+    def test_keepalive_and_end(self, settings):
+        """ Test that an idle stream sends keepalive comments and ends after the maximum duration """
+        settings.VIDEO_STATUS = {**settings.VIDEO_STATUS, 'KEEPALIVE_SECONDS': 0.01, 'MAX_STREAM_SECONDS': 0.05}
+
+        chunks = read_stream(set(), count=100)
+
+        assert chunks[0].startswith('retry: ')
+        assert chunks[1:] and set(chunks[1:]) == {': keepalive\n\n'}
+        assert not get_video_status_channel()._subscribers  # pylint: disable=protected-access
+
+    def test_slow_subscriber_drops_oldest(self):
+        """ Test that a full queue keeps the latest messages """
+        channel = InMemoryVideoStatusChannel(queue_size=2)
+
+        async def receive():
+            async with channel.subscribe() as queue:
+                for status in ('PROCESSING', 'FAILED', 'READY'):
+                    channel.publish({'id': 1, 'status': status})
+                await asyncio.sleep(0)
+                return [queue.get_nowait()['status'] for _ in range(queue.qsize())]
+
+        assert async_to_sync(receive)() == ['FAILED', 'READY']
+
+    def test_redis_subscription_confirmed_first(self):
+        """ Test that a stream only starts once its Redis subscription is confirmed """
+        subscribed = []
+
+        class PubSub:
+            """ A pub/sub connection slow to subscribe, that receives nothing """
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc_info):
+                pass
+
+            async def subscribe(self, channel):
+                """ Confirm the subscription after a delay """
+                await asyncio.sleep(0.05)
+                subscribed.append(channel)
+
+            async def listen(self):
+                """ Wait for messages that never come """
+                await asyncio.Event().wait()
+                yield
+
+        class Redis(PubSub):
+            """ A Redis client handing out the slow pub/sub connection """
+            def pubsub(self):
+                """ Return a new pub/sub connection """
+                return PubSub()
+
+        async def receive():
+            async with RedisVideoStatusChannel(channel='statuses').subscribe():
+                return list(subscribed)
+
+        with patch('redis.asyncio.Redis.from_url', return_value=Redis()):
+            assert async_to_sync(receive)() == ['statuses']
+
+    def test_published_on_commit(self, django_capture_on_commit_callbacks):
+        """ Test that saving the status of a video asset publishes it once committed """
+        video_asset = VideoAssetFactory(status=VideoAsset.VideoStatus.PROCESSING)
+
+        with patch.object(get_video_status_channel(), 'publish') as publish:
+            with django_capture_on_commit_callbacks(execute=True):
+                video_asset.status = VideoAsset.VideoStatus.READY
+                video_asset.save(update_fields=['status'])
+                video_asset.save(update_fields=['title'])
+                assert not publish.called
+
+        publish.assert_called_once_with({'id': video_asset.pk, 'event': video_asset.event_id, 'status': 'READY'})
+
+
+def open_stream(params, user=None):
+    """ Open a stream through the ASGI handler as a user, if any, and return the response without reading it """
+    client = AsyncClient()
+    if user is not None:
+        client.force_login(user)
+
+    async def get():
+        return await client.get(reverse('video-status-stream'), params, HTTP_ACCEPT='text/event-stream')
+    return async_to_sync(get)()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestVideoStatusAPI:
+    """ Test cases for the video status stream and ticket endpoints """
+
+    def test_ticket(self):
+        """ Test that a ticket authenticates its user on the stream only """
+        user = UserFactory()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.post(reverse('video-status-ticket'))
+        assert response.status_code == 200
+
+        video_asset = VideoAssetFactory(event__status=Event.EventStatus.PUBLISHED)
+        stream = open_stream({'ticket': response.data['ticket'], 'video_assets': str(video_asset.pk)})
+        assert stream.status_code == 200
+        assert stream['Content-Type'] == 'text/event-stream'
+        assert stream['Cache-Control'] == 'no-cache'
+        assert APIClient().get(reverse('events-home'), {'ticket': response.data['ticket']}).status_code == 401
+
+    def test_invalid_ticket(self, settings):
+        """ Test that forged and expired tickets are rejected """
+        settings.VIDEO_STATUS = {**settings.VIDEO_STATUS, 'TICKET_MAX_AGE': -1}
+        expired = issue_video_status_ticket(UserFactory())
+        forged = signing.TimestampSigner(salt='other').sign('1')
+
+        for ticket in (expired, forged):
+            assert open_stream({'ticket': ticket, 'video_assets': '1'}).status_code == 401
+
+    def test_video_assets_required_for_non_staff(self):
+        """ Test that only staff may follow all video assets """
+        response = open_stream({}, UserFactory())
+        assert response.status_code == 400
+        assert response['Content-Type'] == 'application/json'
+
+        assert open_stream({}, UserFactory(is_staff=True)).status_code == 200
+
+    def test_not_served_under_wsgi(self):
+        """ Test that servers which would hold a worker for the whole stream refuse it """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory(is_staff=True))
+        response = client.get(reverse('video-status-stream'), HTTP_ACCEPT='text/event-stream')
+        assert response.status_code == 501
+        assert response['Content-Type'] == 'application/json'
@@ -0,0 +1,131 @@
+from datetime import timedelta
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from django.urls import reverse
+from django.utils import timezone
+
+from events.factories import UserFactory, VideoAssetFactory
+from events.models import WatchProgress
+from events.tasks import flush_watch_progress_task
+from events.watch_progress import Heartbeat, flush_watch_progress, get_watch_progress_buffer
+
+
+@pytest.mark.django_db
+class TestWatchProgress:
+    """ Test cases for watch progress heartbeats and their write-behind buffer """
+
+    @pytest.fixture
+    def user(self):
+        """ Returns a user """
+        return UserFactory()
+
+    @pytest.fixture
+    def api_client(self, user):
+        """ Returns an authenticated instance of APIClient """
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def heartbeat(self, api_client, video, position, completed=False):
+        """ Send a player heartbeat """
+        response = api_client.post(
+            reverse('watch-progress'), {'video_asset': video.pk, 'position': position, 'completed': completed},
+            format='json',
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED
+
+    def test_heartbeats_are_buffered(self, api_client, user, django_assert_num_queries):
+        """ Test that heartbeats only check the video exists until they are flushed """
+        video = VideoAssetFactory()
+        with django_assert_num_queries(3):
+            for position in (5, 10, 15):
+                self.heartbeat(api_client, video, position)
+        assert not WatchProgress.objects.exists()
+
+        assert flush_watch_progress() == 1
+        progress = WatchProgress.objects.get(user=user, video_asset=video)
+        assert (progress.position, progress.completed) == (15, False)
+        assert flush_watch_progress() == 0
+
+    def test_flush_upserts(self, api_client, user):
+        """ Test that flushing updates existing rows """
+        video = VideoAssetFactory()
+        self.heartbeat(api_client, video, 30)
+        flush_watch_progress()
+        self.heartbeat(api_client, video, 90, completed=True)
+        flush_watch_progress_task()
+
+        progress = WatchProgress.objects.get(user=user, video_asset=video)
+        assert (progress.position, progress.completed) == (90, True)
+
+    def test_flush_keeps_later_rows(self, user):
+        """ Test that a flush does not overwrite a row with an older heartbeat """
+        video = VideoAssetFactory()
+        now = timezone.now()
+        WatchProgress.objects.create(user=user, video_asset=video, position=90, updated=now)
+        get_watch_progress_buffer().add(user.pk, video.pk, Heartbeat(30, False, now - timedelta(seconds=10)))
+
+        assert flush_watch_progress() == 0
+        assert WatchProgress.objects.get(user=user, video_asset=video).position == 90
+
+    def test_flush_in_batches(self, django_assert_num_queries):
+        """ Test that each batch of users is written with a single statement """
+        users = [UserFactory() for _ in range(5)]
+        videos = [VideoAssetFactory() for _ in range(2)]
+        now = timezone.now()
+        for user in users:
+            for video in videos:
+                get_watch_progress_buffer().add(user.pk, video.pk, Heartbeat(60, False, now))
+
+        # Per batch: existing users, existing videos and the upsert
+        with django_assert_num_queries(9):
+            assert flush_watch_progress(batch_size=2) == 10
+        assert WatchProgress.objects.count() == 10
+
+    def test_deleted_rows_are_skipped(self, user):
+        """ Test that heartbeats for videos or users deleted since are dropped """
+        video = VideoAssetFactory()
+        now = timezone.now()
+        get_watch_progress_buffer().add(user.pk, video.pk, Heartbeat(60, False, now))
+        get_watch_progress_buffer().add(user.pk, video.pk + 1000, Heartbeat(60, False, now))
+        get_watch_progress_buffer().add(user.pk + 1000, video.pk, Heartbeat(60, False, now))
+
+        assert flush_watch_progress() == 1
+
+    def test_continue_watching(self, api_client, user):
+        """ Test that unfinished videos are listed newest first, with buffered heartbeats over stored rows """
+        stored, buffered, finished = VideoAssetFactory(), VideoAssetFactory(), VideoAssetFactory()
+        WatchProgress.objects.create(
+            user=user, video_asset=stored, position=100, updated=timezone.now() - timedelta(hours=1)
+        )
+        WatchProgress.objects.create(user=user, video_asset=buffered, position=10, updated=timezone.now())
+        WatchProgress.objects.create(user=UserFactory(), video_asset=finished, position=10, updated=timezone.now())
+        self.heartbeat(api_client, buffered, 20)
+        self.heartbeat(api_client, finished, 50, completed=True)
+
+        response = api_client.get(reverse('watch-progress'))
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data['results']
+        assert [result['video_asset'] for result in results] == [buffered.pk, stored.pk]
+        assert results[0]['position'] == 20
+        assert results[0]['event_slug'] == buffered.event.slug
+        assert results[1]['duration'] == stored.duration
+
+    @pytest.mark.parametrize('data', [
+        {'video_asset': 1, 'position': -1},
+        {'video_asset': 0, 'position': 10},
+        {'position': 10},
+        {'video_asset': 1000000, 'position': 10},
+    ])
+    def test_invalid_heartbeat(self, api_client, data):
+        """ Test that invalid heartbeats are rejected """
+        response = api_client.post(reverse('watch-progress'), data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_requires_authentication(self):
+        """ Test that anonymous users cannot report progress """
+        response = APIClient().post(reverse('watch-progress'), {'video_asset': 1, 'position': 1}, format='json')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
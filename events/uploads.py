@@ -0,0 +1,277 @@
+"""
+Resumable uploads of video files, following the tus 1.0 protocol.
+
+Creating an upload reserves the file name of a new video asset in the video
+storage and extends the empty file to the announced length. Each chunk is then
+written in place at its offset, so nothing is spooled to memory or temporary
+files and the complete file never has to be assembled: once the last byte is
+received it is already the file of the video asset, which is attached to it by
+``complete_video_upload_task`` like any uploaded video. Complete uploads whose
+video asset is still processing after ``COMPLETION_GRACE`` are attached by the
+hourly expiry task, in case the completion task could not be queued.
+
+A client that was interrupted asks for the offset of its upload and sends the
+rest from there. A chunk sent with an ``Upload-Checksum`` only counts if its
+checksum matches; the offset does not move otherwise and the client resends
+it. Uploads left unfinished for ``EXPIRY_HOURS`` are deleted with their file.
+
+Only one request writes to an upload at a time. Its lock expires after
+``LOCK_TIMEOUT`` in case the writer died, and is released with the token of the
+writer that took it, so a writer outliving its lock cannot free the lock of the
+next one. The offset only moves if it is still where the writer started.
+"""
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from arbisoft_sessions_portal.services.redis.redis_client import get_redis_client
+from events.models import VideoAsset, VideoUpload, video_storage
+from events.video_status import publish_video_status
+
+logger = logging.getLogger("asp_api")
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,checksum,termination,expiration'
+CHECKSUM_ALGORITHMS = {'md5': hashlib.md5, 'sha1': hashlib.sha1, 'sha256': hashlib.sha256}
+READ_SIZE = 1024 * 1024
+LOCK_TIMEOUT = 10 * 60  # seconds, frees uploads of a writer that died
+COMPLETION_GRACE = 10 * 60  # seconds, left to the completion task queued with the last chunk
+
+# Delete the lock of KEYS[1] only if it is still held with the token ARGV[1]
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class UploadError(Exception):
+    """ A request that does not fit the state of an upload """
+
+
+class OffsetMismatch(UploadError):
+    """ The chunk does not start at the offset of the upload """
+
+
+class UploadLocked(UploadError):
+    """ Another request is writing to the upload """
+
+
+class ChecksumMismatch(UploadError):
+    """ The checksum of the received chunk does not match the one announced """
+
+
+class RedisUploadLocks:
+    """ Upload locks kept in Redis and shared by all web processes """
+
+    def __init__(self, key_prefix='video-upload:lock:', timeout=LOCK_TIMEOUT,
+                 **kwargs):  # pylint: disable=unused-argument
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self._script = None
+
+    def acquire(self, upload_id):
+        """ Lock an upload, returning the token releasing it, or None if it is locked already """
+        token = secrets.token_hex(16)
+        if get_redis_client().set(f"{self.key_prefix}{upload_id}", token, nx=True, ex=self.timeout):
+            return token
+        return None
+
+    def release(self, upload_id, token):
+        """ Unlock an upload, unless its lock expired and was taken by another writer """
+        if self._script is None:
+            self._script = get_redis_client().register_script(RELEASE_SCRIPT)
+        self._script(keys=[f"{self.key_prefix}{upload_id}"], args=[token])
+
+
+class InMemoryUploadLocks:
+    """ Process-local upload locks, used in tests and single-process setups """
+
+    def __init__(self, timeout=LOCK_TIMEOUT, **kwargs):  # pylint: disable=unused-argument
+        self.timeout = timeout
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, upload_id):
+        """ Lock an upload, returning the token releasing it, or None if it is locked already """
+        now = time.monotonic()
+        with self._lock:
+            if upload_id in self._locks and self._locks[upload_id][1] > now:
+                return None
+            token = secrets.token_hex(16)
+            self._locks[upload_id] = (token, now + self.timeout)
+            return token
+
+    def release(self, upload_id, token):
+        """ Unlock an upload, unless its lock expired and was taken by another writer """
+        with self._lock:
+            if self._locks.get(upload_id, (None,))[0] == token:
+                del self._locks[upload_id]
+
+    def reset(self):
+        """ Forget all locks """
+        with self._lock:
+            self._locks.clear()
+
+
+@lru_cache(maxsize=None)
+def get_upload_locks():
+    """ Return the process-wide upload locks configured by ``settings.VIDEO_UPLOADS`` """
+    config = settings.VIDEO_UPLOADS
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def parse_metadata(header):
+    """ Decode an ``Upload-Metadata`` header, comma separated keys with base64 encoded values """
+    metadata = {}
+    for pair in filter(None, (pair.strip() for pair in header.split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode()
+        except (binascii.Error, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid value of metadata {key}") from e
+    return metadata
+
+
+def parse_checksum(header):
+    """ Decode an ``Upload-Checksum`` header into the name of its algorithm and the expected digest """
+    algorithm, _, digest = header.strip().partition(' ')
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise ValueError(f"Unsupported checksum algorithm {algorithm}, use one of {', '.join(CHECKSUM_ALGORITHMS)}")
+    try:
+        return algorithm, base64.b64decode(digest, validate=True)
+    except binascii.Error as e:
+        raise ValueError("Invalid checksum") from e
+
+
+def expires(upload):
+    """ When an unfinished upload will be deleted """
+    return upload.modified + timedelta(hours=settings.VIDEO_UPLOADS['EXPIRY_HOURS'])
+
+
+def create_upload(user, length, filename, title=None, event=None):
+    """ Start an upload of ``length`` bytes into the file of a new processing video asset """
+    file_name = video_storage.save(os.path.basename(filename) or 'video.mp4', ContentFile(b''))
+    try:
+        os.truncate(video_storage.path(file_name), length)
+        with transaction.atomic():
+            video_asset = VideoAsset.objects.create(
+                title=title or filename, event=event, status=VideoAsset.VideoStatus.PROCESSING
+            )
+            return VideoUpload.objects.create(
+                video_asset=video_asset, creator=user, file_name=file_name, length=length
+            )
+    except Exception:
+        # Without its upload the file would never expire
+        video_storage.delete(file_name)
+        raise
+
+
+def write_chunk(upload, offset, stream, size, checksum=None):
+    """
+    Write ``size`` bytes read from ``stream`` at ``offset`` of an upload, ``checksum`` being
+    ``(algorithm, digest)`` if given. Returns the new offset, the chunk may have been cut short.
+    Once the last byte is written the upload is completed, ``complete_video_upload`` attaches its file.
+    """
+    locks = get_upload_locks()
+    token = locks.acquire(upload.pk)
+    if token is None:
+        raise UploadLocked()
+    try:
+        upload.refresh_from_db(fields=['offset', 'completed'])
+        if upload.completed or offset != upload.offset:
+            raise OffsetMismatch()
+        size = min(size, upload.length - offset)
+
+        digest = CHECKSUM_ALGORITHMS[checksum[0]]() if checksum else None
+        received = 0
+        with open(video_storage.path(upload.file_name), 'r+b') as file:
+            file.seek(offset)
+            while received < size and (data := stream.read(min(READ_SIZE, size - received))):
+                file.write(data)
+                received += len(data)
+                if digest:
+                    digest.update(data)
+            file.flush()
+            os.fsync(file.fileno())
+
+        if digest and (received < size or digest.digest() != checksum[1]):
+            raise ChecksumMismatch()
+
+        upload.offset = offset + received
+        upload.modified = timezone.now()
+        if upload.offset == upload.length:
+            upload.completed = upload.modified
+        # A writer that outlived its lock may have been overtaken by the next one
+        if not VideoUpload.objects.filter(pk=upload.pk, offset=offset).update(
+            offset=upload.offset, completed=upload.completed, modified=upload.modified
+        ):
+            raise OffsetMismatch()
+    finally:
+        locks.release(upload.pk, token)
+
+    publish_video_status(upload.video_asset, received=upload.offset, total=upload.length)
+    return upload.offset
+
+
+def complete_video_upload(upload_id):
+    """ Make the received file of a complete upload the file of its video asset, extracting its metadata """
+    upload = VideoUpload.objects.select_related('video_asset').get(pk=upload_id, completed__isnull=False)
+    video_asset = upload.video_asset
+    video_asset.video_file.name = upload.file_name
+    video_asset.status = VideoAsset.VideoStatus.READY
+    video_asset.save()
+    return video_asset
+
+
+def complete_stalled_uploads():
+    """
+    Attach the files of complete uploads still processing after the grace period. Returns the number attached.
+    An upload that fails is logged and retried on the next run, the others are still attached.
+    """
+    cutoff = timezone.now() - timedelta(seconds=COMPLETION_GRACE)
+    stalled = list(VideoUpload.objects.filter(
+        completed__lt=cutoff, video_asset__status=VideoAsset.VideoStatus.PROCESSING
+    ).values_list('pk', flat=True))
+    count = 0
+    for upload_id in stalled:
+        logger.info("Completing stalled upload %s", upload_id)
+        try:
+            complete_video_upload(upload_id)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Could not complete stalled upload %s", upload_id)
+            continue
+        count += 1
+    return count
+
+
+def delete_upload(upload):
+    """ Delete an unfinished upload with its file and video asset """
+    video_storage.delete(upload.file_name)
+    upload.video_asset.delete()
+
+
+def expire_uploads():
+    """ Delete the uploads left unfinished for longer than the expiry period. Returns the number deleted """
+    cutoff = timezone.now() - timedelta(hours=settings.VIDEO_UPLOADS['EXPIRY_HOURS'])
+    expired = VideoUpload.objects.filter(completed__isnull=True, modified__lt=cutoff).select_related('video_asset')
+    count = 0
+    for upload in expired:
+        logger.info("Deleting expired upload %s of VideoAsset %s", upload.file_name, upload.video_asset_id)
+        delete_upload(upload)
+        count += 1
+    return count
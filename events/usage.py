@@ -0,0 +1,31 @@
+"""
+Reconciliation of the published event counts of tags and playlists.
+
+Signals keep ``published_event_count`` up to date as events are saved, linked,
+unlinked and deleted. Writes that send no signals, such as
+``QuerySet.update(status=...)`` or raw SQL, leave it behind, so
+``reconcile_usage_counts`` runs daily and fixes the rows whose count drifted,
+logging them as changed.
+"""
+from django.db import transaction
+
+from events.changes import record_changes
+from events.models import CatalogChange, Playlist, Tag
+
+USAGE_MODELS = {
+    Tag: CatalogChange.ObjectKind.TAG,
+    Playlist: CatalogChange.ObjectKind.PLAYLIST,
+}
+
+
+def reconcile_usage_counts():
+    """ Recompute the published event counts that drifted from the events. Returns the number of rows fixed """
+    fixed = 0
+    for model, change_kind in USAGE_MODELS.items():
+        with transaction.atomic():
+            stale = list(model.objects.stale_published_event_counts().values_list('pk', flat=True))
+            if stale:
+                model.objects.filter(pk__in=stale).refresh_published_event_counts()
+                record_changes(change_kind, stale)
+        fixed += len(stale)
+    return fixed
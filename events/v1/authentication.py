@@ -0,0 +1,46 @@
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+
+TICKET_SALT = 'events.video-status'
+
+
+def issue_video_status_ticket(user):
+    """ Return a signed ticket identifying a user to the video status stream for a short while """
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+class VideoStatusTicketAuthentication(BaseAuthentication):
+    """
+    Authentication by a ticket in the ``ticket`` query parameter, for EventSource
+    clients which cannot send an Authorization header
+    """
+
+    def authenticate(self, request):
+        ticket = request.query_params.get('ticket')
+        if not ticket:
+            return None
+        try:
+            user_id = signing.TimestampSigner(salt=TICKET_SALT).unsign(
+                ticket, max_age=settings.VIDEO_STATUS['TICKET_MAX_AGE']
+            )
+        except signing.BadSignature as e:
+            raise AuthenticationFailed("Invalid or expired ticket") from e
+
+        user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed("Invalid or expired ticket")
+        return user, None
+
+
+class VideoStatusTicketAuthenticationScheme(OpenApiAuthenticationExtension):
+    """ OpenAPI description of VideoStatusTicketAuthentication """
+    target_class = VideoStatusTicketAuthentication
+    name = 'videoStatusTicket'
+
+    def get_security_definition(self, auto_schema):
+        return {'type': 'apiKey', 'in': 'query', 'name': 'ticket'}
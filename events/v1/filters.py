@@ -13,8 +13,12 @@ class EventFilter(django_filters.rest_framework.FilterSet):
     search = django_filters.CharFilter(method='filter_search')
     tag = django_filters.CharFilter(method='filter_tag')
     playlist = django_filters.CharFilter(method='filter_playlist')
+    tag_id = django_filters.NumberFilter(field_name='tags')
+    playlist_id = django_filters.NumberFilter(field_name='playlists')
     event_time = django_filters.DateFromToRangeFilter(field_name="event_time")
-    ordering = django_filters.OrderingFilter(fields=("event_time", "event_type", "is_featured", "status"))
+    ordering = django_filters.OrderingFilter(
+        fields=("event_time", "event_type", "is_featured", "status", ("trending_score", "trending"))
+    )
 
     class Meta:
         model = Event
@@ -95,30 +99,40 @@ class EventFilter(django_filters.rest_framework.FilterSet):
 class TagFilter(django_filters.rest_framework.FilterSet):
     """ Filter for the Tag model """
 
-    linked_to_events = django_filters.BooleanFilter(method='filter_linked_to_events')
+    linked_to_events = django_filters.BooleanFilter(
+        method='filter_linked_to_events', label="Only tags of at least one published event, drafts do not count"
+    )
+    ordering = django_filters.OrderingFilter(
+        fields=(('published_event_count', 'event_count'), 'last_used', 'name')
+    )
 
     class Meta:
         model = Tag
         fields = ['linked_to_events']
 
     def filter_linked_to_events(self, queryset, _, value):
-        """ Filter the queryset based on the linked_to_events value """
+        """ Filter the queryset to tags used by at least one published event """
         if value:
-            return queryset.filter(events__isnull=False).distinct()
+            return queryset.filter(published_event_count__gt=0)
         return queryset
 
 
 class PlaylistFilter(django_filters.rest_framework.FilterSet):
     """ Filter for the Playlist model """
 
-    linked_to_events = django_filters.BooleanFilter(method='filter_linked_to_events')
+    linked_to_events = django_filters.BooleanFilter(
+        method='filter_linked_to_events', label="Only playlists of at least one published event, drafts do not count"
+    )
+    ordering = django_filters.OrderingFilter(
+        fields=(('published_event_count', 'event_count'), 'last_used', 'name')
+    )
 
     class Meta:
         model = Playlist
         fields = ['linked_to_events']
 
     def filter_linked_to_events(self, queryset, _, value):
-        """ Filter the queryset based on the linked_to_events value """
+        """ Filter the queryset to playlists used by at least one published event """
         if value:
-            return queryset.filter(events__isnull=False).distinct()
+            return queryset.filter(published_event_count__gt=0)
         return queryset
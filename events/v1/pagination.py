@@ -1,8 +1,53 @@
 from rest_framework.pagination import PageNumberPagination
 
+from events.v1.utils import FACET_NAMES
+
 
 class CustomPageNumberPagination(PageNumberPagination):
     """ Custom pagination class to set page size"""
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class FacetedPageNumberPagination(CustomPageNumberPagination):
+    """ Pagination class for search results carrying facet counts next to the page """
+
+    def get_paginated_response_schema(self, schema):
+        facet_schema = {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'value': {'oneOf': [{'type': 'integer'}, {'type': 'string'}]},
+                    'label': {'type': 'string'},
+                    'count': {'type': 'integer'},
+                },
+            },
+        }
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['facets'] = {
+            'type': 'object',
+            'properties': {
+                name: facet_schema for name in FACET_NAMES
+            },
+        }
+        return response_schema
+
+
+class PlaylistPageNumberPagination(CustomPageNumberPagination):
+    """ Pagination class for the events of a playlist carrying the playlist next to the page """
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['playlist'] = {
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'integer'},
+                'name': {'type': 'string'},
+                'description': {'type': 'string'},
+                'event_count': {'type': 'integer'},
+                'last_used': {'type': 'string', 'format': 'date-time', 'nullable': True},
+            },
+        }
+        return response_schema
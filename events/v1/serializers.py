@@ -1,11 +1,20 @@
+from collections import defaultdict
+from operator import itemgetter
+
 from rest_framework import serializers
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
 from events.models import Event, EventPresenter, Playlist, Tag, VideoAsset
+from events.suggestions import MAX_SUGGESTION_LIMIT, SUGGESTION_LIMIT
 
 user_model = get_user_model()
 
+CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 2000
+MAX_STREAMED_VIDEO_ASSETS = 100
+
 
 class PublisherSerializer(serializers.ModelSerializer):
     """ Serializer for the publisher field in the Event model """
@@ -50,7 +59,7 @@ class EventSerializer(serializers.ModelSerializer):
     @staticmethod
     def get_tags(event):
         """ Get the tags of an event """
-        return event.tags.all().values_list('name', flat=True)
+        return event.tags.order_by('name').values_list('name', flat=True)
 
     @staticmethod
     def get_thumbnail(event):
@@ -73,13 +82,184 @@ class EventSerializer(serializers.ModelSerializer):
     @staticmethod
     def get_presenters(event):
         """ Get presenters of an event """
-        event_presenters = EventPresenter.objects.filter(event=event).select_related('user')
+        event_presenters = EventPresenter.objects.filter(event=event).select_related('user').order_by('pk')
         return EventPresenterSerializer(event_presenters, many=True).data
 
     @staticmethod
     def get_playlists(event):
         """ Get the playlists of an event """
-        return event.playlists.all().values_list('name', flat=True)
+        return event.playlists.order_by('name').values_list('name', flat=True)
+
+
+EVENT_FIELDS = EventSerializer.Meta.fields
+EXPANDABLE_EVENT_FIELDS = ('publisher', 'presenters')
+VIDEO_FIELDS = ('thumbnail', 'video_duration', 'video_file')
+
+
+class EventRowSerializer:
+    """
+    Read-only serializer producing the same output as EventSerializer for a page of
+    ``.values()`` rows, without instantiating models or introspecting fields per row.
+    Related data is fetched with one query per relation for the whole page.
+
+    ``fields`` limits the output to the given fields, in EventSerializer order.
+    Fields that are not requested are neither selected nor queried.
+    Publisher and presenters are rendered as ids unless they are in ``expand``.
+    """
+    columns = {
+        'id': ('id',),
+        'title': ('title',),
+        'slug': ('slug',),
+        'description': ('description',),
+        'event_time': ('event_time',),
+        'event_type': ('event_type',),
+        'status': ('status',),
+        'is_featured': ('is_featured',),
+    }
+    datetime_field = serializers.DateTimeField()
+    thumbnail_storage = VideoAsset._meta.get_field('thumbnail').storage
+    video_storage = VideoAsset._meta.get_field('video_file').storage
+
+    def __init__(self, fields=EVENT_FIELDS, expand=EXPANDABLE_EVENT_FIELDS):
+        self.fields = tuple(field for field in EVENT_FIELDS if field in fields)
+        self.expand = set(expand)
+
+    def values(self, queryset):
+        """ Return the queryset as rows carrying only the columns the selected fields need """
+        columns = ['id']
+        for field in self.fields:
+            columns.extend(self.columns.get(field, ()))
+        if 'publisher' in self.fields:
+            columns.append('creator_id')
+            if 'publisher' in self.expand:
+                columns.extend(('creator__first_name', 'creator__last_name'))
+        return queryset.values(*dict.fromkeys(columns))
+
+    def to_representation(self, rows):
+        """ Serialize the rows, in order """
+        rows = list(rows)
+        event_ids = {row['id'] for row in rows}
+        related = {}
+        getters = [(field, self._getter(field, event_ids, related)) for field in self.fields]
+        return [{field: getter(row) for field, getter in getters} for row in rows]
+
+    def _getter(self, field, event_ids, related):
+        """
+        Return a function reading the value of a field from a row.
+        Related data is fetched here, once for all rows, and shared through ``related``.
+        """
+        if field == 'event_time':
+            to_representation = self.datetime_field.to_representation
+            return lambda row: to_representation(row['event_time'])
+        if field in self.columns:
+            return itemgetter(field)
+        if field == 'publisher':
+            return self._publisher if field in self.expand else itemgetter('creator_id')
+        return self._related_getter(field, event_ids, related)
+
+    @staticmethod
+    def _publisher(row):
+        return {
+            'id': row['creator_id'],
+            'first_name': row['creator__first_name'],
+            'last_name': row['creator__last_name'],
+        }
+
+    def _related_getter(self, field, event_ids, related):
+        if field in ('tags', 'playlists'):
+            names = self._names_by_event(getattr(Event, field).through, field[:-1], event_ids)
+            return lambda row: names.get(row['id'], [])
+
+        if field == 'presenters':
+            presenters = self._presenters_by_event(event_ids, expanded=field in self.expand)
+            return lambda row: presenters.get(row['id'], [])
+
+        if 'videos' not in related:
+            related['videos'] = self._first_video_by_event(event_ids)
+        videos = related['videos']
+        index = VIDEO_FIELDS.index(field)
+        missing = ('', None, '')[index]
+        return lambda row: videos[row['id']][index] if row['id'] in videos else missing
+
+    @staticmethod
+    def _names_by_event(through, field, event_ids):
+        names = defaultdict(list)
+        links = through.objects.filter(event_id__in=event_ids).order_by(f'{field}__name')
+        for event_id, name in links.values_list('event_id', f'{field}__name'):
+            names[event_id].append(name)
+        return names
+
+    @staticmethod
+    def _presenters_by_event(event_ids, expanded):
+        presenters = defaultdict(list)
+        links = EventPresenter.objects.filter(event_id__in=event_ids).order_by('pk')
+        if not expanded:
+            for event_id, user_id in links.values_list('event_id', 'user_id'):
+                presenters[event_id].append(user_id)
+            return presenters
+
+        rows = links.values_list('event_id', 'user_id', 'user__first_name', 'user__last_name', 'user__email')
+        for event_id, user_id, first_name, last_name, email in rows:
+            presenters[event_id].append(
+                {'user_id': user_id, 'first_name': first_name, 'last_name': last_name, 'email': email}
+            )
+        return presenters
+
+    @classmethod
+    def _first_video_by_event(cls, event_ids):
+        # DISTINCT ON keeps the lowest pk video of each event, like event.videos.first()
+        rows = VideoAsset.objects.filter(event_id__in=event_ids).order_by('event_id', 'pk').distinct(
+            'event_id'
+        ).values_list('event_id', 'thumbnail', 'duration', 'video_file')
+        return {
+            event_id: (
+                cls.thumbnail_storage.url(thumbnail) if thumbnail else '',
+                duration or None,
+                cls.video_storage.url(video_file) if video_file else '',
+            )
+            for event_id, thumbnail, duration, video_file in rows
+        }
+
+
+class CommaSeparatedListField(serializers.CharField):
+    """ Query parameter field holding a comma separated list of choices """
+
+    def __init__(self, choices, **kwargs):
+        self.choices = choices
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        values = [value.strip() for value in super().to_internal_value(data).split(',') if value.strip()]
+        unknown = [value for value in values if value not in self.choices]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(self.choices)}"
+            )
+        return values
+
+
+class EventFieldsQuerySerializer(serializers.Serializer):
+    """ Serializer for the query parameters selecting which event fields to return """
+    fields = CommaSeparatedListField(
+        choices=EVENT_FIELDS, required=False,
+        help_text="Comma separated fields to return, all fields if not given",
+    )
+    omit = CommaSeparatedListField(
+        choices=EVENT_FIELDS, required=False, allow_blank=True,
+        help_text="Comma separated fields to leave out",
+    )
+    expand = CommaSeparatedListField(
+        choices=EXPANDABLE_EVENT_FIELDS, required=False, allow_blank=True,
+        help_text="Comma separated relations to return as objects instead of ids, all of them if not given",
+    )
+
+    @classmethod
+    def row_serializer_for(cls, request):
+        """ Validate the query parameters of a request and return the EventRowSerializer they select """
+        params = cls(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        fields = set(params.validated_data.get('fields', EVENT_FIELDS)) - set(params.validated_data.get('omit', ()))
+        return EventRowSerializer(fields, params.validated_data.get('expand', EXPANDABLE_EVENT_FIELDS))
 
 
 class VideoAssetSerializer(serializers.ModelSerializer):
@@ -94,15 +274,194 @@ class VideoAssetSerializer(serializers.ModelSerializer):
         )
 
 
+class VideoAssetChangeSerializer(serializers.ModelSerializer):
+    """ Serializer for a changed VideoAsset, referring to its event by id """
+
+    class Meta:
+        model = VideoAsset
+        fields = (
+            'id', 'title', 'video_file', 'duration', 'thumbnail', 'status', 'file_size', 'event'
+        )
+
+
 class TagListSerializer(serializers.ModelSerializer):
     """ Serializer for Tag List View"""
+    event_count = serializers.IntegerField(source='published_event_count', read_only=True)
+
     class Meta:
         model = Tag
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'event_count', 'last_used')
 
 
 class PlaylistListSerializer(serializers.ModelSerializer):
     """ Serializer for Playlist List View"""
+    event_count = serializers.IntegerField(source='published_event_count', read_only=True)
+
     class Meta:
         model = Playlist
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'event_count', 'last_used')
+
+
+class PlaylistDetailSerializer(PlaylistListSerializer):
+    """ Serializer for the playlist of Playlist Detail View """
+
+    class Meta(PlaylistListSerializer.Meta):
+        fields = ('id', 'name', 'description', 'event_count', 'last_used')
+
+
+class SuggestionQuerySerializer(serializers.Serializer):
+    """ Serializer for the search suggestions query parameters """
+    q = serializers.CharField(required=True, max_length=255, trim_whitespace=True)
+    limit = serializers.IntegerField(required=False, default=SUGGESTION_LIMIT, min_value=1,
+                                     max_value=MAX_SUGGESTION_LIMIT)
+
+
+class SuggestionSerializer(serializers.Serializer):
+    """ Serializer for a single search suggestion """
+    id = serializers.IntegerField()
+    text = serializers.CharField()
+    slug = serializers.CharField(required=False)
+
+
+class SuggestionsSerializer(serializers.Serializer):
+    """ Serializer for search suggestions grouped by kind """
+    titles = SuggestionSerializer(many=True)
+    tags = SuggestionSerializer(many=True)
+    playlists = SuggestionSerializer(many=True)
+    presenters = SuggestionSerializer(many=True)
+
+
+class WatchProgressHeartbeatSerializer(serializers.Serializer):
+    """ Serializer for the heartbeats the player sends while a video plays """
+    video_asset = serializers.IntegerField(min_value=1)
+    position = serializers.IntegerField(min_value=0, help_text="Playback position in seconds")
+    completed = serializers.BooleanField(default=False)
+
+    def validate_video_asset(self, value):
+        """ Only buffer heartbeats of existing videos """
+        if not VideoAsset.objects.filter(pk=value).exists():
+            raise serializers.ValidationError("Video asset not found")
+        return value
+
+
+class WatchProgressSerializer(serializers.Serializer):
+    """ Serializer for a video in the continue watching list """
+    video_asset = serializers.IntegerField()
+    event_slug = serializers.CharField()
+    title = serializers.CharField()
+    duration = serializers.IntegerField()
+    position = serializers.IntegerField()
+    completed = serializers.BooleanField()
+    updated = serializers.DateTimeField()
+
+
+class HomeEventSerializer(EventSerializer):
+    """ Serializer for an event of the home feed """
+    position = serializers.IntegerField(
+        required=False, help_text="Playback position in seconds, for events the user started watching"
+    )
+
+    class Meta(EventSerializer.Meta):
+        fields = (*EventSerializer.Meta.fields, 'position')
+
+
+class HomeRowSerializer(serializers.Serializer):
+    """ Serializer for a row of the home feed """
+    key = serializers.CharField(help_text="continue_watching, featured, trending, latest or tag:<id>")
+    title = serializers.CharField()
+    events = HomeEventSerializer(many=True)
+
+
+class HomeFeedSerializer(serializers.Serializer):
+    """ Serializer for the home feed """
+    rows = HomeRowSerializer(many=True)
+
+
+class ChangesQuerySerializer(EventFieldsQuerySerializer):
+    """ Serializer for the catalog changes query parameters """
+    cursor = serializers.IntegerField(
+        required=False, min_value=0,
+        help_text="Cursor returned by the previous call, the latest cursor is returned without changes if not given",
+    )
+    limit = serializers.IntegerField(required=False, default=CHANGES_LIMIT, min_value=1, max_value=MAX_CHANGES_LIMIT)
+
+
+class ObjectChangesSerializer(serializers.Serializer):
+    """ Serializer for the changes of one kind of objects """
+    upserted = serializers.ListField(
+        child=serializers.DictField(), help_text="Current state of created or updated objects"
+    )
+    deleted = serializers.ListField(child=serializers.IntegerField(), help_text="Ids of deleted objects")
+
+
+class CatalogChangesSerializer(serializers.Serializer):
+    """ Serializer for a batch of catalog changes """
+    cursor = serializers.IntegerField(help_text="Cursor to pass to the next call")
+    has_more = serializers.BooleanField(help_text="Whether more changes are waiting after this batch")
+    events = ObjectChangesSerializer()
+    tags = ObjectChangesSerializer()
+    playlists = ObjectChangesSerializer()
+    video_assets = ObjectChangesSerializer()
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """ Serializer for the catalog export query parameters """
+    export_format = serializers.ChoiceField(choices=('ndjson', 'csv'), default='ndjson')
+
+
+class VideoStatusQuerySerializer(serializers.Serializer):
+    """ Serializer for the video status stream query parameters """
+    video_assets = serializers.CharField(
+        required=False,
+        help_text="Comma separated ids of the video assets to follow, all of them if not given (staff only)",
+    )
+    ticket = serializers.CharField(required=False, help_text="Ticket from the video status ticket endpoint")
+
+    def validate_video_assets(self, value):
+        """ Parse the comma separated ids """
+        try:
+            ids = {int(value) for value in value.split(',') if value.strip()}
+        except ValueError as e:
+            raise serializers.ValidationError("Expected comma separated ids") from e
+        if not ids or len(ids) > MAX_STREAMED_VIDEO_ASSETS:
+            raise serializers.ValidationError(f"Expected between 1 and {MAX_STREAMED_VIDEO_ASSETS} ids")
+        return ids
+
+
+class VideoStatusTicketSerializer(serializers.Serializer):
+    """ Serializer for a ticket authenticating the video status stream """
+    ticket = serializers.CharField()
+    expires_in = serializers.IntegerField(help_text="Seconds left to open the stream with the ticket")
+
+
+class DownloadProgressSerializer(serializers.Serializer):
+    """ Serializer for the progress of a running video download """
+    received = serializers.IntegerField(help_text="Bytes received")
+    total = serializers.IntegerField(allow_null=True, help_text="Expected size in bytes, null if unknown")
+    rate = serializers.FloatField(help_text="Recent transfer rate in bytes per second")
+    eta = serializers.FloatField(allow_null=True, help_text="Estimated seconds left, null if unknown")
+    updated = serializers.DateTimeField()
+
+
+class VideoAssetStatusSerializer(serializers.Serializer):
+    """ Serializer for the status of a video asset """
+    id = serializers.IntegerField()
+    event = serializers.IntegerField(allow_null=True)
+    status = serializers.ChoiceField(choices=VideoAsset.VideoStatus.choices)
+    progress = DownloadProgressSerializer(allow_null=True, help_text="Progress of the download, while processing")
+
+
+class VideoUploadSerializer(serializers.Serializer):
+    """ Serializer for the Upload-Length and Upload-Metadata of a new resumable upload """
+    length = serializers.IntegerField(min_value=1, help_text="Upload-Length, the size of the file in bytes")
+    filename = serializers.CharField(max_length=200, help_text="Name of the file, from Upload-Metadata")
+    title = serializers.CharField(max_length=255, required=False, help_text="Title of the video, from Upload-Metadata")
+    event = serializers.PrimaryKeyRelatedField(
+        queryset=Event.objects.all(), required=False, help_text="Event of the video, from Upload-Metadata"
+    )
+
+    def validate_length(self, value):
+        """ Reject files larger than the configured maximum """
+        if value > settings.VIDEO_UPLOADS['MAX_SIZE']:
+            raise serializers.ValidationError(f"Uploads are limited to {settings.VIDEO_UPLOADS['MAX_SIZE']} bytes")
+        return value
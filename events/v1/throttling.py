@@ -0,0 +1,16 @@
+from arbisoft_sessions_portal.throttling import SlidingWindowRateThrottle
+
+
+class SearchRateThrottle(SlidingWindowRateThrottle):
+    """ Limits search requests per user, or per client IP for anonymous requests """
+    scope = 'search'
+
+    def get_cache_key(self, request, view):
+        if not request.query_params.get('search'):
+            return None
+
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -1,17 +1,43 @@
 from django.urls import path
 
 from events.v1.views import (
+    CatalogChangesView,
+    EventExportView,
     EventRecommendationsView,
     EventsListView,
+    FacetedEventSearchView,
+    HomeFeedView,
+    PlaylistDetailView,
     PlaylistListView,
+    SearchSuggestionsView,
     TagListView,
+    TrendingEventsView,
     VideoAssetDetailView,
+    VideoAssetStatusView,
+    VideoStatusStreamView,
+    VideoStatusTicketView,
+    VideoUploadsView,
+    VideoUploadView,
+    WatchProgressView,
 )
 
 urlpatterns = [
     path('all/', EventsListView.as_view(), name='events-list'),
+    path('home/', HomeFeedView.as_view(), name='events-home'),
+    path('trending/', TrendingEventsView.as_view(), name='events-trending'),
+    path('export/', EventExportView.as_view(), name='events-export'),
+    path('search/', FacetedEventSearchView.as_view(), name='events-search'),
+    path('suggest/', SearchSuggestionsView.as_view(), name='search-suggestions'),
     path('videoasset/<slug:event_slug>/', VideoAssetDetailView.as_view(), name='video-asset-detail'),
     path('playlists/', PlaylistListView.as_view(), name='playlist-list'),
+    path('playlists/<int:pk>/', PlaylistDetailView.as_view(), name='playlist-detail'),
     path('tags/', TagListView.as_view(), name='tag-list'),
-    path('recommendations/<slug:event_slug>/', EventRecommendationsView.as_view(), name='recommendation')
+    path('recommendations/<slug:event_slug>/', EventRecommendationsView.as_view(), name='recommendation'),
+    path('changes/', CatalogChangesView.as_view(), name='catalog-changes'),
+    path('video-status/', VideoStatusStreamView.as_view(), name='video-status-stream'),
+    path('video-status/<int:pk>/', VideoAssetStatusView.as_view(), name='video-asset-status'),
+    path('video-status/ticket/', VideoStatusTicketView.as_view(), name='video-status-ticket'),
+    path('uploads/', VideoUploadsView.as_view(), name='video-uploads'),
+    path('uploads/<int:pk>/', VideoUploadView.as_view(), name='video-upload'),
+    path('watch-progress/', WatchProgressView.as_view(), name='watch-progress'),
 ]
@@ -1,15 +1,25 @@
+from django.db import connections
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
 
-from events.models import Event
+from events.models import Event, EventPresenter, Playlist, Tag
 
 
 def get_similar_events(event_slug: str) -> list[Event]:
     """
-    Retrieve similar events based on playlists, presenters, and tags.
-    Excludes the current event and returns a maximum of 5 latest events.
+    Retrieve similar events, most similar first, from the precomputed content-based neighbours.
+    Events without neighbours yet fall back to events sharing playlists, presenters or tags
+    and the 5 latest events, newest first. The current event is always excluded.
     """
     event = get_object_or_404(Event, slug=event_slug)
+    neighbours = list(
+        Event.objects.filter(
+            neighbour_of__event=event, status=Event.EventStatus.PUBLISHED
+        ).only('id', 'event_time').order_by('-neighbour_of__score')
+    )
+    if neighbours:
+        return neighbours
+
     exclude_current = ~Q(id=event.id)
     similarity_query = Q()
     published_filter = Q(status=Event.EventStatus.PUBLISHED)
@@ -21,11 +31,93 @@ def get_similar_events(event_slug: str) -> list[Event]:
     if event.tags.exists():
         similarity_query |= Q(tags__in=event.tags.all())
 
-    similar_events = Event.objects.filter(exclude_current & similarity_query & published_filter).distinct()
-    latest_events = Event.objects.filter(exclude_current & published_filter).order_by('-event_time')[:5]
+    # Only ids and times are needed to rank, callers fetch the fields they serialize
+    similar_events = Event.objects.filter(
+        exclude_current & similarity_query & published_filter
+    ).only('id', 'event_time').distinct()
+    latest_events = Event.objects.filter(
+        exclude_current & published_filter
+    ).only('id', 'event_time').order_by('-event_time')[:5]
 
     combined_events = list(similar_events) + list(latest_events)
     unique_events = {event.id: event for event in combined_events}.values()
     results = sorted(unique_events, key=lambda e: e.event_time, reverse=True)
 
     return results
+
+
+FACET_LIMIT = 20
+FACET_NAMES = ('tags', 'playlists', 'presenters', 'event_type', 'year')
+
+
+def _event_facets_sql(matched_sql):
+    """ Build the single UNION ALL statement that groups the matched events by every facet """
+    event_table = Event._meta.db_table
+    user_table = EventPresenter.user.field.related_model._meta.db_table
+
+    return f"""
+        WITH matched(id) AS ({matched_sql})
+        SELECT 'tags', t.id::text, t.name, COUNT(*)
+        FROM matched m
+        JOIN {Event.tags.through._meta.db_table} l ON l.event_id = m.id
+        JOIN {Tag._meta.db_table} t ON t.id = l.tag_id
+        GROUP BY t.id, t.name
+        UNION ALL
+        SELECT 'playlists', p.id::text, p.name, COUNT(*)
+        FROM matched m
+        JOIN {Event.playlists.through._meta.db_table} l ON l.event_id = m.id
+        JOIN {Playlist._meta.db_table} p ON p.id = l.playlist_id
+        GROUP BY p.id, p.name
+        UNION ALL
+        SELECT 'presenters', u.id::text, CONCAT(u.first_name, ' ', u.last_name), COUNT(*)
+        FROM matched m
+        JOIN {EventPresenter._meta.db_table} l ON l.event_id = m.id
+        JOIN {user_table} u ON u.id = l.user_id
+        GROUP BY u.id, u.first_name, u.last_name
+        UNION ALL
+        SELECT 'event_type', e.event_type, e.event_type, COUNT(*)
+        FROM matched m
+        JOIN {event_table} e ON e.id = m.id
+        GROUP BY e.event_type
+        UNION ALL
+        SELECT 'year', y.year::text, y.year::text, COUNT(*)
+        FROM matched m
+        JOIN {event_table} e ON e.id = m.id
+        CROSS JOIN LATERAL (SELECT EXTRACT(YEAR FROM e.event_time)::int AS year) y
+        GROUP BY y.year
+    """
+
+
+def get_event_facets(queryset, limit=FACET_LIMIT) -> dict:
+    """
+    Count the events of a filtered queryset per tag, playlist, presenter, event type and year.
+
+    All facets are computed by a single SQL statement: the matching event ids are
+    collected once in a CTE and every facet is a GROUP BY over it, combined with
+    UNION ALL. Each facet is sorted by count and truncated to ``limit`` entries.
+    """
+    facets = {name: [] for name in FACET_NAMES}
+    if queryset.query.is_empty():
+        return facets
+
+    matched_sql, params = queryset.order_by().values('pk').distinct().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(_event_facets_sql(matched_sql), params)
+        rows = cursor.fetchall()
+
+    event_type_labels = dict(Event.EventType.choices)
+    for facet, value, label, count in rows:
+        if facet == 'event_type':
+            label = event_type_labels.get(value, value)
+        else:
+            value = int(value)
+        facets[facet].append({'value': value, 'label': label, 'count': count})
+
+    for name, entries in facets.items():
+        if name == 'year':
+            entries.sort(key=lambda entry: entry['value'], reverse=True)
+        else:
+            entries.sort(key=lambda entry: (-entry['count'], entry['label']))
+        del entries[limit:]
+
+    return facets
@@ -1,29 +1,147 @@
+import io
+import logging
+
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from kombu.exceptions import OperationalError
+from rest_framework import status
+from rest_framework.exceptions import APIException, UnsupportedMediaType, ValidationError
 from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
 
-from events.models import Event, Playlist, Tag, VideoAsset
+from arbisoft_sessions_portal.replicas import ReplicaReadMixin
+from events.changes import RESULT_KEYS, CursorExpired, get_changes, latest_cursor
+from events.download_progress import get_download_progress
+from events.export import EXPORT_FORMATS, aiter_lines, iter_events
+from events.home import get_home_feed
+from events.models import Event, Playlist, Tag, VideoAsset, VideoUpload
+from events.popularity import record_view
+from events.suggestions import get_suggestions
+from events.tasks import complete_video_upload_task
+from events.uploads import (
+    CHECKSUM_ALGORITHMS,
+    TUS_EXTENSIONS,
+    TUS_VERSION,
+    ChecksumMismatch,
+    OffsetMismatch,
+    UploadLocked,
+    create_upload,
+    delete_upload,
+    expires,
+    parse_checksum,
+    parse_metadata,
+    write_chunk,
+)
+from events.v1.authentication import VideoStatusTicketAuthentication, issue_video_status_ticket
 from events.v1.filters import EventFilter, PlaylistFilter, TagFilter
-from events.v1.pagination import CustomPageNumberPagination
-from events.v1.serializers import EventSerializer, PlaylistListSerializer, TagListSerializer, VideoAssetSerializer
-from events.v1.utils import get_similar_events
+from events.v1.pagination import CustomPageNumberPagination, FacetedPageNumberPagination, PlaylistPageNumberPagination
+from events.v1.serializers import (
+    CatalogChangesSerializer,
+    ChangesQuerySerializer,
+    EventFieldsQuerySerializer,
+    EventSerializer,
+    ExportQuerySerializer,
+    HomeFeedSerializer,
+    PlaylistDetailSerializer,
+    PlaylistListSerializer,
+    SuggestionQuerySerializer,
+    SuggestionsSerializer,
+    TagListSerializer,
+    VideoAssetSerializer,
+    VideoAssetStatusSerializer,
+    VideoStatusQuerySerializer,
+    VideoStatusTicketSerializer,
+    VideoUploadSerializer,
+    WatchProgressHeartbeatSerializer,
+    WatchProgressSerializer,
+)
+from events.v1.throttling import SearchRateThrottle
+from events.v1.utils import get_event_facets, get_similar_events
+from events.video_status import stream_video_status, video_status_message
+from events.watch_progress import get_watch_progress, record_heartbeat
+
+logger = logging.getLogger("asp_api")
 
 
-class EventsListView(ListAPIView):
+class EventsListView(ReplicaReadMixin, ListAPIView):
     """ View for listing the events """
 
-    queryset = Event.objects.filter(videos__isnull=False)
+    queryset = Event.objects.filter(videos__isnull=False).order_by("-event_time", "-id")
     serializer_class = EventSerializer
     pagination_class = CustomPageNumberPagination
     filterset_class = EventFilter
+    throttle_classes = [SearchRateThrottle]
+
+    @extend_schema(parameters=[EventFieldsQuerySerializer])
+    def list(self, request, *args, **kwargs):
+        serializer = EventFieldsQuerySerializer.row_serializer_for(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(serializer.values(queryset))
+        return self.get_paginated_response(serializer.to_representation(page))
+
+
+class TrendingEventsView(EventsListView):
+    """ View for listing the published events ranked by their recent views """
+
+    queryset = Event.objects.filter(
+        videos__isnull=False, status=Event.EventStatus.PUBLISHED, trending_score__gt=0
+    ).order_by("-trending_score", "-id")
+
+
+class HomeFeedView(ReplicaReadMixin, APIView):
+    """ View for the rows of events shown on the home page, in one response """
+
+    @extend_schema(parameters=[EventFieldsQuerySerializer], responses=HomeFeedSerializer)
+    def get(self, request, *args, **kwargs):
+        """ Get the continue watching, featured, trending, latest and per tag rows of the home page """
+        serializer = EventFieldsQuerySerializer.row_serializer_for(request)
+        return Response({'rows': get_home_feed(request.user, serializer)})
+
+
+class FacetedEventSearchView(EventsListView):
+    """
+    View for searching events that returns the page of events together with
+    per tag, playlist, presenter, event type and year counts of all matches
+    """
+
+    pagination_class = FacetedPageNumberPagination
 
+    @extend_schema(parameters=[EventFieldsQuerySerializer])
+    def list(self, request, *args, **kwargs):
+        serializer = EventFieldsQuerySerializer.row_serializer_for(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(serializer.values(queryset))
 
-class VideoAssetDetailView(RetrieveAPIView):
+        response = self.get_paginated_response(serializer.to_representation(page))
+        response.data['facets'] = get_event_facets(queryset)
+        return response
+
+
+class VideoAssetDetailView(ReplicaReadMixin, RetrieveAPIView):
     """ View for listing the VideoAsset """
 
     serializer_class = VideoAssetSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        """ Get the video of an event and count it as a play, unless only its headers are asked for """
+        instance = self.get_object()
+        if request.method != 'HEAD':
+            record_view(instance.event_id, request.user.pk)
+        return Response(self.get_serializer(instance).data)
+
     def get_object(self):
         obj = get_object_or_404(
             VideoAsset.objects.select_related('event__creator').prefetch_related('event__tags', 'event__playlists'),
@@ -32,7 +150,7 @@ class VideoAssetDetailView(RetrieveAPIView):
         return obj
 
 
-class TagListView(ListAPIView):
+class TagListView(ReplicaReadMixin, ListAPIView):
     """ View for listing all tags """
 
     queryset = Tag.objects.all()
@@ -41,7 +159,7 @@ class TagListView(ListAPIView):
     filterset_class = TagFilter
 
 
-class PlaylistListView(ListAPIView):
+class PlaylistListView(ReplicaReadMixin, ListAPIView):
     """ View for listing all playlists """
 
     queryset = Playlist.objects.all()
@@ -50,16 +168,438 @@ class PlaylistListView(ListAPIView):
     filterset_class = PlaylistFilter
 
 
-class EventRecommendationsView(APIView):
+class PlaylistDetailView(ReplicaReadMixin, APIView):
+    """ View for a playlist and a page of its published events, in playlist order """
+    pagination_class = PlaylistPageNumberPagination
+
+    @extend_schema(
+        operation_id='v1_events_playlists_retrieve',
+        parameters=[EventFieldsQuerySerializer],
+        responses=EventSerializer(many=True),
+    )
+    def get(self, request, pk, *args, **kwargs):
+        """ Get a playlist with its events """
+        serializer = EventFieldsQuerySerializer.row_serializer_for(request)
+        playlist = get_object_or_404(Playlist, pk=pk)
+        events = Event.objects.filter(
+            Exists(VideoAsset.objects.filter(event=OuterRef('pk'))),
+            playlist_items__playlist=playlist,
+            status=Event.EventStatus.PUBLISHED,
+        ).order_by('playlist_items__position', 'event_time', 'id')
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(serializer.values(events), request, view=self)
+        response = paginator.get_paginated_response(serializer.to_representation(page))
+        response.data['playlist'] = PlaylistDetailSerializer(playlist).data
+        return response
+
+
+class EventRecommendationsView(ReplicaReadMixin, APIView):
     """ View for listing similar events """
     pagination_class = CustomPageNumberPagination
 
+    @extend_schema(parameters=[EventFieldsQuerySerializer], responses=EventSerializer(many=True))
     def get(self, request, event_slug, *args, **kwargs):
         """ Get similar events based on the same playlist, presenter or tags """
+        serializer = EventFieldsQuerySerializer.row_serializer_for(request)
         similar_events = get_similar_events(event_slug)
 
         paginator = self.pagination_class()
         paginated_events = paginator.paginate_queryset(similar_events, request, view=self)
 
-        serializer = EventSerializer(paginated_events, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        rows = serializer.values(Event.objects.filter(pk__in=[event.pk for event in paginated_events]))
+        rows_by_id = {row['id']: row for row in rows}
+        data = serializer.to_representation(rows_by_id[event.pk] for event in paginated_events)
+        return paginator.get_paginated_response(data)
+
+
+class CursorExpiredError(APIException):
+    """ The changes after the cursor are no longer kept """
+    status_code = status.HTTP_410_GONE
+    default_detail = "The cursor has expired, sync the whole catalog again and restart from the latest cursor."
+    default_code = 'cursor_expired'
+
+
+class CatalogChangesView(ReplicaReadMixin, APIView):
+    """ View for the changes of events, tags, playlists and video assets since a cursor """
+
+    @extend_schema(
+        parameters=[ChangesQuerySerializer],
+        responses=CatalogChangesSerializer,
+        description=(
+            "Return the objects created, updated or deleted after `cursor`, at most `limit` changes at a time. "
+            "Call again with the returned cursor while `has_more` is true. Events that are not published "
+            "are reported as deleted. Without a cursor, only the latest cursor is returned."
+        ),
+    )
+    def get(self, request, *args, **kwargs):
+        """ Get a batch of catalog changes """
+        params = ChangesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        serializer = ChangesQuerySerializer.row_serializer_for(request)
+
+        if 'cursor' not in params.validated_data:
+            changes = {key: {'upserted': [], 'deleted': []} for key in RESULT_KEYS.values()}
+            return Response({'cursor': latest_cursor(), 'has_more': False, **changes})
+
+        try:
+            cursor, has_more, changes = get_changes(
+                params.validated_data['cursor'], params.validated_data['limit'], serializer
+            )
+        except CursorExpired as e:
+            raise CursorExpiredError() from e
+        return Response({'cursor': cursor, 'has_more': has_more, **changes})
+
+
+class EventExportView(APIView):
+    """ View streaming every event, with its relations and videos, for staff """
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        parameters=[ExportQuerySerializer],
+        responses={(200, 'application/x-ndjson'): str, (200, 'text/csv'): str},
+        description="Stream all events as NDJSON, one event per line, or CSV. Memory use does not grow with "
+                    "the catalog, and no count is run.",
+    )
+    def get(self, request, *args, **kwargs):
+        """ Export all events """
+        params = ExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        export_format = params.validated_data['export_format']
+        content_type, encode = EXPORT_FORMATS[export_format]
+
+        lines = encode(iter_events())
+        if isinstance(request._request, ASGIRequest):  # pylint: disable=protected-access
+            lines = aiter_lines(lines)
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="events.{export_format}"'
+        return response
+
+
+class SearchSuggestionsView(ReplicaReadMixin, APIView):
+    """ View for search box autocomplete suggestions """
+
+    @extend_schema(
+        parameters=[SuggestionQuerySerializer],
+        responses=SuggestionsSerializer,
+        description="Return titles, tags, playlists and presenters having a word that starts with `q`",
+    )
+    def get(self, request, *args, **kwargs):
+        """ Get suggestions for the typed prefix """
+        params = SuggestionQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        response = Response(get_suggestions(params.validated_data['q'], params.validated_data['limit']))
+        patch_cache_control(response, private=True, max_age=60)
+        return response
+
+
+class WatchProgressView(APIView):
+    """ View for the watch progress of the current user """
+    pagination_class = CustomPageNumberPagination
+
+    @extend_schema(responses=WatchProgressSerializer(many=True))
+    def get(self, request, *args, **kwargs):
+        """ List the videos the user has started but not finished, most recently watched first """
+        unfinished = sorted(
+            ((video_asset_id, heartbeat) for video_asset_id, heartbeat in get_watch_progress(request.user.pk).items()
+             if not heartbeat.completed),
+            key=lambda item: item[1].updated,
+            reverse=True,
+        )
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(unfinished, request, view=self)
+
+        videos = {
+            video['id']: video
+            for video in VideoAsset.objects.filter(pk__in=[video_asset_id for video_asset_id, _ in page]).values(
+                'id', 'title', 'duration', 'event__slug'
+            )
+        }
+        data = [
+            {
+                'video_asset': video_asset_id,
+                'event_slug': videos[video_asset_id]['event__slug'],
+                'title': videos[video_asset_id]['title'],
+                'duration': videos[video_asset_id]['duration'],
+                **heartbeat._asdict(),
+            }
+            for video_asset_id, heartbeat in page if video_asset_id in videos
+        ]
+        return paginator.get_paginated_response(WatchProgressSerializer(data, many=True).data)
+
+    @extend_schema(request=WatchProgressHeartbeatSerializer, responses={202: None})
+    def post(self, request, *args, **kwargs):
+        """ Record a player heartbeat, it is buffered and written to the database in batches """
+        serializer = WatchProgressHeartbeatSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        record_heartbeat(request.user.pk, data['video_asset'], data['position'], data['completed'], timezone.now())
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+
+class VideoAssetStatusView(APIView):
+    """ View for the status of a video asset, with the progress of its download while it is processed """
+
+    @extend_schema(responses=VideoAssetStatusSerializer)
+    def get(self, request, pk, *args, **kwargs):
+        """ Get the status of a video asset """
+        video_assets = VideoAsset.objects.only('pk', 'event_id', 'status')
+        if not request.user.is_staff:
+            video_assets = video_assets.filter(event__status=Event.EventStatus.PUBLISHED)
+        video_asset = get_object_or_404(video_assets, pk=pk)
+
+        progress = None
+        if video_asset.status == VideoAsset.VideoStatus.PROCESSING:
+            progress = get_download_progress(video_asset.pk)
+        return Response(VideoAssetStatusSerializer({
+            **video_status_message(video_asset), 'progress': progress and progress._asdict()
+        }).data)
+
+
+class VideoStatusTicketView(APIView):
+    """ View issuing tickets that authenticate the video status stream """
+
+    @extend_schema(request=None, responses=VideoStatusTicketSerializer)
+    def post(self, request, *args, **kwargs):
+        """ Get a short-lived ticket to open the video status stream with """
+        return Response({
+            'ticket': issue_video_status_ticket(request.user),
+            'expires_in': settings.VIDEO_STATUS['TICKET_MAX_AGE'],
+        })
+
+
+class AsgiRequiredError(APIException):
+    """ The request reached a server that would hold a worker for the whole stream """
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = "The video status stream is only served by the ASGI server, connect to it instead."
+    default_code = 'asgi_required'
+
+
+class VideoStatusStreamView(APIView):
+    """ View streaming the status and download progress of video assets as Server-Sent Events """
+    authentication_classes = [*api_settings.DEFAULT_AUTHENTICATION_CLASSES, VideoStatusTicketAuthentication]
+
+    def perform_content_negotiation(self, request, force=False):
+        # EventSource only accepts text/event-stream, errors are still rendered as JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    @extend_schema(
+        operation_id='v1_events_video_status_stream',
+        parameters=[VideoStatusQuerySerializer],
+        responses={(200, 'text/event-stream'): str, 501: None},
+        description=(
+            "Stream `status` events holding the `id`, `event` and `status` of video assets, first their current "
+            "status and then every change, with the download progress while they are processed. Only served by "
+            "the ASGI application, other servers reply 501. The stream ends after a few minutes and clients "
+            "reconnect. EventSource clients authenticate with a `ticket` from the ticket endpoint."
+        ),
+    )
+    def get(self, request, *args, **kwargs):
+        """ Follow the status of video assets """
+        # Under WSGI the stream would be read to its end before anything is sent
+        if not isinstance(request._request, ASGIRequest):  # pylint: disable=protected-access
+            raise AsgiRequiredError()
+
+        params = VideoStatusQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        video_asset_ids = params.validated_data.get('video_assets')
+
+        if not request.user.is_staff:
+            if video_asset_ids is None:
+                raise ValidationError({'video_assets': ["This field is required."]})
+            video_asset_ids = set(VideoAsset.objects.filter(
+                pk__in=video_asset_ids, event__status=Event.EventStatus.PUBLISHED
+            ).values_list('pk', flat=True))
+
+        response = StreamingHttpResponse(stream_video_status(video_asset_ids), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Keeps nginx from buffering the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class TusVersionError(APIException):
+    """ The client speaks another version of the tus protocol """
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = f"Only version {TUS_VERSION} of the tus protocol is supported."
+    default_code = 'tus_version'
+
+
+class UploadOffsetError(APIException):
+    """ The chunk does not start where the upload stands """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Upload-Offset does not match the offset of the upload, ask for the offset and resume from there."
+    default_code = 'upload_offset'
+
+
+class UploadLockedError(APIException):
+    """ Another request is writing to the upload """
+    status_code = status.HTTP_423_LOCKED
+    default_detail = "Another request is writing to this upload."
+    default_code = 'upload_locked'
+
+
+class LengthRequiredError(APIException):
+    """ The chunk was sent without its length, e.g. with chunked transfer encoding """
+    status_code = status.HTTP_411_LENGTH_REQUIRED
+    default_detail = "Content-Length is required, send chunks with their length."
+    default_code = 'length_required'
+
+
+class ChecksumMismatchError(APIException):
+    """ The chunk was damaged on the way, it has to be sent again """
+    status_code = 460
+    default_detail = "The checksum of the chunk does not match Upload-Checksum, send it again."
+    default_code = 'checksum_mismatch'
+
+
+TUS_HEADERS = [
+    OpenApiParameter('Tus-Resumable', str, OpenApiParameter.HEADER, required=True, enum=[TUS_VERSION]),
+]
+
+
+class TusViewMixin:
+    """ Checks the tus protocol version of requests and describes the server in responses """
+
+    def initial(self, request, *args, **kwargs):
+        """ Reject requests of other versions of the protocol """
+        super().initial(request, *args, **kwargs)
+        if request.method != 'OPTIONS' and request.headers.get('Tus-Resumable') != TUS_VERSION:
+            raise TusVersionError()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """ Add the protocol version, and the capabilities of the server to OPTIONS responses """
+        response = super().finalize_response(request, response, *args, **kwargs)
+        response['Tus-Resumable'] = TUS_VERSION
+        if request.method == 'OPTIONS':
+            response['Tus-Version'] = TUS_VERSION
+            response['Tus-Extension'] = TUS_EXTENSIONS
+            response['Tus-Max-Size'] = str(settings.VIDEO_UPLOADS['MAX_SIZE'])
+            response['Tus-Checksum-Algorithm'] = ','.join(CHECKSUM_ALGORITHMS)
+        return response
+
+
+class VideoUploadsView(TusViewMixin, APIView):
+    """ View creating resumable uploads of video files for staff, following the tus protocol """
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=None,
+        parameters=[
+            *TUS_HEADERS,
+            OpenApiParameter('Upload-Length', int, OpenApiParameter.HEADER, required=True),
+            OpenApiParameter(
+                'Upload-Metadata', str, OpenApiParameter.HEADER, required=True,
+                description="Comma separated `key base64(value)` pairs: `filename` and optionally `title` and "
+                            "`event`, the id of the event of the video",
+            ),
+        ],
+        responses={201: None},
+        description="Create an upload, the Location header of the response is the URL to send the file to.",
+    )
+    def post(self, request, *args, **kwargs):
+        """ Create a resumable upload """
+        try:
+            metadata = parse_metadata(request.headers.get('Upload-Metadata', ''))
+        except ValueError as e:
+            raise ValidationError({'Upload-Metadata': [str(e)]}) from e
+        params = VideoUploadSerializer(data={**metadata, 'length': request.headers.get('Upload-Length')})
+        params.is_valid(raise_exception=True)
+
+        upload = create_upload(request.user, **params.validated_data)
+        return Response(status=status.HTTP_201_CREATED, headers={
+            'Location': request.build_absolute_uri(reverse('video-upload', args=[upload.pk])),
+            'Upload-Expires': http_date(expires(upload).timestamp()),
+        })
+
+
+class VideoUploadView(TusViewMixin, APIView):
+    """ View resuming, writing and cancelling a resumable upload of a video file, following the tus protocol """
+    permission_classes = [IsAdminUser]
+
+    def get_upload(self, request, pk):
+        """ The upload, if it was started by the user """
+        return get_object_or_404(VideoUpload.objects.select_related('video_asset'), pk=pk, creator=request.user)
+
+    @staticmethod
+    def schedule_completion(upload):
+        """ Attach the file of a complete upload once committed, the hourly expiry catches up if the broker is down """
+        def schedule():
+            try:
+                complete_video_upload_task.delay(upload.pk)
+            except OperationalError as e:
+                logger.warning("Could not schedule the completion of upload %s: %s", upload.pk, e)
+
+        transaction.on_commit(schedule)
+
+    @staticmethod
+    def offset_headers(upload):
+        """ The headers telling the state of an upload """
+        headers = {'Upload-Offset': str(upload.offset), 'Cache-Control': 'no-store'}
+        if not upload.completed:
+            headers['Upload-Expires'] = http_date(expires(upload).timestamp())
+        return headers
+
+    @extend_schema(parameters=TUS_HEADERS, responses={200: None})
+    def head(self, request, pk, *args, **kwargs):  # pylint: disable=method-hidden
+        """ Get the offset to resume an upload from in Upload-Offset """
+        upload = self.get_upload(request, pk)
+        return Response(headers={**self.offset_headers(upload), 'Upload-Length': str(upload.length)})
+
+    @extend_schema(
+        request={'application/offset+octet-stream': bytes},
+        parameters=[
+            *TUS_HEADERS,
+            OpenApiParameter('Upload-Offset', int, OpenApiParameter.HEADER, required=True),
+            OpenApiParameter(
+                'Upload-Checksum', str, OpenApiParameter.HEADER,
+                description=f"`algorithm base64(digest)` of the chunk, with one of {', '.join(CHECKSUM_ALGORITHMS)}",
+            ),
+        ],
+        responses={204: None, 411: None},
+    )
+    def patch(self, request, pk, *args, **kwargs):
+        """ Write the chunk in the body at Upload-Offset, the new offset is returned in Upload-Offset """
+        if request.content_type != 'application/offset+octet-stream':
+            raise UnsupportedMediaType(request.content_type)
+        upload = self.get_upload(request, pk)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError) as e:
+            raise ValidationError({'Upload-Offset': ["Expected the offset of the chunk"]}) from e
+        checksum = request.headers.get('Upload-Checksum')
+        try:
+            checksum = parse_checksum(checksum) if checksum else None
+        except ValueError as e:
+            raise ValidationError({'Upload-Checksum': [str(e)]}) from e
+
+        if 'Content-Length' not in request.headers:
+            raise LengthRequiredError()
+        try:
+            size = int(request.headers['Content-Length'])
+            if size < 0:
+                raise ValueError()
+        except ValueError as e:
+            raise ValidationError({'Content-Length': ["Expected the length of the chunk"]}) from e
+        try:
+            write_chunk(upload, offset, request.stream or io.BytesIO(), size, checksum)
+        except OffsetMismatch as e:
+            raise UploadOffsetError() from e
+        except UploadLocked as e:
+            raise UploadLockedError() from e
+        except ChecksumMismatch as e:
+            raise ChecksumMismatchError() from e
+
+        if upload.completed:
+            self.schedule_completion(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT, headers=self.offset_headers(upload))
+
+    @extend_schema(parameters=TUS_HEADERS, responses={204: None})
+    def delete(self, request, pk, *args, **kwargs):
+        """ Cancel an unfinished upload, deleting its file and video asset """
+        upload = self.get_upload(request, pk)
+        if upload.completed:
+            raise UploadOffsetError("The upload is finished, delete its video asset instead.")
+        delete_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
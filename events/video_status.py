@@ -0,0 +1,222 @@
+"""
+Live status of video assets.
+
+Downloads and media processing publish every status or progress change of a
+video asset with ``publish_video_status``. Messages go through Redis pub/sub,
+so each web process hears what any worker publishes, and ``stream_video_status``
+pushes them to clients as Server-Sent Events instead of clients polling.
+
+A web process holds a single subscription, started with its first stream and
+closed with its last, and fans messages out to the queue of every open stream.
+Streams wait for the subscription to be confirmed, for at most
+``SUBSCRIBE_TIMEOUT``, before reading the current status.
+A stream that falls ``QUEUE_SIZE`` messages behind loses the oldest ones.
+Messages are not stored: a stream starts with the current status of its video
+assets and then follows their changes.
+
+Streams hold their connection open, so they are only served by the ASGI
+application, and end after ``MAX_STREAM_SECONDS`` as Django does not notice
+clients that went away. Clients reconnect by themselves.
+"""
+import abc
+import asyncio
+import contextlib
+import logging
+import threading
+from functools import lru_cache
+
+import orjson
+import redis.asyncio
+from asgiref.sync import sync_to_async
+from redis.exceptions import RedisError
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from arbisoft_sessions_portal.services.redis.redis_client import get_redis_client
+from events.models import VideoAsset
+
+logger = logging.getLogger("asp_api")
+
+QUEUE_SIZE = 100
+RECONNECT_DELAY = 1  # seconds
+SUBSCRIBE_TIMEOUT = 5  # seconds
+RETRY_MILLISECONDS = 3000
+
+
+def _put(queue, message):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+class _FanOut(abc.ABC):
+    """ Delivery of messages to the queues of the streams open in this process, from any thread """
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def _deliver(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            with contextlib.suppress(RuntimeError):  # The loop of a stream that just ended is closed
+                loop.call_soon_threadsafe(_put, queue, message)
+
+    @abc.abstractmethod
+    def publish(self, message):
+        """ Send a message to the open streams """
+
+    def _started(self):
+        """ Called when the first stream of the process subscribes """
+
+    def _stopped(self):
+        """ Called when the last stream of the process unsubscribes """
+
+    async def _ready(self):
+        """ Wait until messages published from now on are received """
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self):
+        """ Receive the messages published while the context is open through an asyncio queue """
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            self._subscribers.add(subscriber)
+            first = len(self._subscribers) == 1
+        if first:
+            self._started()
+        try:
+            await self._ready()
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+                last = not self._subscribers
+            if last:
+                self._stopped()
+
+
+class RedisVideoStatusChannel(_FanOut):
+    """ Video status channel publishing through Redis pub/sub, shared by all processes """
+
+    def __init__(self, channel='video-status', queue_size=QUEUE_SIZE, **kwargs):  # pylint: disable=unused-argument
+        super().__init__(queue_size)
+        self.channel = channel
+        self._listener = None
+        self._subscribed = None
+
+    def publish(self, message):
+        """ Send a message to the streams of every process """
+        get_redis_client().publish(self.channel, orjson.dumps(message))
+
+    async def _listen(self):
+        while True:
+            try:
+                async with redis.asyncio.Redis.from_url(settings.REDIS_URL) as client:
+                    async with client.pubsub() as pubsub:
+                        await pubsub.subscribe(self.channel)
+                        self._subscribed.set()
+                        async for item in pubsub.listen():
+                            if item['type'] == 'message':
+                                self._deliver(orjson.loads(item['data']))
+            except (RedisError, OSError) as e:
+                self._subscribed.clear()
+                logger.warning("Video status subscription lost, reconnecting: %s", e)
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    def _started(self):
+        if self._listener is None or self._listener.done():
+            self._subscribed = asyncio.Event()
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    def _stopped(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    async def _ready(self):
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), SUBSCRIBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Video status subscription not confirmed, the stream may miss changes")
+
+
+class InMemoryVideoStatusChannel(_FanOut):
+    """ Process-local video status channel, used in tests and single-process setups """
+
+    def __init__(self, queue_size=QUEUE_SIZE, **kwargs):  # pylint: disable=unused-argument
+        super().__init__(queue_size)
+
+    def publish(self, message):
+        """ Send a message to the streams of this process """
+        self._deliver(message)
+
+    def reset(self):
+        """ Forget all subscribers """
+        with self._lock:
+            self._subscribers.clear()
+
+
+@lru_cache(maxsize=None)
+def get_video_status_channel():
+    """ Return the process-wide channel configured by ``settings.VIDEO_STATUS`` """
+    config = settings.VIDEO_STATUS
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def video_status_message(video_asset, **progress):
+    """ The message telling the status of a video asset, with optional progress fields """
+    return {'id': video_asset.pk, 'event': video_asset.event_id, 'status': video_asset.status, **progress}
+
+
+def publish(message):
+    """ Send a message to the open streams. Failures are logged, never raised """
+    try:
+        get_video_status_channel().publish(message)
+    except RedisError as e:
+        logger.warning("Could not publish the status of VideoAsset %s: %s", message['id'], e)
+
+
+def publish_video_status(video_asset, **progress):
+    """ Tell the open streams about the status of a video asset """
+    publish(video_status_message(video_asset, **progress))
+
+
+def _current_status(video_asset_ids):
+    video_assets = VideoAsset.objects.only('pk', 'event_id', 'status').order_by('pk')
+    if video_asset_ids is not None:
+        video_assets = video_assets.filter(pk__in=video_asset_ids)
+    return [video_status_message(video_asset) for video_asset in video_assets]
+
+
+def format_event(message):
+    """ A message as a Server-Sent Event """
+    return f"event: status\ndata: {orjson.dumps(message).decode()}\n\n"
+
+
+async def stream_video_status(video_asset_ids=None):
+    """
+    Yield the Server-Sent Events of a stream: the current status of the video assets,
+    then their changes, with a comment every ``KEEPALIVE_SECONDS`` while nothing happens.
+    ``video_asset_ids`` limits the stream to some video assets, all of them if None.
+    """
+    config = settings.VIDEO_STATUS
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + config['MAX_STREAM_SECONDS']
+
+    # Subscribed before reading the current status, a change in between is sent after it
+    async with get_video_status_channel().subscribe() as queue:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        for message in await sync_to_async(_current_status)(video_asset_ids):
+            yield format_event(message)
+
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(queue.get(), min(config['KEEPALIVE_SECONDS'], remaining))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if video_asset_ids is None or message['id'] in video_asset_ids:
+                yield format_event(message)
@@ -0,0 +1,191 @@
+"""
+Write-behind buffering of watch progress heartbeats.
+
+The player reports its position every few seconds. Heartbeats only overwrite
+the latest state of each (user, video) in the buffer, a Redis hash per user,
+and ``flush_watch_progress`` moves everything buffered to ``WatchProgress``
+with one upsert per batch of users. Thousands of viewers therefore cost a few
+bulk writes per flush interval instead of one row update per heartbeat.
+
+Readers merge the buffer over the table, so users see their latest position
+before it has been flushed. Heartbeats taken from the buffer by a flush that
+then fails are lost, which only sets a position back by one flush interval.
+"""
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.utils.module_loading import import_string
+
+from arbisoft_sessions_portal.services.redis.redis_client import get_redis_client
+from events.models import VideoAsset, WatchProgress
+
+User = get_user_model()
+
+FLUSH_BATCH_SIZE = 500
+
+Heartbeat = namedtuple('Heartbeat', ['position', 'completed', 'updated'])
+
+# Pop up to ARGV[1] users from the dirty set and atomically take their buffered heartbeats
+TAKE_SCRIPT = """
+local users = redis.call('SPOP', KEYS[1], ARGV[1])
+local taken = {}
+for _, user_id in ipairs(users) do
+    local key = ARGV[2] .. user_id
+    table.insert(taken, user_id)
+    table.insert(taken, redis.call('HGETALL', key))
+    redis.call('DEL', key)
+end
+return taken
+"""
+
+
+def _encode(heartbeat):
+    return f"{heartbeat.position}:{int(heartbeat.completed)}:{heartbeat.updated.timestamp()}"
+
+
+def _decode(value):
+    position, completed, updated = value.split(':')
+    return Heartbeat(int(position), completed == '1', datetime.fromtimestamp(float(updated), tz=timezone.utc))
+
+
+class RedisWatchProgressBuffer:
+    """ Watch progress buffer keeping the latest heartbeat per user and video in Redis """
+
+    def __init__(self, key_prefix='watch_progress:', **kwargs):  # pylint: disable=unused-argument
+        self.user_key_prefix = f"{key_prefix}user:"
+        self.dirty_key = f"{key_prefix}dirty"
+        self._script = None
+
+    def add(self, user_id, video_asset_id, heartbeat):
+        """ Buffer a heartbeat, replacing the previous one for the same video """
+        pipeline = get_redis_client().pipeline()
+        pipeline.hset(f"{self.user_key_prefix}{user_id}", video_asset_id, _encode(heartbeat))
+        pipeline.sadd(self.dirty_key, user_id)
+        pipeline.execute()
+
+    def get(self, user_id):
+        """ Return the buffered heartbeats of a user by video asset id """
+        entries = get_redis_client().hgetall(f"{self.user_key_prefix}{user_id}")
+        return {int(video_asset_id): _decode(value) for video_asset_id, value in entries.items()}
+
+    def take(self, count):
+        """ Remove and return the heartbeats of up to ``count`` users by ``(user_id, video_asset_id)`` """
+        if self._script is None:
+            self._script = get_redis_client().register_script(TAKE_SCRIPT)
+        taken = self._script(keys=[self.dirty_key], args=[count, self.user_key_prefix])
+
+        heartbeats = {}
+        for user_id, entries in zip(taken[::2], taken[1::2]):
+            for video_asset_id, value in zip(entries[::2], entries[1::2]):
+                heartbeats[(int(user_id), int(video_asset_id))] = _decode(value)
+        return heartbeats
+
+
+class InMemoryWatchProgressBuffer:
+    """ Process-local watch progress buffer, used in tests and single-process setups """
+
+    def __init__(self, **kwargs):  # pylint: disable=unused-argument
+        self._heartbeats = {}
+        self._lock = threading.Lock()
+
+    def add(self, user_id, video_asset_id, heartbeat):
+        """ Buffer a heartbeat, replacing the previous one for the same video """
+        with self._lock:
+            self._heartbeats.setdefault(user_id, {})[video_asset_id] = heartbeat
+
+    def get(self, user_id):
+        """ Return the buffered heartbeats of a user by video asset id """
+        with self._lock:
+            return dict(self._heartbeats.get(user_id, {}))
+
+    def take(self, count):
+        """ Remove and return the heartbeats of up to ``count`` users by ``(user_id, video_asset_id)`` """
+        with self._lock:
+            user_ids = list(self._heartbeats)[:count]
+            return {
+                (user_id, video_asset_id): heartbeat
+                for user_id in user_ids
+                for video_asset_id, heartbeat in self._heartbeats.pop(user_id).items()
+            }
+
+    def reset(self):
+        """ Forget all buffered heartbeats """
+        with self._lock:
+            self._heartbeats.clear()
+
+
+@lru_cache(maxsize=None)
+def get_watch_progress_buffer():
+    """ Return the process-wide buffer configured by ``settings.WATCH_PROGRESS_BUFFER`` """
+    config = settings.WATCH_PROGRESS_BUFFER
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def record_heartbeat(user_id, video_asset_id, position, completed, updated):
+    """ Buffer the player state of a user; it reaches the database on the next flush """
+    get_watch_progress_buffer().add(user_id, video_asset_id, Heartbeat(position, completed, updated))
+
+
+def get_watch_progress(user_id):
+    """ Return the progress of a user by video asset id, buffered heartbeats taking precedence """
+    progress = {
+        row['video_asset_id']: Heartbeat(row['position'], row['completed'], row['updated'])
+        for row in WatchProgress.objects.filter(user_id=user_id).values(
+            'video_asset_id', 'position', 'completed', 'updated'
+        )
+    }
+    for video_asset_id, heartbeat in get_watch_progress_buffer().get(user_id).items():
+        if video_asset_id not in progress or heartbeat.updated >= progress[video_asset_id].updated:
+            progress[video_asset_id] = heartbeat
+    return progress
+
+
+def _upsert(rows):
+    """
+    Insert or update WatchProgress rows from ``(user_id, video_asset_id, heartbeat)`` tuples with one
+    statement. Existing rows are only updated from later heartbeats, so a slow flush finishing after
+    the next one cannot set them back. Returns the number of rows written.
+    """
+    db_connection = connections[router.db_for_write(WatchProgress)]
+    table = db_connection.ops.quote_name(WatchProgress._meta.db_table)
+    with db_connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, video_asset_id, position, completed, updated) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(rows))} "
+            "ON CONFLICT (user_id, video_asset_id) DO UPDATE SET position = EXCLUDED.position, "
+            f"completed = EXCLUDED.completed, updated = EXCLUDED.updated WHERE EXCLUDED.updated > {table}.updated",
+            [value for user_id, video_asset_id, heartbeat in rows for value in (user_id, video_asset_id, *heartbeat)],
+        )
+        return cursor.rowcount
+
+
+def flush_watch_progress(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Upsert all buffered heartbeats into WatchProgress, one statement per batch of users.
+    Returns the number of rows written.
+    """
+    buffer = get_watch_progress_buffer()
+    flushed = 0
+    while heartbeats := buffer.take(batch_size):
+        # Heartbeats of users and videos deleted since are dropped
+        existing_users = set(
+            User.objects.filter(pk__in={user_id for user_id, _ in heartbeats}).values_list('pk', flat=True)
+        )
+        existing_videos = set(
+            VideoAsset.objects.filter(
+                pk__in={video_asset_id for _, video_asset_id in heartbeats}
+            ).values_list('pk', flat=True)
+        )
+        rows = [
+            (user_id, video_asset_id, heartbeat)
+            for (user_id, video_asset_id), heartbeat in heartbeats.items()
+            if user_id in existing_users and video_asset_id in existing_videos
+        ]
+        if rows:
+            flushed += _upsert(rows)
+    return flushed
@@ -0,0 +1,20 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from users.revocation import get_revocation_list
+
+
+class RevocableJWTAuthentication(JWTAuthentication):
+    """ JWT authentication that rejects tokens on the revocation list """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if get_revocation_list().is_revoked(validated_token):
+            raise InvalidToken("Token has been revoked")
+        return validated_token
+
+
+class RevocableJWTAuthenticationScheme(SimpleJWTScheme):
+    """ OpenAPI description of RevocableJWTAuthentication, identical to plain JWT bearer auth """
+    target_class = RevocableJWTAuthentication
@@ -0,0 +1,163 @@
+"""
+Revocation list for JWT ``jti`` claims.
+
+Revoked ids live in a shared store (a Redis sorted set scored by token expiry)
+and are mirrored into a process-local Bloom filter. A token that was never
+revoked - the overwhelmingly common case - is answered by the filter alone,
+without a round trip; only filter hits are confirmed against the store.
+
+The filter is rebuilt from the store every ``REFRESH_INTERVAL`` seconds, so a
+token revoked by another process is rejected here after at most that delay.
+Tokens revoked by this process are added to the filter immediately.
+"""
+import hashlib
+import math
+import threading
+import time
+from functools import lru_cache
+
+from rest_framework_simplejwt.settings import api_settings
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from arbisoft_sessions_portal.services.redis.redis_client import get_redis_client
+
+
+class BloomFilter:
+    """ Fixed-size Bloom filter over strings using double hashing """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        """ Add an item to the filter """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class InMemoryRevocationStore:
+    """ Process-local revocation store, used in tests and single-process setups """
+
+    def __init__(self, **kwargs):  # pylint: disable=unused-argument
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti, expires_at):
+        """ Store a revoked jti, returning False if it was already revoked """
+        with self._lock:
+            if self.is_revoked(jti):
+                return False
+            self._revoked[jti] = expires_at
+            return True
+
+    def is_revoked(self, jti):
+        """ Check whether a jti is revoked and not yet expired """
+        return self._revoked.get(jti, 0) > time.time()
+
+    def active_jtis(self):
+        """ Return all revoked jtis that have not expired yet """
+        now = time.time()
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            return list(self._revoked)
+
+
+class RedisRevocationStore:
+    """ Revocation store backed by a Redis sorted set scored by token expiry """
+
+    def __init__(self, key='jwt:revoked', **kwargs):  # pylint: disable=unused-argument
+        self.key = key
+
+    def revoke(self, jti, expires_at):
+        """ Store a revoked jti, returning False if it was already revoked """
+        return bool(get_redis_client().zadd(self.key, {jti: expires_at}, nx=True))
+
+    def is_revoked(self, jti):
+        """ Check whether a jti is revoked and not yet expired """
+        expires_at = get_redis_client().zscore(self.key, jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def active_jtis(self):
+        """ Drop expired entries and return the remaining revoked jtis """
+        client = get_redis_client()
+        now = time.time()
+        client.zremrangebyscore(self.key, '-inf', now)
+        return client.zrangebyscore(self.key, now, '+inf')
+
+
+class TokenRevocationList:
+    """ Bloom-filter fronted view over a revocation store """
+
+    def __init__(self, store, capacity=10000, error_rate=0.001, refresh_interval=30):
+        self.store = store
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """ Rebuild the local Bloom filter from the shared store """
+        jtis = self.store.active_jtis()
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._refreshed_at = time.monotonic()
+
+    def _is_stale(self):
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_interval
+
+    def _refresh_if_stale(self):
+        if not self._is_stale():
+            return
+        with self._lock:
+            if self._is_stale():
+                self.refresh()
+
+    def revoke(self, token):
+        """
+        Revoke a validated token until it expires.
+        Returns False if the token had already been revoked.
+        """
+        jti = token[api_settings.JTI_CLAIM]
+        revoked = self.store.revoke(jti, token['exp'])
+        self._bloom.add(jti)
+        return revoked
+
+    def is_revoked(self, token):
+        """ Check whether a validated token has been revoked """
+        jti = token.get(api_settings.JTI_CLAIM)
+        if not jti:
+            return False
+
+        self._refresh_if_stale()
+        if jti not in self._bloom:
+            return False
+        return self.store.is_revoked(jti)
+
+
+@lru_cache(maxsize=None)
+def get_revocation_list():
+    """ Return the process-wide revocation list configured by ``settings.TOKEN_REVOCATION`` """
+    config = settings.TOKEN_REVOCATION
+    store_class = import_string(config['BACKEND'])
+    return TokenRevocationList(
+        store_class(**config.get('OPTIONS', {})),
+        capacity=config.get('BLOOM_CAPACITY', 10000),
+        error_rate=config.get('BLOOM_ERROR_RATE', 0.001),
+        refresh_interval=config.get('REFRESH_INTERVAL', 30),
+    )
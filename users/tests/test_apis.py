@@ -3,12 +3,15 @@ from unittest.mock import patch
 import pytest
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from django.urls import reverse
 
 from users.factories import UserFactory
+from users.v1.throttling import LoginAccountRateThrottle, LoginRateThrottle
 
 User = get_user_model()
 
@@ -118,3 +121,175 @@ class TestLoginWithEmailAPI:
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert response.data[0] == "Invalid email or password"
+
+
+@pytest.mark.django_db
+class TestLogoutAPI:
+    """ Test cases for LogoutView """
+
+    @pytest.fixture
+    def user(self):
+        """ Returns a user """
+        return UserFactory()
+
+    @pytest.fixture
+    def tokens(self, user):
+        """ Returns a refresh token and its access token for the user """
+        refresh = RefreshToken.for_user(user)
+        return str(refresh), str(refresh.access_token)
+
+    @pytest.fixture
+    def api_client(self, tokens):
+        """ Returns an APIClient authenticated with a JWT access token """
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens[1]}")
+        return client
+
+    def test_logout_revokes_access_and_refresh_tokens(self, api_client, tokens):
+        """ Test that both tokens are rejected after logging out """
+        refresh, _ = tokens
+
+        response = api_client.post(reverse("logout"), {"refresh": refresh}, format="json")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        response = api_client.post(reverse("logout"), {"refresh": refresh}, format="json")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = APIClient().post(reverse("token_refresh"), {"refresh": refresh}, format="json")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_logout_with_invalid_refresh_token(self, api_client):
+        """ Test logout failure with a malformed refresh token """
+        response = api_client.post(reverse("logout"), {"refresh": "not-a-token"}, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data[0] == "Invalid refresh token"
+
+    def test_logout_with_refresh_token_of_another_user(self, api_client):
+        """ Test that a user cannot revoke someone else's refresh token """
+        other_refresh = RefreshToken.for_user(UserFactory())
+
+        response = api_client.post(reverse("logout"), {"refresh": str(other_refresh)}, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_logout_requires_authentication(self, tokens):
+        """ Test that anonymous users cannot log out """
+        response = APIClient().post(reverse("logout"), {"refresh": tokens[0]}, format="json")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestTokenRefreshAPI:
+    """ Test cases for RotatingTokenRefreshView """
+
+    @pytest.fixture
+    def api_client(self):
+        """ Returns an instance of APIClient """
+        return APIClient()
+
+    def test_refresh_rotates_token(self, api_client):
+        """ Test that refreshing returns a new refresh token and revokes the old one """
+        refresh = str(RefreshToken.for_user(UserFactory()))
+
+        response = api_client.post(reverse("token_refresh"), {"refresh": refresh}, format="json")
+        assert response.status_code == status.HTTP_200_OK
+        assert "access" in response.data
+        rotated_refresh = response.data["refresh"]
+        assert rotated_refresh != refresh
+
+        response = api_client.post(reverse("token_refresh"), {"refresh": refresh}, format="json")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = api_client.post(reverse("token_refresh"), {"refresh": rotated_refresh}, format="json")
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_rejected_refresh_keeps_token(self, api_client):
+        """ Test that a refresh rejected for an inactive user does not use up the token """
+        user = UserFactory(is_active=False)
+        refresh = str(RefreshToken.for_user(user))
+
+        response = api_client.post(reverse("token_refresh"), {"refresh": refresh}, format="json")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert "refresh" not in response.data
+
+        user.is_active = True
+        user.save()
+        response = api_client.post(reverse("token_refresh"), {"refresh": refresh}, format="json")
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestLoginThrottling:
+    """ Test cases for rate limiting of the login views """
+
+    @pytest.fixture
+    def api_client(self):
+        """ Returns an instance of APIClient """
+        return APIClient()
+
+    def test_login_with_email_is_throttled_per_ip(self, api_client):
+        """ Test that repeated login attempts from one client get a 429 with Retry-After """
+        with patch.dict(LoginRateThrottle.THROTTLE_RATES, {LoginRateThrottle.scope: "2/min"}):
+            for _ in range(2):
+                response = api_client.post(
+                    reverse("login_with_email"), {"email": "a@example.com", "password": "x"}, format="json"
+                )
+                assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+            response = api_client.post(
+                reverse("login_with_email"), {"email": "b@example.com", "password": "x"}, format="json"
+            )
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response["Retry-After"]) > 0
+
+    @pytest.mark.parametrize("num_proxies", [0, 1])
+    def test_spoofed_forwarded_for_does_not_reset_budget(self, api_client, num_proxies):
+        """ Test that a client cannot get a fresh budget by changing the X-Forwarded-For it sends """
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": num_proxies}), \
+                patch.dict(LoginRateThrottle.THROTTLE_RATES, {LoginRateThrottle.scope: "2/min"}):
+            for spoofed in ("1.1.1.1", "2.2.2.2", "3.3.3.3"):
+                # A proxy appends the address it saw to whatever the client sent
+                forwarded_for = f"{spoofed}, 10.0.0.1" if num_proxies else spoofed
+                response = api_client.post(
+                    reverse("login_with_email"), {"email": "a@example.com", "password": "x"},
+                    format="json", HTTP_X_FORWARDED_FOR=forwarded_for
+                )
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_login_with_email_is_throttled_per_account(self, api_client):
+        """ Test that one account cannot be brute forced from many IPs """
+        with patch.dict(LoginAccountRateThrottle.THROTTLE_RATES, {LoginAccountRateThrottle.scope: "1/min"}):
+            response = api_client.post(
+                reverse("login_with_email"), {"email": "a@example.com", "password": "x"},
+                format="json", REMOTE_ADDR="10.0.0.1"
+            )
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+            response = api_client.post(
+                reverse("login_with_email"), {"email": "A@example.com", "password": "x"},
+                format="json", REMOTE_ADDR="10.0.0.2"
+            )
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_throttle_stats_requires_staff(self, api_client):
+        """ Test that throttle counters are only visible to staff """
+        api_client.force_authenticate(user=UserFactory())
+        response = api_client.get(reverse("throttle_stats"))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_throttle_stats(self, api_client):
+        """ Test that allowed and denied requests are counted per scope """
+        with patch.dict(LoginRateThrottle.THROTTLE_RATES, {LoginRateThrottle.scope: "1/min"}):
+            for _ in range(2):
+                api_client.post(reverse("login_with_email"), {"email": "a@example.com", "password": "x"})
+
+        api_client.force_authenticate(user=UserFactory(is_staff=True))
+        response = api_client.get(reverse("throttle_stats"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["login"] == {"allowed": 1, "denied": 1}
@@ -0,0 +1,71 @@
+import time
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.revocation import BloomFilter, InMemoryRevocationStore, TokenRevocationList
+
+
+class TestBloomFilter:
+    """ Test cases for BloomFilter """
+
+    def test_added_items_are_found(self):
+        """ Test that the filter never reports a false negative """
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f"jti-{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+
+        assert all(item in bloom for item in items)
+
+    def test_false_positive_rate_is_bounded(self):
+        """ Test that unknown items are mostly reported as absent """
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives < 300
+
+
+class TestTokenRevocationList:
+    """ Test cases for TokenRevocationList """
+
+    @staticmethod
+    def _token(jti, lifetime=60):
+        token = AccessToken()
+        token['jti'] = jti
+        token['exp'] = int(time.time()) + lifetime
+        return token
+
+    def test_revoke_is_visible_locally_without_refresh(self):
+        """ Test that a token revoked by this process is rejected immediately """
+        revocation_list = TokenRevocationList(InMemoryRevocationStore(), refresh_interval=3600)
+        token = self._token("abc")
+
+        assert not revocation_list.is_revoked(token)
+        assert revocation_list.revoke(token)
+        assert revocation_list.is_revoked(token)
+        assert not revocation_list.revoke(token)
+
+    def test_revocations_from_other_processes_are_picked_up_on_refresh(self):
+        """ Test that the Bloom filter is rebuilt from the shared store """
+        store = InMemoryRevocationStore()
+        revocation_list = TokenRevocationList(store, refresh_interval=3600)
+        other_process = TokenRevocationList(store, refresh_interval=3600)
+        token = self._token("shared")
+
+        assert not revocation_list.is_revoked(token)
+        other_process.revoke(token)
+        assert not revocation_list.is_revoked(token)
+
+        revocation_list.refresh()
+        assert revocation_list.is_revoked(token)
+
+    def test_expired_revocations_are_dropped(self):
+        """ Test that expired jtis are purged from the store """
+        store = InMemoryRevocationStore()
+        revocation_list = TokenRevocationList(store, refresh_interval=0)
+        revocation_list.revoke(self._token("expired", lifetime=-1))
+
+        assert not store.active_jtis()
+        assert not revocation_list.is_revoked(self._token("expired"))
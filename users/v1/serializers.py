@@ -1,4 +1,12 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from django.contrib.auth import get_user_model
+
+from users.revocation import get_revocation_list
 
 
 class LoginUserSerializer(serializers.Serializer):
@@ -11,3 +19,38 @@ class EmailLoginSerializer(serializers.Serializer):
     """ Serializer for email/password login """
     email = serializers.EmailField(required=True)
     password = serializers.CharField(required=True, write_only=True)
+
+
+class LogoutSerializer(serializers.Serializer):
+    """ Serializer for logging out with a refresh token """
+    refresh = serializers.CharField(required=True)
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh serializer that revokes the presented refresh token when rotating,
+    so every refresh token can be exchanged exactly once. The token is only
+    revoked once the refresh succeeded, a rejected refresh leaves it usable.
+    Users that are gone or no longer active cannot refresh.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        revocation_list = get_revocation_list()
+
+        if revocation_list.is_revoked(refresh):
+            raise InvalidToken("Token has been revoked")
+
+        user = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed("No active account found for the given token.", code="no_active_account")
+
+        data = super().validate(attrs)
+
+        if api_settings.ROTATE_REFRESH_TOKENS and not revocation_list.revoke(refresh):
+            # Another request rotated this token concurrently
+            raise InvalidToken("Token has been revoked")
+
+        return data
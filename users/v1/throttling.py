@@ -0,0 +1,20 @@
+from arbisoft_sessions_portal.throttling import SlidingWindowRateThrottle
+
+
+class LoginRateThrottle(SlidingWindowRateThrottle):
+    """ Limits login attempts per client IP """
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginAccountRateThrottle(SlidingWindowRateThrottle):
+    """ Limits password login attempts per account, regardless of the client IP """
+    scope = 'login_account'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not email or not isinstance(email, str):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': email.strip().lower()}
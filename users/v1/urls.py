@@ -1,8 +1,11 @@
 from django.urls import path
 
-from users.v1.views import LoginUserView, LoginWithEmailView
+from users.v1.views import LoginUserView, LoginWithEmailView, LogoutView, RotatingTokenRefreshView, ThrottleStatsView
 
 urlpatterns = [
     path('login', LoginUserView.as_view(), name='login_user'),
     path('login/email', LoginWithEmailView.as_view(), name='login_with_email'),
+    path('logout', LogoutView.as_view(), name='logout'),
+    path('token/refresh', RotatingTokenRefreshView.as_view(), name='token_refresh'),
+    path('throttle-stats', ThrottleStatsView.as_view(), name='throttle_stats'),
 ]
@@ -1,14 +1,27 @@
 from drf_spectacular.utils import extend_schema
+from rest_framework import status
 from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
 
 from arbisoft_sessions_portal.services.google.google_user_info import GoogleUserInfoService
-from users.v1.serializers import EmailLoginSerializer, LoginUserSerializer
+from arbisoft_sessions_portal.throttling import get_throttle_backend
+from users.revocation import get_revocation_list
+from users.v1.serializers import (
+    EmailLoginSerializer,
+    LoginUserSerializer,
+    LogoutSerializer,
+    RotatingTokenRefreshSerializer,
+)
+from users.v1.throttling import LoginAccountRateThrottle, LoginRateThrottle
 
 user_model = get_user_model()
 
@@ -17,6 +30,7 @@ class LoginUserView(APIView):
     """ View for logging in the user """
 
     permission_classes = []
+    throttle_classes = [LoginRateThrottle]
 
     @extend_schema(
         request=LoginUserSerializer,
@@ -115,6 +129,7 @@ class LoginWithEmailView(APIView):
     """ View for logging in the user with email """
 
     permission_classes = []
+    throttle_classes = [LoginRateThrottle, LoginAccountRateThrottle]
 
     @extend_schema(
         request=EmailLoginSerializer,
@@ -200,3 +215,77 @@ class LoginWithEmailView(APIView):
                 'avatar': None
             }
         })
+
+
+class LogoutView(APIView):
+    """ View for logging out the user by revoking their tokens """
+
+    @extend_schema(
+        request=LogoutSerializer,
+        responses={
+            204: None,
+            400: {
+                "type": "object",
+                "properties": {
+                    "detail": {
+                        "type": "string",
+                        "enum": [
+                            "Invalid refresh token"
+                        ]
+                    }
+                }
+            }
+        },
+        description="Revoke the given refresh token and the access token used for the request",
+    )
+    def post(self, request):
+        """ Log out the user """
+        serializer = LogoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            refresh = RefreshToken(serializer.validated_data['refresh'])
+        except TokenError as e:
+            raise ValidationError("Invalid refresh token") from e
+
+        if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(getattr(request.user, api_settings.USER_ID_FIELD)):
+            raise ValidationError("Invalid refresh token")
+
+        revocation_list = get_revocation_list()
+        revocation_list.revoke(refresh)
+        if request.auth is not None and api_settings.JTI_CLAIM in request.auth:
+            revocation_list.revoke(request.auth)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class RotatingTokenRefreshView(TokenRefreshView):
+    """ View for exchanging a refresh token for a new access and refresh token pair """
+
+    serializer_class = RotatingTokenRefreshSerializer
+
+
+class ThrottleStatsView(APIView):
+    """ View exposing allowed/denied request counters per throttle scope """
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        responses={
+            200: {
+                "type": "object",
+                "additionalProperties": {
+                    "type": "object",
+                    "properties": {
+                        "allowed": {"type": "integer"},
+                        "denied": {"type": "integer"}
+                    }
+                },
+                "example": {"login": {"allowed": 120, "denied": 3}}
+            }
+        },
+        description="Return rate limiting counters for monitoring",
+    )
+    def get(self, request):
+        """ Get the throttle counters """
+        return Response(get_throttle_backend().stats())